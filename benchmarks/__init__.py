@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Synthetic datasets and repeatable service benchmarks (see benchmarks/run.py)."""
@@ -0,0 +1,185 @@
+# benchmarks/bot_load.py
+"""
+End-to-end load test of the bot: the real Application from bot.py, with
+every register_*_handlers, talking to a local fake Bot API server.
+
+Synthetic Updates (/start with referral, /deposit, /status) are injected
+at a fixed rate straight into Application.process_update, and the harness
+reports per-command latency percentiles, throughput and the number of SQL
+statements each command issued.
+
+Usage:
+    python -m benchmarks.bot_load --updates 5000 --rate 200 --users 500
+    python -m benchmarks.bot_load --database-url sqlite:////tmp/load.db --json out.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+DEFAULT_DB = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_load.db")
+COMMANDS = ("start", "deposit", "status")
+TG_BASE = 500_000_000
+
+def _update_payload(update_id: int, tg_id: int, text: str) -> dict:
+    command = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": tg_id, "type": "private"},
+            "from": {"id": tg_id, "is_bot": False, "first_name": f"u{tg_id}", "username": f"u{tg_id}"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+
+def build_workload(n: int, users: int, mix: dict, seed: int):
+    """Return [(command, text, tg_id)]. Every user's first update is /start."""
+    rng = random.Random(seed)
+    started = []
+    weights = [mix[c] for c in COMMANDS]
+    out = []
+    for _ in range(n):
+        if len(started) < users and (not started or rng.random() < 0.3):
+            tg_id = TG_BASE + len(started) + 1
+            ref = rng.choice(started) if started and rng.random() < 0.8 else None
+            started.append(tg_id)
+            out.append(("start", f"/start {ref}" if ref else "/start", tg_id))
+            continue
+        cmd = rng.choices(COMMANDS, weights)[0]
+        tg_id = rng.choice(started)
+        if cmd == "start":
+            out.append(("start", "/start", tg_id))
+        elif cmd == "deposit":
+            out.append(("deposit", f"/deposit {rng.choice((20, 50, 100))}", tg_id))
+        else:
+            out.append(("status", "/status", tg_id))
+    return out
+
+
+def _percentile(sorted_vals, p):
+    return sorted_vals[max(0, math.ceil(len(sorted_vals) * p) - 1)]
+
+
+async def run_load(args) -> dict:
+    os.environ["DATABASE_URL"] = args.database_url
+    from telegram import Update
+    from bot import build_application
+    from db.models import Base
+    from db.session import engine
+    from db.query_budget import track_queries
+    from benchmarks.fake_bot_api import FakeBotApi, serve_in_thread
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    api = FakeBotApi()
+    server = serve_in_thread(api)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+    app = build_application(token="123456:LOADTEST", base_url=base_url)
+
+    errors = defaultdict(int)
+
+    async def on_error(update, context):
+        text = getattr(getattr(update, "message", None), "text", None) or "/unknown"
+        errors[text.split()[0].lstrip("/")] += 1
+        logging.getLogger(__name__).debug("handler error: %s", context.error)
+    app.add_error_handler(on_error)
+
+    workload = build_workload(args.updates, args.users, {"start": 1, "deposit": args.deposit_weight,
+                                                         "status": args.status_weight}, args.seed)
+    latencies = defaultdict(list)
+    queries = defaultdict(list)
+
+    async def one(update_id, cmd, text, tg_id):
+        update = Update.de_json(_update_payload(update_id, tg_id, text), app.bot)
+        t0 = time.perf_counter()
+        # handler-level trackers roll up into this per-update one
+        with track_queries(f"load:{cmd}", budget=None, report=False) as tracker:
+            try:
+                await app.process_update(update)
+            except Exception:
+                errors[cmd] += 1
+        latencies[cmd].append((time.perf_counter() - t0) * 1000)
+        queries[cmd].append(tracker.count)
+
+    await app.initialize()
+    tasks = []
+    started = time.perf_counter()
+    try:
+        for i, (cmd, text, tg_id) in enumerate(workload):
+            # open-loop arrival: stay on schedule even if handlers fall behind
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i + 1, cmd, text, tg_id)))
+        await asyncio.gather(*tasks)
+    finally:
+        elapsed = time.perf_counter() - started
+        await app.shutdown()
+        server.shutdown()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(workload) / elapsed, 1),
+        "bot_api_calls": dict(api.calls),
+        "commands": {},
+    }
+    for cmd in COMMANDS:
+        lat = sorted(latencies.get(cmd, []))
+        if not lat:
+            continue
+        q = queries[cmd]
+        report["commands"][cmd] = {
+            "count": len(lat),
+            "errors": errors.get(cmd, 0),
+            "p50_ms": round(_percentile(lat, 0.50), 2),
+            "p95_ms": round(_percentile(lat, 0.95), 2),
+            "p99_ms": round(_percentile(lat, 0.99), 2),
+            "max_ms": round(lat[-1], 2),
+            "queries_mean": round(statistics.fmean(q), 2),
+            "queries_max": max(q),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DB))
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200.0, help="updates injected per second")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--deposit-weight", type=float, default=1.0)
+    parser.add_argument("--status-weight", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--log-level", default="CRITICAL", help="log level for handlers/services during the run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.CRITICAL))
+    report = asyncio.run(run_load(args))
+
+    print(f"{sum(r['count'] for r in report['commands'].values())} updates in "
+          f"{report['elapsed_s']}s -> {report['throughput_per_s']}/s (target {args.rate}/s)")
+    print(f"{'command':<10}{'count':>7}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'sql avg':>9}{'sql max':>9}")
+    for cmd, r in report["commands"].items():
+        print(f"{cmd:<10}{r['count']:>7}{r['errors']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}{r['queries_mean']:>9.2f}{r['queries_max']:>9}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/fake_bot_api.py
+"""
+Local stand-in for the Telegram Bot API, enough for python-telegram-bot to
+initialize and for handlers to reply. Every method succeeds instantly;
+sendMessage & co. return a synthetic Message so replies parse normally.
+
+Serves http://127.0.0.1:<port>/bot<token>/<method>.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "LoadTestBot", "username": "load_test_bot",
+            "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+
+MESSAGE_METHODS = {"sendMessage", "sendPhoto", "sendDocument", "editMessageText", "sendChatAction"}
+
+
+class FakeBotApi:
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._message_id = 0
+
+    def answer(self, method: str, params: dict):
+        with self._lock:
+            self.calls[method] += 1
+            self._message_id += 1
+            message_id = self._message_id
+
+        if method == "getMe":
+            return BOT_USER
+        if method in ("deleteWebhook", "setMyCommands", "close", "logOut"):
+            return True
+        if method == "getUpdates":
+            return []
+        if method == "sendChatAction":
+            return True
+        if method in MESSAGE_METHODS:
+            try:
+                chat_id = int(params.get("chat_id", 1))
+            except (TypeError, ValueError):
+                chat_id = 1
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+def _params(handler: BaseHTTPRequestHandler) -> dict:
+    raw = handler.rfile.read(int(handler.headers.get("Content-Length", 0) or 0))
+    ctype = handler.headers.get("Content-Type", "")
+    if not raw:
+        return {}
+    if ctype.startswith("application/json"):
+        return json.loads(raw)
+    if ctype.startswith("application/x-www-form-urlencoded"):
+        return {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+    # multipart bodies (file uploads) are not needed for load testing
+    return {}
+
+
+def make_server(api: FakeBotApi, port: int = 0) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_POST(self):
+            method = self.path.rsplit("/", 1)[-1]
+            body = json.dumps({"ok": True, "result": api.answer(method, _params(self))}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_thread(api: FakeBotApi, port: int = 0) -> ThreadingHTTPServer:
+    server = make_server(api, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,177 @@
+# benchmarks/generate.py
+"""
+Synthetic referral-tree datasets for benchmarking.
+
+Shapes:
+  wide    - a few roots with very high fan-out, shallow tree
+  deep    - long single-referrer chains (worst case for level-by-level BFS)
+  skewed  - preferential attachment: a handful of leaders own most of the tree
+  mixed   - random blend of the above
+
+Rows are bulk-inserted with Core executemany in chunks, so 1M users stays
+practical on SQLite. Everything is driven by `seed`, so the same arguments
+always produce the same dataset.
+"""
+import datetime as dt
+import random
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from db.models import Base, User, Deposit, Reward, CompanyPool
+
+SHAPES = ("wide", "deep", "skewed", "mixed")
+CHUNK = 20_000
+
+
+def _parents(n: int, shape: str, rng: random.Random) -> List[Optional[int]]:
+    """parent[i] is the 0-based index of user i's referrer (None for roots)."""
+    parents: List[Optional[int]] = [None] * n
+    if shape == "wide":
+        roots = max(1, n // 100_000)
+        for i in range(roots, n):
+            # 70% attach to a root, the rest to a random earlier user
+            parents[i] = rng.randrange(roots) if rng.random() < 0.7 else rng.randrange(i)
+    elif shape == "deep":
+        chain_len = min(5_000, max(10, n // 20))
+        for i in range(1, n):
+            if i % chain_len:
+                parents[i] = i - 1
+    elif shape == "skewed":
+        # each new user picks a referrer with probability ~ (referrals + 1)
+        tickets = [0]
+        for i in range(1, n):
+            p = tickets[rng.randrange(len(tickets))]
+            parents[i] = p
+            tickets.append(p)
+            tickets.append(i)
+    elif shape == "mixed":
+        tickets = [0]
+        for i in range(1, n):
+            r = rng.random()
+            if r < 0.1 and i > 1:
+                p = i - 1
+            elif r < 0.4:
+                p = rng.randrange(min(i, 50))
+            else:
+                p = tickets[rng.randrange(len(tickets))]
+            parents[i] = p
+            tickets.append(p)
+            tickets.append(i)
+    else:
+        raise ValueError(f"unknown shape {shape!r}; expected one of {SHAPES}")
+    return parents
+
+
+def _insert_chunks(conn, table, rows: List[Dict]) -> None:
+    for i in range(0, len(rows), CHUNK):
+        conn.execute(insert(table), rows[i:i + CHUNK])
+
+
+def generate(engine, users: int = 10_000, shape: str = "skewed", seed: int = 42,
+             active_ratio: float = 0.7, reset: bool = True) -> Dict:
+    """
+    Populate users / deposits / rewards / company_pool. Returns a summary with
+    the ids benchmarks should target (largest downline, a mid-size one, a leaf).
+    """
+    rng = random.Random(seed)
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    parents = _parents(users, shape, rng)
+    base_time = dt.datetime(2024, 1, 1)
+    tg_base = 10_000_000
+
+    user_rows, dep_rows, reward_rows, pool_rows = [], [], [], []
+    dep_id = 0
+    for i in range(users):
+        uid = i + 1
+        active = rng.random() < active_ratio
+        created = base_time + dt.timedelta(minutes=i)
+        total = 0.0
+        first = None
+        if active:
+            for k in range(rng.choice((1, 1, 1, 2, 3))):
+                amount = float(rng.choice((20, 50, 100, 200, 500, 1000))) if k == 0 else float(10 * rng.randint(1, 50))
+                dep_id += 1
+                dep_rows.append({
+                    "id": dep_id, "user_id": uid, "amount_usd": amount,
+                    "musd": round(amount * 0.7, 2), "mstc": round(amount * 0.3, 2),
+                    "approved": True, "created_at": created + dt.timedelta(hours=k),
+                })
+                total += amount
+                first = first if first is not None else amount
+                parent = parents[i]
+                if parent is not None:
+                    reward_rows.append({
+                        "referrer_id": parent + 1, "referred_id": uid, "deposit_id": dep_id,
+                        "percent": 0.05, "amount_usd": round(amount * 0.05, 2),
+                        "status": "credited", "created_at": created + dt.timedelta(hours=k),
+                        "redirected_to_company": False,
+                    })
+                    if rng.random() < 0.02:
+                        pool_rows.append({"amount_usd": round(amount * 0.05, 2), "created_at": created})
+        elif rng.random() < 0.3:
+            # a pending deposit waiting for approval
+            dep_id += 1
+            dep_rows.append({
+                "id": dep_id, "user_id": uid, "amount_usd": 20.0, "musd": 14.0, "mstc": 6.0,
+                "approved": False, "created_at": created,
+            })
+
+        user_rows.append({
+            "id": uid, "telegram_id": tg_base + uid, "username": f"user{uid}",
+            "referred_by_id": parents[i] + 1 if parents[i] is not None else None,
+            "is_active": active, "created_at": created,
+            "total_deposit_usd": total, "earned_total_usd": 0.0,
+            "musd_balance": round(total * 0.7, 2), "mstc_balance": round(total * 0.3, 2),
+            "first_deposit_amount_usd": first,
+            "reactivation_required": False, "reactivated_after_cap": False,
+        })
+
+    with engine.begin() as conn:
+        _insert_chunks(conn, User.__table__, user_rows)
+        _insert_chunks(conn, Deposit.__table__, dep_rows)
+        _insert_chunks(conn, Reward.__table__, reward_rows)
+        _insert_chunks(conn, CompanyPool.__table__, pool_rows)
+
+    # rank checks, /stats and referral checks read rollups / the ancestry
+    # index, which the bulk insert bypasses
+    from services.turnover_service import rebuild_turnover
+    from services.stats_service import rebuild_daily_stats
+    from services.referral_integrity_service import rebuild_ancestry
+    rebuild_turnover(engine)
+    rebuild_daily_stats(engine)
+    rebuild_ancestry(engine)
+
+    return {
+        "users": users,
+        "shape": shape,
+        "seed": seed,
+        "deposits": len(dep_rows),
+        "rewards": len(reward_rows),
+        "company_pool": len(pool_rows),
+        "targets": _targets(parents),
+    }
+
+
+def _targets(parents: List[Optional[int]]) -> Dict[str, int]:
+    """Pick user ids with the largest, a median-ish and an empty downline."""
+    n = len(parents)
+    size = [1] * n
+    # children always have a larger index than their referrer, so one reverse pass suffices
+    for i in range(n - 1, -1, -1):
+        p = parents[i]
+        if p is not None:
+            size[p] += size[i]
+    order = sorted(range(n), key=size.__getitem__)
+    with_downline = [i for i in order if size[i] > 1]
+    mid = with_downline[len(with_downline) // 2] if with_downline else order[-1]
+    return {
+        "leader": order[-1] + 1,
+        "leader_downline": size[order[-1]] - 1,
+        "mid": mid + 1,
+        "mid_downline": size[mid] - 1,
+        "leaf": order[0] + 1,
+    }
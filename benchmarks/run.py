@@ -0,0 +1,185 @@
+# benchmarks/run.py
+"""
+Repeatable service benchmarks on a synthetic dataset.
+
+Usage:
+    python -m benchmarks.run --users 100000 --shape skewed
+    python -m benchmarks.run --database-url postgresql+psycopg2://u:p@localhost/bench --users 1000000
+    python -m benchmarks.run compare benchmarks/results/a.json benchmarks/results/b.json
+
+Each run writes benchmarks/results/<utc time>-<dialect>-<shape>-<users>.json
+containing the environment, dataset summary and per-benchmark timings (ms),
+so results can be diffed across commits with the `compare` sub-command.
+"""
+import argparse
+import datetime as dt
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_DB = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db")
+
+
+def _stats(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        "runs": len(samples_ms),
+        "min_ms": round(samples_ms[0], 3),
+        "median_ms": round(statistics.median(samples_ms), 3),
+        "p95_ms": round(samples_ms[max(0, math.ceil(len(samples_ms) * 0.95) - 1)], 3),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+    }
+
+
+def _time(fn, repeat: int, warmup: int = 1):
+    """Run fn() warmup + repeat times; fn receives the run index."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(warmup + i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _stats(samples)
+
+
+def _bench(results, name, fn, repeat, warmup=1):
+    try:
+        results[name] = _time(fn, repeat, warmup)
+    except Exception as e:
+        # keep going: a broken service is itself a result worth recording
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+    line = results[name]
+    print(f"  {name:<32} " + (f"median {line['median_ms']:>10.3f} ms  p95 {line['p95_ms']:>10.3f} ms"
+                                 if "error" not in line else line["error"][:100]))
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def run(args) -> dict:
+    # db.session binds its engine from config at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    import sqlalchemy
+    from sqlalchemy import select
+    from db.session import engine, SessionLocal
+    from db.models import User, Deposit
+    from benchmarks.generate import generate
+    from services import user_service
+    from services.deposit_service import approve_deposit
+    from services.reward_service import credit_reward
+
+    print(f"generating {args.users} users ({args.shape}, seed={args.seed}) on {engine.dialect.name} ...")
+    t0 = time.perf_counter()
+    dataset = generate(engine, users=args.users, shape=args.shape, seed=args.seed)
+    dataset["generate_seconds"] = round(time.perf_counter() - t0, 2)
+    print(f"  done in {dataset['generate_seconds']}s: {dataset['targets']}")
+
+    with SessionLocal() as session:
+        targets = {k: session.get(User, v) for k, v in dataset["targets"].items() if not k.endswith("_downline")}
+        pending = session.execute(
+            select(Deposit.id, User.telegram_id, User.id, User.referred_by_id)
+            .join(User, User.id == Deposit.user_id)
+            .where(Deposit.approved.is_(False))
+            .order_by(Deposit.id)
+            .limit(args.approvals + 1)
+        ).all()
+
+    results = {}
+    print("benchmarks:")
+    for label, user in targets.items():
+        _bench(results, f"compute_downline[{label}]", lambda i, u=user: user_service.compute_downline(u), args.repeat)
+        _bench(results, f"team_business_usd[{label}]", lambda i, u=user: user_service.team_business_usd(u), args.repeat)
+        _bench(results, f"current_rank[{label}]", lambda i, u=user: user_service.current_rank(u), args.repeat)
+
+    approved = []
+    if len(pending) > 1:
+        def _approve(i):
+            dep_id, tg_id, _, _ = pending[i]
+            approved.append(approve_deposit(tg_id, dep_id))
+        _bench(results, "approve_deposit", _approve, min(args.approvals, len(pending) - 1))
+
+    referred = [(dep, row) for dep, row in zip(approved, pending) if row[3]]
+    if len(referred) > 1:
+        with SessionLocal() as session:
+            users = {u.id: u for u in session.execute(
+                select(User).where(User.id.in_({r[2] for _, r in referred} | {r[3] for _, r in referred}))
+            ).scalars()}
+
+        def _credit(i):
+            dep, row = referred[i]
+            credit_reward(users[row[3]], users[row[2]], dep)
+        _bench(results, "credit_reward", _credit, len(referred) - 1)
+
+    return {
+        "meta": {
+            "timestamp": dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "dialect": engine.dialect.name,
+            "repeat": args.repeat,
+        },
+        "dataset": dataset,
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'benchmark':<34}{'old median':>14}{'new median':>14}{'change':>10}")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a, b = old["results"].get(name, {}), new["results"].get(name, {})
+        if "median_ms" not in a or "median_ms" not in b:
+            print(f"{name:<34}{a.get('median_ms', a.get('error', '-'))!s:>14.14}"
+                  f"{b.get('median_ms', b.get('error', '-'))!s:>14.14}")
+            continue
+        change = (b["median_ms"] - a["median_ms"]) / a["median_ms"] * 100 if a["median_ms"] else 0.0
+        print(f"{name:<34}{a['median_ms']:>14.3f}{b['median_ms']:>14.3f}{change:>+9.1f}%")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        if len(argv) != 3:
+            sys.exit("usage: python -m benchmarks.run compare OLD.json NEW.json")
+        compare(argv[1], argv[2])
+        return
+
+    from benchmarks.generate import SHAPES
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DB))
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--shape", choices=SHAPES, default="skewed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per read benchmark")
+    parser.add_argument("--approvals", type=int, default=50, help="deposits to approve / reward")
+    parser.add_argument("--out", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    os.makedirs(args.out, exist_ok=True)
+    stamp = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.out, f"{stamp}-{report['meta']['dialect']}-{args.shape}-{args.users}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/tenant_memory.py
+"""
+Memory of N bot tenants in one process vs N single-bot processes.
+
+Each process builds the real Applications from bot.py against the local
+fake Bot API, imports the FastAPI app, initializes every bot and pushes a
+few /start updates per tenant through it (so the DB pool, ORM and caches
+are warm), then reports its RSS and PSS. The separate processes are all
+alive when they measure, so PSS splits shared library pages fairly.
+
+Usage:
+    python -m benchmarks.tenant_memory --tenants 5
+    python -m benchmarks.tenant_memory --tenants 10 --updates 50 --json out.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _tenant_defs(indexes):
+    return [{"name": f"t{i}", "token": f"{1000 + i}:MEMBENCH", "admin_ids": [1],
+             "webapp_url": f"http://t{i}.bench.local"} for i in indexes]
+
+
+def _memory_kb() -> dict:
+    out = {}
+    for path, fields in (("/proc/self/status", ("VmRSS",)), ("/proc/self/smaps_rollup", ("Pss",))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key = line.split(":", 1)[0]
+                    if key in fields:
+                        out[key.lower()] = int(line.split()[1])
+        except OSError:
+            pass
+    if "vmrss" not in out:
+        import resource
+        out["vmrss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"rss_kb": out["vmrss"], "pss_kb": out.get("pss")}
+
+
+# ----- Child: one process serving some tenants -----
+async def _warm_up(base_url: str, updates: int) -> None:
+    from telegram import Update
+    from bot import build_application
+    from db.models import Base
+    from db.session import create_tenant_tables
+    from utils.tenancy import all_tenants
+    from benchmarks.bot_load import _update_payload
+    import webapp.app  # noqa: F401  (the web side lives in the same process)
+
+    create_tenant_tables(Base.metadata)
+    apps = [build_application(tenant=t, base_url=base_url) for t in all_tenants()]
+    for app in apps:
+        await app.initialize()
+    for app in apps:
+        for i in range(updates):
+            update = Update.de_json(_update_payload(i + 1, 700_000_000 + i, "/start"), app.bot)
+            try:
+                await app.process_update(update)
+            except Exception:
+                pass
+    for app in apps:
+        await app.shutdown()
+
+
+def child(args) -> None:
+    asyncio.run(_warm_up(args.base_url, args.updates))
+    print("ready", flush=True)
+    sys.stdin.readline()  # measure only once every process has warmed up
+    print(json.dumps(_memory_kb()), flush=True)
+
+
+# ----- Parent -----
+def _spawn(tenants, args, base_url, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, BOT_TENANTS=json.dumps(tenants), TENANT="",
+               BOT_TENANTS_FILE="", JOB_WORKER_THREADS="0")
+    cmd = [sys.executable, "-m", "benchmarks.tenant_memory", "--child",
+           "--base-url", base_url, "--updates", str(args.updates)]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+
+
+def _measure(procs) -> list:
+    for p in procs:
+        line = None
+        while line != "ready":  # skip anything else a module printed
+            line = p.stdout.readline()
+            if not line:
+                raise RuntimeError(f"child failed to start (exit {p.wait()})")
+            line = line.strip()
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+    results = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.wait()
+    return results
+
+
+def run(args) -> dict:
+    from benchmarks.fake_bot_api import FakeBotApi, serve_in_thread
+
+    workdir = tempfile.mkdtemp(prefix="tenant_memory_")
+    server = serve_in_thread(FakeBotApi())
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+    try:
+        shared_db = "sqlite:///" + os.path.join(workdir, "shared.db")
+        shared = _measure([_spawn(_tenant_defs(range(args.tenants)), args, base_url, shared_db)])[0]
+        separate = _measure([
+            _spawn(_tenant_defs([i]), args, base_url, "sqlite:///" + os.path.join(workdir, f"sep{i}.db"))
+            for i in range(args.tenants)
+        ])
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"tenants": args.tenants, "updates_per_tenant": args.updates, "one_process": shared,
+              "separate_processes": separate}
+    for key in ("rss_kb", "pss_kb"):
+        if shared.get(key) is None or any(s.get(key) is None for s in separate):
+            continue
+        total = sum(s[key] for s in separate)
+        report[f"saved_{key}"] = total - shared[key]
+        report[f"separate_total_{key}"] = total
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=20, help="/start updates per tenant before measuring")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args)
+        return 0
+    if args.tenants < 1:
+        parser.error("--tenants must be at least 1")
+
+    report = run(args)
+    mb = lambda kb: f"{kb / 1024:8.1f} MB"  # noqa: E731
+    print(f"{args.tenants} tenant(s), {args.updates} /start updates each")
+    for key, label in (("rss_kb", "RSS"), ("pss_kb", "PSS")):
+        if f"saved_{key}" not in report:
+            continue
+        print(f"{label}: one process {mb(report['one_process'][key])} | "
+              f"{args.tenants} processes {mb(report[f'separate_total_{key}'])} | "
+              f"saved {mb(report[f'saved_{key}'])}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
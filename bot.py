@@ -1,10 +1,15 @@
 # bot.py
 import logging
 import asyncio
+import signal
 from telegram import WebAppInfo, InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.ext import Application, CommandHandler, ContextTypes, TypeHandler
 
 import config
+from db.query_budget import track_application_queries
+from utils.metrics import instrument_application, start_exporter
+from services.job_service import WorkerPool
+from utils.tenancy import Tenant, all_tenants, current_tenant, set_tenant, use_tenant
 
 # Import your existing handler registration functions
 from handlers.user_handlers import register_user_handlers, start as start_handler
@@ -22,13 +27,14 @@ logger = logging.getLogger(__name__)
 # ----- Utility: build webapp button markup for a user -----
 def build_webapp_markup(telegram_id: int):
     """
-    Return InlineKeyboardMarkup containing a button that opens the WebApp
-    URL set in config.WEBAPP_URL with a `ref` query param set to the user's telegram id.
+    Return InlineKeyboardMarkup containing a button that opens the bot tenant's
+    WEBAPP_URL with a `ref` query param set to the user's telegram id and a
+    `tenant` param the page sends back as X-Bot-Tenant.
     """
-    base = config.WEBAPP_URL.rstrip("/") if config.WEBAPP_URL else ""
-    if not base:
+    tenant = current_tenant()
+    if not tenant.webapp_url:
         return None
-    url = f"{base}/webapp?ref={telegram_id}"
+    url = f"{tenant.webapp_url}/webapp?ref={telegram_id}&tenant={tenant.name}"
     webapp_info = WebAppInfo(url=url)
     btn = InlineKeyboardButton(text="💳 Open Deposit Web App", web_app=webapp_info)
     return InlineKeyboardMarkup([[btn]])
@@ -45,7 +51,7 @@ async def open_webapp_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Unable to detect user.")
         return
 
-    if not config.WEBAPP_URL:
+    if not current_tenant().webapp_url:
         await update.message.reply_text("WebApp URL not configured on server.")
         return
 
@@ -69,7 +75,7 @@ async def start_wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.exception("error in original start handler")
 
     # send a separate message with webapp button (so original reply remains as-is)
-    if config.WEBAPP_URL:
+    if current_tenant().webapp_url:
         try:
             user = update.effective_user
             markup = build_webapp_markup(user.id)
@@ -82,12 +88,34 @@ async def start_wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
             logger.exception("failed to send webapp button")
 
 
-# ----- Main registration function -----
-def main():
-    if not config.BOT_TOKEN:
+# ----- Application factory -----
+TENANT_HANDLER_GROUP = -100
+
+
+def _tenant_setter(tenant: Tenant):
+    async def set_update_tenant(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # runs before every other handler group, in the task processing the update
+        set_tenant(tenant)
+    return set_update_tenant
+
+
+def build_application(token: str = None, base_url: str = None, tenant: Tenant = None) -> Application:
+    """
+    Build the bot Application with every handler registered.
+    `base_url` points the bot at another Bot API server (e.g. a local stand-in
+    for load testing); it must end with "/bot" like the default.
+    `tenant` (default: the current one) decides the token, admins, WEBAPP_URL
+    and the data namespace of every update this Application handles.
+    """
+    tenant = tenant or current_tenant()
+    token = token or tenant.token
+    if not token:
         raise RuntimeError("BOT_TOKEN not set in config.py / .env")
 
-    app = Application.builder().token(config.BOT_TOKEN).build()
+    builder = Application.builder().token(token)
+    if base_url:
+        builder = builder.base_url(base_url).base_file_url(base_url.replace("/bot", "/file/bot", 1))
+    app = builder.build()
 
     # Register your existing handlers
     try:
@@ -114,11 +142,63 @@ def main():
     # Optional helper command for convenience
     app.add_handler(CommandHandler("open", open_webapp_cmd))
 
-    logger.info("Starting bot (polling).")
+    # Per-update SQL budget / N+1 warnings and latency histograms for every handler
+    track_application_queries(app)
+    instrument_application(app)
+    app.add_handler(TypeHandler(Update, _tenant_setter(tenant)), group=TENANT_HANDLER_GROUP)
+    return app
+
+
+async def run_tenants(apps) -> None:
+    """Poll every (tenant, Application) pair from this event loop until SIGINT / SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    started = []
+    try:
+        for tenant, app in apps:
+            # tasks the Application creates inherit the tenant as well
+            with use_tenant(tenant):
+                await app.initialize()
+                await app.start()
+                await app.updater.start_polling()
+            started.append(app)
+            logger.info("bot tenant %s polling", tenant.name)
+        await stop.wait()
+    finally:
+        for app in reversed(started):
+            await app.updater.stop()
+            await app.stop()
+            await app.shutdown()
+
+
+# ----- Main registration function -----
+def main():
+    config.log_config_summary()
+    # one Application per bot tenant; they share this process's DB pool, Redis clients and workers
+    apps = [(t, build_application(tenant=t)) for t in all_tenants()]
+
+    # Polling mode has no web server, so expose /metrics from a sidecar port
+    if config.METRICS_PORT:
+        start_exporter(config.METRICS_PORT)
+
+    # Referral rewards and other follow-up work queued by approvals
+    workers = WorkerPool(config.JOB_WORKER_THREADS).start() if config.JOB_WORKER_THREADS else None
+
+    logger.info("Starting %s bot(s) (polling).", len(apps))
     print("Bot is running... CTRL+C to stop")
 
     # Run the bot (polling). Use close_loop=False if you want to reuse loop for other tasks
-    app.run_polling(close_loop=False)
+    try:
+        if len(apps) == 1:
+            apps[0][1].run_polling(close_loop=False)
+        else:
+            asyncio.run(run_tenants(apps))
+    finally:
+        if workers:
+            workers.stop(timeout=10)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 # config.py
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -28,6 +29,11 @@ ADMIN_IDS = [ADMIN_TG_ID] if ADMIN_TG_ID else []
 # ============================
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///referral.db")
 
+# Per Telegram update / HTTP request: warn above this many SQL statements
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+# ...and when one statement shape repeats this often (likely N+1)
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
 
 # ============================
 # REDIS (used for WebApp sessions)
@@ -35,12 +41,71 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///referral.db")
 REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
 
 
+# ============================
+# METRICS
+# ============================
+# Port for the Prometheus exporter started by bot.py in polling mode (0 = off).
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Bearer token the scraper must send to the FastAPI app's /metrics; empty = not served there
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+# ============================
+# WEBAPP SESSION TOKENS
+# ============================
+# "redis"  -> opaque tokens looked up in Redis on every request (default)
+# "signed" -> stateless HMAC-signed tokens verified in-process
+SESSION_TOKEN_MODE = os.getenv("SESSION_TOKEN_MODE", "redis").lower()
+
+# Server key for signed tokens; falls back to a key derived from BOT_TOKEN
+SESSION_SIGNING_KEY = os.getenv("SESSION_SIGNING_KEY", "")
+
+# How often (seconds) each process re-reads the revocation list from Redis
+SESSION_REVOCATION_SYNC_SECONDS = int(os.getenv("SESSION_REVOCATION_SYNC_SECONDS", "5"))
+
+# How long a submission's Idempotency-Key -> response mapping is remembered
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+
+
+# ============================
+# WEBAPP RATE LIMITS (token bucket)
+# ============================
+# burst = bucket size, per_minute = sustained refill rate; 0 disables a rule
+RATE_LIMITS = {
+    "verify": {
+        "burst": int(os.getenv("RATE_LIMIT_VERIFY_BURST", "10")),
+        "per_minute": int(os.getenv("RATE_LIMIT_VERIFY_PER_MINUTE", "30")),
+    },
+    "deposit": {
+        "burst": int(os.getenv("RATE_LIMIT_DEPOSIT_BURST", "5")),
+        "per_minute": int(os.getenv("RATE_LIMIT_DEPOSIT_PER_MINUTE", "10")),
+    },
+}
+
+# Reverse proxies (IPs or CIDRs, comma-separated) whose X-Forwarded-For is
+# believed; empty -> the header is ignored and the peer address is used
+TRUSTED_PROXIES = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+
 # ============================
 # WEBAPP URL (Telegram mini app)
 # ============================
 WEBAPP_URL = os.getenv("WEBAPP_URL", "http://127.0.0.1:8000").rstrip("/")
 
 
+# ============================
+# MULTI-TENANT BOTS (utils/tenancy.py)
+# ============================
+# JSON list of the bots this process serves, inline or in a file:
+#   [{"name": "main", "token": "...", "admin_ids": [1], "webapp_url": "https://a.example", "schema": null},
+#    {"name": "brand2", "token": "...", "admin_ids": [2], "webapp_url": "https://b.example"}]
+# Empty -> a single bot from BOT_TOKEN / ADMIN_IDS / WEBAPP_URL.
+BOT_TENANTS = os.getenv("BOT_TENANTS", "")
+BOT_TENANTS_FILE = os.getenv("BOT_TENANTS_FILE", "")
+# Tenant for code running outside a bot update / web request (scripts); default: the first
+TENANT = os.getenv("TENANT", "")
+
+
 # ============================================================
 #  DEPOSIT SYSTEM CONFIG
 # ============================================================
@@ -56,6 +121,69 @@ MUSD_SPLIT = 0.70
 MSTC_SPLIT = 0.30
 
 
+# ============================================================
+#  ON-CHAIN DEPOSIT VERIFICATION
+# ============================================================
+
+# EVM JSON-RPC endpoint used by the verification worker (empty = worker disabled)
+ONCHAIN_RPC_URL = os.getenv("ONCHAIN_RPC_URL", "")
+
+# Wallet the mini-app asks users to send MUSD/MSTC to
+DEPOSIT_RECEIVER_ADDRESS = os.getenv("DEPOSIT_RECEIVER_ADDRESS", "0x7e6916Af95714BE309cF3eee98149074921D93e0")
+
+# ERC-20 contracts and pricing for the two legs of a deposit
+MUSD_TOKEN_ADDRESS = os.getenv("MUSD_TOKEN_ADDRESS", "")
+MSTC_TOKEN_ADDRESS = os.getenv("MSTC_TOKEN_ADDRESS", "")
+MUSD_TOKEN_DECIMALS = int(os.getenv("MUSD_TOKEN_DECIMALS", "18"))
+MSTC_TOKEN_DECIMALS = int(os.getenv("MSTC_TOKEN_DECIMALS", "18"))
+MSTC_USD_PRICE = float(os.getenv("MSTC_USD_PRICE", "1.0"))
+
+# Accept transfers this many USD short of the expected leg (rounding)
+ONCHAIN_AMOUNT_TOLERANCE_USD = float(os.getenv("ONCHAIN_AMOUNT_TOLERANCE_USD", "0.01"))
+ONCHAIN_MIN_CONFIRMATIONS = int(os.getenv("ONCHAIN_MIN_CONFIRMATIONS", "3"))
+ONCHAIN_BATCH_SIZE = int(os.getenv("ONCHAIN_BATCH_SIZE", "50"))
+ONCHAIN_POLL_SECONDS = float(os.getenv("ONCHAIN_POLL_SECONDS", "15"))
+# Pending deposits read per query; a pass pages through all of them
+ONCHAIN_PAGE_SIZE = int(os.getenv("ONCHAIN_PAGE_SIZE", "500"))
+# Reject a deposit whose tx hashes are still unknown to the node after this many hours
+ONCHAIN_PENDING_MAX_AGE_HOURS = float(os.getenv("ONCHAIN_PENDING_MAX_AGE_HOURS", "24"))
+
+
+# ============================================================
+#  ARCHIVAL (hot/cold rewards & deposits)
+# ============================================================
+
+# Settled rows older than this many days move to the *_archive tables
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# Rows moved per transaction; each batch commits on its own so a run can stop and resume
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+
+# ============================================================
+#  BACKGROUND JOBS (outbox in the `jobs` table)
+# ============================================================
+
+# Worker threads started inside bot.py (0 = run scripts/job_worker.py instead)
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# Failed jobs retry with exponential backoff, then go to the "dead" state
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# A "running" job whose worker has been silent this long is picked up again
+JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "300"))
+
+
+# ============================================================
+#  REFERRAL GRAPH INTEGRITY (reports from scripts/check_referrals.py)
+# ============================================================
+
+# Flag chains where every user has exactly one referral, at least this long
+INTEGRITY_CHAIN_MIN_LENGTH = int(os.getenv("INTEGRITY_CHAIN_MIN_LENGTH", "20"))
+# Flag referrers who brought in this many users within the window
+INTEGRITY_BURST_REFERRALS = int(os.getenv("INTEGRITY_BURST_REFERRALS", "20"))
+INTEGRITY_BURST_WINDOW_MINUTES = int(os.getenv("INTEGRITY_BURST_WINDOW_MINUTES", "60"))
+
+
 # ============================================================
 #  EARNING / CAP CONFIG
 # ============================================================
@@ -117,6 +245,8 @@ REQUIREMENTS = {
     },
 }
 
+# Built-in rank rules (version 0). A published version in the rank_rules table,
+# or RANK_RULES_FILE, overrides them at runtime; see services/rank_rules_service.py.
 # RANK_REWARD_PCT expected by reward_service: map Rank.* -> decimal fraction
 RANK_REWARD_PCT = {
     Rank.ORIGIN: 0.05,       # 5%
@@ -126,18 +256,25 @@ RANK_REWARD_PCT = {
     Rank.CREATOR: 0.25       # 25%
 }
 
+# Optional JSON file with versioned rank rules (takes precedence over the DB table)
+RANK_RULES_FILE = os.getenv("RANK_RULES_FILE", "")
+# How often (seconds) each process checks for a newer rules version
+RANK_RULES_RELOAD_SECONDS = float(os.getenv("RANK_RULES_RELOAD_SECONDS", "30"))
+
 
 # ============================
 # DEBUG SUMMARY
 # ============================
-print("===== CONFIG LOADED =====")
-print("BOT_TOKEN:", "OK" if BOT_TOKEN else "MISSING")
-print("DATABASE_URL:", DATABASE_URL)
-print("REDIS_URL:", REDIS_URL)
-print("WEBAPP_URL:", WEBAPP_URL)
-print("ADMIN_IDS:", ADMIN_IDS)
-print("Deposit Rules: Min=${}, Multiple=${}, Split={}/{}".format(
-    MIN_FIRST_DEPOSIT, SUBSEQUENT_MULTIPLE, int(MUSD_SPLIT*100), int(MSTC_SPLIT*100)
-))
-print("Rank System Loaded, RANK_REWARD_PCT OK")
-print("==========================")
+def log_config_summary(logger: logging.Logger = None):
+    """Log the effective settings; call once logging is configured (bot.py does)."""
+    logger = logger or logging.getLogger("config")
+    logger.info("BOT_TOKEN: %s", "OK" if BOT_TOKEN else "MISSING")
+    logger.info("DATABASE_URL: %s", DATABASE_URL)
+    logger.info("REDIS_URL: %s", REDIS_URL)
+    logger.info("SESSION_TOKEN_MODE: %s", SESSION_TOKEN_MODE)
+    logger.info("WEBAPP_URL: %s", WEBAPP_URL)
+    logger.info("ADMIN_IDS: %s", ADMIN_IDS)
+    logger.info("Bot tenants: %s", BOT_TENANTS_FILE or ("BOT_TENANTS" if BOT_TENANTS else "single (BOT_TOKEN)"))
+    logger.info("Deposit Rules: Min=$%s, Multiple=$%s, Split=%s/%s",
+                MIN_FIRST_DEPOSIT, SUBSEQUENT_MULTIPLE, int(MUSD_SPLIT * 100), int(MSTC_SPLIT * 100))
+    logger.info("Rank rules: %s", RANK_RULES_FILE or "rank_rules table (built-in defaults if empty)")
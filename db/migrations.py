@@ -0,0 +1,118 @@
+# db/migrations.py
+"""
+Bring an existing database up to db.models without a migration tool.
+
+create_all() only creates missing tables; upgrade() also adds the columns,
+indexes and unique constraints that later versions of the models added to
+tables that already exist. Every step checks the live schema first, so it
+is safe to run on every deploy (scripts/init_db.py does).
+
+New columns are added nullable and set to their scalar default where the
+model has one; unique constraints are added as unique indexes, which
+SQLite can do and behave the same. Data derived from other tables
+(ancestry index, rollups) is left to the rebuild_* services, which
+scripts/init_db.py runs when upgrade() changed an existing database.
+"""
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import UniqueConstraint, inspect, text
+
+from db.session import create_tenant_tables, engine, tenant_bind
+from utils.tenancy import Tenant
+
+_quote = engine.dialect.identifier_preparer.quote
+
+
+def _table_ref(table: str, schema) -> str:
+    return f"{_quote(schema)}.{_quote(table)}" if schema else _quote(table)
+
+
+def _wanted_indexes(table) -> Iterator[Tuple[str, Tuple[str, ...], bool]]:
+    """(name, columns, unique) for every index and unique constraint of `table`."""
+    for idx in table.indexes:
+        yield idx.name, tuple(c.name for c in idx.columns), bool(idx.unique)
+    for con in table.constraints:
+        if isinstance(con, UniqueConstraint):
+            cols = tuple(c.name for c in con.columns)
+            yield con.name or f"uq_{table.name}_{'_'.join(cols)}", cols, True
+
+
+def _add_columns(conn, insp, table, schema) -> List[str]:
+    have = {c["name"] for c in insp.get_columns(table.name, schema=schema)}
+    added = []
+    for col in table.columns:
+        if col.name in have:
+            continue
+        if not col.nullable and col.default is None and col.server_default is None:
+            raise RuntimeError(f"cannot add NOT NULL column {table.name}.{col.name} without a default")
+        conn.execute(text(
+            f"ALTER TABLE {_table_ref(table.name, schema)} "
+            f"ADD COLUMN {_quote(col.name)} {col.type.compile(dialect=engine.dialect)}"
+        ))
+        if col.default is not None and col.default.is_scalar:
+            conn.execute(table.update().where(col.is_(None)).values({col.name: col.default.arg}))
+        added.append(f"{table.name}.{col.name}")
+    return added
+
+
+def _add_indexes(conn, insp, table, schema) -> List[str]:
+    names = set()
+    have = set()  # (columns, unique)
+    for idx in insp.get_indexes(table.name, schema=schema):
+        names.add(idx["name"])
+        have.add((tuple(idx["column_names"]), bool(idx["unique"])))
+    for con in insp.get_unique_constraints(table.name, schema=schema):
+        names.add(con["name"])
+        have.add((tuple(con["column_names"]), True))
+    pk = insp.get_pk_constraint(table.name, schema=schema).get("constrained_columns") or []
+    have.add((tuple(pk), True))
+
+    added = []
+    for name, cols, unique in _wanted_indexes(table):
+        if name in names or (cols, True) in have or (not unique and (cols, False) in have):
+            continue
+        if schema and engine.dialect.name == "sqlite":
+            # an attached database: the index is named in it, the table is not
+            target, on = _table_ref(name, schema), _quote(table.name)
+        else:
+            target, on = _quote(name), _table_ref(table.name, schema)
+        cols_sql = ", ".join(_quote(c) for c in cols)
+        conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {target} ON {on} ({cols_sql})"))
+        added.append(name)
+    return added
+
+
+def _schema_exists(schema) -> bool:
+    if not schema:
+        return True
+    insp = inspect(engine)
+    if engine.dialect.name == "sqlite":
+        return schema in insp.get_schema_names()
+    return insp.has_schema(schema)
+
+
+def upgrade(metadata, tenant: Tenant) -> Dict[str, List[str]]:
+    """
+    Create missing tables, then add missing columns and indexes to the
+    existing ones, in `tenant`'s schema. Returns what was done:
+    {"existing_tables": [...], "tables": [...], "columns": [...], "indexes": [...]}.
+    A unique index fails on rows that already violate it; fix those and re-run.
+    """
+    schema = tenant.schema
+    existing = set(inspect(engine).get_table_names(schema=schema)) if _schema_exists(schema) else set()
+    create_tenant_tables(metadata, [tenant])
+
+    report = {"existing_tables": sorted(existing), "tables": [], "columns": [], "indexes": []}
+    with tenant_bind(tenant).begin() as conn:
+        insp = inspect(conn)
+        for table in metadata.sorted_tables:
+            if table.name not in existing:
+                report["tables"].append(table.name)
+                continue
+            report["columns"] += _add_columns(conn, insp, table, schema)
+        insp = inspect(conn)  # fresh reflection cache after the ALTERs
+        for table in metadata.sorted_tables:
+            if table.name in existing:
+                report["indexes"] += _add_indexes(conn, insp, table, schema)
+    return report
+
@@ -1,5 +1,5 @@
 import datetime as dt
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, Float, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -12,6 +12,14 @@ class User(Base):
     telegram_id = Column(Integer, unique=True, index=True, nullable=False)
     username = Column(String, nullable=True)
     referred_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    referred_at = Column(DateTime, nullable=True)
+    # ancestry index (services/referral_integrity_service.py): top of the
+    # referral tree and distance to it; root_id is NULL for roots themselves
+    root_id = Column(Integer, nullable=True, index=True)
+    referral_depth = Column(Integer, default=0)
+    # wallet the user sends on-chain deposits from (lowercase 0x address);
+    # the verifier only counts transfers from it
+    wallet_address = Column(String, unique=True, index=True, nullable=True)
 
     is_active = Column(Boolean, default=False)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
@@ -33,6 +41,8 @@ class User(Base):
 
 class Deposit(Base):
     __tablename__ = "deposits"
+    # ids move to deposits_archive unchanged, so SQLite must never reuse one
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -41,12 +51,24 @@ class Deposit(Base):
     mstc = Column(Float, default=0.0)
     approved = Column(Boolean, default=False)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
+    approved_at = Column(DateTime, nullable=True)
+
+    # on-chain transfers submitted from the mini-app
+    # unique: the same transfer can never back two deposits
+    tx_musd = Column(String, unique=True, index=True, nullable=True)
+    tx_mstc = Column(String, unique=True, index=True, nullable=True)
+    rejected = Column(Boolean, default=False)
+    reject_reason = Column(String, nullable=True)
 
     user = relationship("User", back_populates="deposits")
 
 
 class Reward(Base):
     __tablename__ = "rewards"
+    # one reward per (deposit, referrer): a retried job can never pay twice
+    # sqlite_autoincrement: ids move to rewards_archive unchanged, never reuse one
+    __table_args__ = (UniqueConstraint("deposit_id", "referrer_id", name="uq_reward_deposit_referrer"),
+                      {"sqlite_autoincrement": True})
 
     id = Column(Integer, primary_key=True)
     referrer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -66,3 +88,135 @@ class CompanyPool(Base):
     id = Column(Integer, primary_key=True)
     amount_usd = Column(Float, default=0.0)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
+
+
+class MonthlyTurnover(Base):
+    """
+    Per-user, per-month rollup kept up to date on every approval, so rank and
+    club checks read a few indexed rows instead of walking the downline.
+    team_* columns cover the whole downline (not the user themself).
+    """
+    __tablename__ = "monthly_turnover"
+    __table_args__ = (UniqueConstraint("user_id", "month", name="uq_monthly_turnover_user_month"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String(7), nullable=False, index=True)  # "YYYY-MM"
+    personal_usd = Column(Float, default=0.0)
+    team_usd = Column(Float, default=0.0)
+    team_activations = Column(Integer, default=0)
+
+
+class ClubPayout(Base):
+    __tablename__ = "club_payouts"
+    __table_args__ = (UniqueConstraint("user_id", "month", name="uq_club_payout_user_month"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String(7), nullable=False, index=True)
+    rank = Column(String, nullable=False)
+    team_turnover_usd = Column(Float, nullable=False)
+    percent = Column(Float, nullable=False)
+    amount_usd = Column(Float, nullable=False)
+    status = Column(String, default="credited")
+    created_at = Column(DateTime, default=dt.datetime.utcnow)
+
+
+class DailyStats(Base):
+    """One row per UTC day, bumped by the services as events happen (see services/stats_service.py)."""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, default=0)
+    activations = Column(Integer, default=0)
+    deposits_created = Column(Integer, default=0)
+    deposits_created_usd = Column(Float, default=0.0)
+    deposits_approved = Column(Integer, default=0)
+    deposits_approved_usd = Column(Float, default=0.0)
+    deposits_rejected = Column(Integer, default=0)
+    rewards_credited = Column(Integer, default=0)
+    rewards_usd = Column(Float, default=0.0)
+    company_pool_usd = Column(Float, default=0.0)
+
+
+class RankRuleSet(Base):
+    """Published rank rules; the highest version is live (services/rank_rules_service.py)."""
+    __tablename__ = "rank_rules"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, unique=True, nullable=False)
+    rules = Column(Text, nullable=False)  # JSON: {"ranks": [{name, team_business, ...}, ...]}
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=dt.datetime.utcnow)
+
+
+class Job(Base):
+    """
+    Transactional outbox: written in the same transaction as the change that
+    needs follow-up work, consumed by services/job_service.py workers.
+    At most one job per (kind, deposit_id).
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (UniqueConstraint("kind", "deposit_id", name="uq_job_kind_deposit"),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    deposit_id = Column(Integer, nullable=True)
+    status = Column(String, default="pending", index=True)  # pending / running / done / dead
+    attempts = Column(Integer, default=0)
+    run_after = Column(DateTime, default=dt.datetime.utcnow, index=True)
+    claim_token = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=dt.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# ----- Cold storage (see services/archive_service.py) -----
+# Same columns as the hot tables, ids preserved, no foreign keys.
+
+class DepositArchive(Base):
+    __tablename__ = "deposits_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    amount_usd = Column(Float, nullable=False)
+    musd = Column(Float, default=0.0)
+    mstc = Column(Float, default=0.0)
+    approved = Column(Boolean, default=False)
+    created_at = Column(DateTime, index=True)
+    approved_at = Column(DateTime, nullable=True)
+    tx_musd = Column(String, index=True, nullable=True)
+    tx_mstc = Column(String, index=True, nullable=True)
+    rejected = Column(Boolean, default=False)
+    reject_reason = Column(String, nullable=True)
+    archived_at = Column(DateTime, default=dt.datetime.utcnow)
+
+
+class RewardArchive(Base):
+    __tablename__ = "rewards_archive"
+
+    id = Column(Integer, primary_key=True)
+    referrer_id = Column(Integer, nullable=False, index=True)
+    referred_id = Column(Integer, nullable=False)
+    deposit_id = Column(Integer, nullable=False)
+    percent = Column(Float, nullable=False)
+    amount_usd = Column(Float, nullable=False)
+    status = Column(String, default="credited")
+    created_at = Column(DateTime, index=True)
+    redirected_to_company = Column(Boolean, default=False)
+    archived_at = Column(DateTime, default=dt.datetime.utcnow)
+
+
+class ArchiveSummary(Base):
+    """Per user / month / status totals of everything moved to cold storage."""
+    __tablename__ = "archive_summary"
+    __table_args__ = (UniqueConstraint("table_name", "user_id", "month", "status", name="uq_archive_summary"),)
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    month = Column(String(7), nullable=False)
+    status = Column(String, nullable=False)
+    rows = Column(Integer, default=0)
+    amount_usd = Column(Float, default=0.0)
@@ -0,0 +1,147 @@
+# db/query_budget.py
+"""
+Per-unit-of-work SQL accounting: how many statements a Telegram update or
+HTTP request issued, how long they took, and which statement shapes were
+repeated (the usual N+1 signature).
+
+    with track_queries("status_cmd"):
+        ...                       # logged if over QUERY_BUDGET or N+1-ish
+
+    with assert_max_queries(3):   # for tests / benchmarks
+        approve_deposit(tg_id, dep_id)
+
+Trackers live in a contextvar, so concurrent updates in the bot's event
+loop and requests in FastAPI's threadpool are counted independently.
+"""
+import contextvars
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+
+from config import QUERY_BUDGET, QUERY_REPEAT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("query_tracker", default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_POSTCOMPILE_RE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL string so executions differing only in literals compare equal."""
+    s = _STRING_RE.sub("?", statement)
+    s = _NUMBER_RE.sub("?", s)
+    s = _POSTCOMPILE_RE.sub("(?)", s)
+    s = _IN_LIST_RE.sub("IN (...)", s)
+    return _SPACE_RE.sub(" ", s).strip()
+
+
+class QueryTracker:
+    def __init__(self, label: str, budget: Optional[int] = QUERY_BUDGET,
+                 repeat_threshold: int = QUERY_REPEAT_THRESHOLD):
+        self.label = label
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def merge_into(self, other: "QueryTracker") -> None:
+        other.count += self.count
+        other.seconds += self.seconds
+        other.shapes.update(self.shapes)
+
+    def repeated(self):
+        """[(shape, times)] for shapes executed at least repeat_threshold times."""
+        return [(s, n) for s, n in self.shapes.most_common() if n >= self.repeat_threshold]
+
+    def summary(self, top: int = 3) -> str:
+        shapes = "; ".join(f"{n}x {s[:160]}" for s, n in self.shapes.most_common(top))
+        return f"{self.label}: {self.count} queries in {self.seconds * 1000:.1f} ms [{shapes}]"
+
+    def report(self) -> None:
+        if self.budget is not None and self.count > self.budget:
+            logger.warning("query budget exceeded (%s > %s) %s", self.count, self.budget, self.summary())
+        for shape, n in self.repeated():
+            logger.warning("possible N+1 in %s: %sx %s", self.label, n, shape[:300])
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_budget_t0", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current.get()
+    started = conn.info.get("_budget_t0")
+    if tracker is None or not started:
+        return
+    tracker.record(statement, time.perf_counter() - started.pop())
+
+
+def install(engine) -> None:
+    """Attach the statement listeners to `engine` (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+@contextmanager
+def track_queries(label: str, budget: Optional[int] = QUERY_BUDGET, report: bool = True):
+    """
+    Count statements issued inside the block. Nested trackers roll their
+    totals up into the enclosing one.
+    """
+    tracker = QueryTracker(label, budget)
+    parent = _current.get()
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+        if parent is not None:
+            tracker.merge_into(parent)
+        if report:
+            tracker.report()
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "block"):
+    """Test helper: fail if the block issues more than `limit` statements."""
+    with track_queries(label, budget=None, report=False) as tracker:
+        yield tracker
+    if tracker.count > limit:
+        raise AssertionError(f"expected at most {limit} queries, got {tracker.summary(top=10)}")
+
+
+def tracked_handler(command: str, callback):
+    """Wrap an async telegram handler so each update gets its own tracker."""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        with track_queries(f"/{command}"):
+            return await callback(update, context)
+    return wrapper
+
+
+def track_application_queries(app) -> None:
+    """Apply tracked_handler to every handler registered on a telegram Application."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            commands = getattr(handler, "commands", None)
+            command = sorted(commands)[0] if commands else handler.callback.__name__
+            handler.callback = tracked_handler(command, handler.callback)
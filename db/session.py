@@ -1,7 +1,58 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateSchema
 from config import DATABASE_URL
+from db import query_budget
+from utils.metrics import instrument_engine
+from utils.tenancy import Tenant, all_tenants, current_tenant
 
 
 engine = create_engine(DATABASE_URL, future=True)
-SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
\ No newline at end of file
+instrument_engine(engine)
+query_budget.install(engine)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+
+# ----- Tenants: one engine / pool, one schema per tenant -----
+if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+    # SQLite has no schemas; each tenant schema is a database file next to the main one
+    _stem, _ext = os.path.splitext(engine.url.database)
+
+    @event.listens_for(engine, "connect")
+    def _attach_tenant_databases(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for t in all_tenants():
+            if t.schema:
+                cursor.execute(f"ATTACH DATABASE ? AS {t.schema}", (f"{_stem}_{t.schema}{_ext or '.db'}",))
+        cursor.close()
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _use_tenant_schema(session, transaction, connection):
+    schema = current_tenant().schema
+    if schema:
+        connection.execution_options(schema_translate_map={None: schema})
+
+
+_binds = {}
+
+
+def tenant_bind(tenant: Tenant = None):
+    """The shared engine, routed to `tenant`'s schema (default: the current tenant)."""
+    tenant = tenant or current_tenant()
+    if not tenant.schema:
+        return engine
+    if tenant.name not in _binds:
+        _binds[tenant.name] = engine.execution_options(schema_translate_map={None: tenant.schema})
+    return _binds[tenant.name]
+
+
+def create_tenant_tables(metadata, tenants=None) -> None:
+    """create_all() in every tenant's schema, creating the schema where the database has them."""
+    for t in tenants or all_tenants():
+        if t.schema and engine.dialect.name != "sqlite":
+            with engine.begin() as conn:
+                conn.execute(CreateSchema(t.schema, if_not_exists=True))
+        metadata.create_all(tenant_bind(t))
@@ -1,16 +1,26 @@
 # handlers/admin_handlers.py
+import datetime as dt
 from telegram.ext import Application, CommandHandler
 from telegram import Update
 from telegram.constants import ParseMode
+from sqlalchemy.orm import joinedload
 from db.session import SessionLocal
-from db.models import Deposit, User
-from config import ADMIN_IDS
+from db.models import Deposit
 from services.deposit_service import approve_deposit
-from services.reward_service import credit_reward
+from services.turnover_service import pay_club_bonuses
+from services.stats_service import get_daily_stats
+from services.archive_service import user_history
+from services.job_service import job_counts, dead_jobs, requeue_job
+from services.rank_rules_service import get_rules
+from utils.tenancy import current_tenant
+from webapp.telegram_init_verify import ban_telegram_id, unban_telegram_id
+
+BAN_FOREVER_SECONDS = 10 * 365 * 24 * 3600
+
 
 def admin_only(func):
     async def wrapper(update: Update, context):
-        if update.effective_user.id not in ADMIN_IDS:
+        if update.effective_user.id not in current_tenant().admin_ids:
             await update.message.reply_text("Admins only.")
             return
         return await func(update, context)
@@ -20,7 +30,14 @@ def admin_only(func):
 @admin_only
 async def pending_cmd(update: Update, context):
     with SessionLocal() as session:
-        rows = session.query(Deposit).filter(Deposit.approved == False).order_by(Deposit.created_at.asc()).all()
+        # load users in the same query: one SELECT instead of one per row
+        rows = (
+            session.query(Deposit)
+            .options(joinedload(Deposit.user))
+            .filter(Deposit.approved == False, Deposit.rejected.isnot(True))
+            .order_by(Deposit.created_at.asc())
+            .all()
+        )
     if not rows:
         await update.message.reply_text("No pending deposits.")
         return
@@ -45,23 +62,164 @@ async def approve_deposit_cmd(update: Update, context):
         return
 
     try:
+        # the referral reward is queued in the same transaction and paid by a job worker
         dep = approve_deposit(tg_id, dep_id)
     except Exception as e:
         await update.message.reply_text(str(e))
         return
 
-    # after approval, process reward to direct referrer (if any)
-    with SessionLocal() as session:
-        user = session.query(User).filter(User.id == dep.user_id).one()
-        if user.referred_by_id:
-            ref = session.query(User).get(user.referred_by_id)
-            # credit_reward handles cap/grace/redirect logic
-            credit_reward(ref, user, dep)
+    await update.message.reply_text(f"Approved deposit {dep.id} for {tg_id}. User active=Yes. Referral reward queued.")
+
+
+@admin_only
+async def club_payout_cmd(update: Update, context):
+    """/club_payout [YYYY-MM] - pay the monthly club bonus (default: last month)."""
+    month = context.args[0] if context.args else None
+    try:
+        s = pay_club_bonuses(month)
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+    await update.message.reply_text(
+        f"Club bonus {s['month']}: {s['credited']} credited (${s['amount_usd']:.2f}), "
+        f"{s['grace_wait']} in grace, {s['redirected']} redirected to company pool."
+    )
+
+
+# longest /stats reply that fits one Telegram message
+STATS_CMD_MAX_DAYS = 31
+
+
+@admin_only
+async def stats_cmd(update: Update, context):
+    """/stats [days] - daily deposits, approvals, users, activations, rewards and pool inflow."""
+    try:
+        days = int(context.args[0]) if context.args else 7
+    except ValueError:
+        await update.message.reply_text("Usage: /stats [days]")
+        return
+    try:
+        stats = get_daily_stats(min(max(days, 1), STATS_CMD_MAX_DAYS))
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+
+    lines = [f"<b>Stats {stats['from']} → {stats['to']}</b>",
+             "<pre>day        users act  dep   appr   $appr  rew    $rew   $pool"]
+    for d in stats["days"] + [dict(stats["totals"], day="total")]:
+        lines.append(
+            f"{d['day'][5:] if d['day'] != 'total' else 'total':<10} {d['new_users']:>5} {d['activations']:>3} "
+            f"{d['deposits_created']:>4} {d['deposits_approved']:>6} {d['deposits_approved_usd']:>7.0f} "
+            f"{d['rewards_credited']:>4} {d['rewards_usd']:>7.2f} {d['company_pool_usd']:>7.2f}"
+        )
+    lines.append("</pre>")
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+@admin_only
+async def history_cmd(update: Update, context):
+    """/history <telegram_id> - deposit and reward totals, including archived rows."""
+    try:
+        tg_id = int(context.args[0])
+    except (IndexError, ValueError):
+        await update.message.reply_text("Usage: /history <telegram_id>")
+        return
+    try:
+        h = user_history(tg_id)
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+
+    lines = [f"<b>History for {tg_id}</b>"]
+    for table in ("deposits", "rewards"):
+        lines.append(f"<b>{table.capitalize()}</b>")
+        if not h[table]:
+            lines.append("  none")
+        for status, cell in sorted(h[table].items()):
+            lines.append(f"  {status}: {cell['rows']} (${cell['amount_usd']:.2f})")
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+@admin_only
+async def jobs_cmd(update: Update, context):
+    """/jobs - background job counts by status and the latest dead jobs."""
+    counts = job_counts()
+    lines = ["<b>Jobs</b>"]
+    for status in ("pending", "running", "done", "dead"):
+        lines.append(f"{status}: {counts.get(status, 0)}")
+    for job in dead_jobs(10):
+        lines.append(f"dead #{job.id} {job.kind} dep {job.deposit_id}: {job.last_error or ''}"[:200])
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+@admin_only
+async def retry_job_cmd(update: Update, context):
+    """/retry_job <job_id> - requeue a dead job."""
+    try:
+        job = requeue_job(int(context.args[0]))
+    except (IndexError, ValueError) as e:
+        await update.message.reply_text(str(e) if context.args else "Usage: /retry_job <job_id>")
+        return
+    await update.message.reply_text(f"Job {job.id} requeued.")
 
-    await update.message.reply_text(f"Approved deposit {dep.id} for {tg_id}. User active=Yes. Referral processed.")
+
+@admin_only
+async def ban_cmd(update: Update, context):
+    """/ban <telegram_id> [hours] - lock a user out of the mini-app (default: until /unban)."""
+    try:
+        tg_id = int(context.args[0])
+        hours = float(context.args[1]) if len(context.args) > 1 else None
+        if hours is not None and hours <= 0:
+            raise ValueError
+    except (IndexError, ValueError):
+        await update.message.reply_text("Usage: /ban <telegram_id> [hours]")
+        return
+    try:
+        until = ban_telegram_id(tg_id, BAN_FOREVER_SECONDS if hours is None else int(hours * 3600))
+    except Exception as e:
+        await update.message.reply_text(f"Ban failed: {e}")
+        return
+    when = "until /unban" if hours is None else dt.datetime.utcfromtimestamp(until).strftime("until %Y-%m-%d %H:%M UTC")
+    await update.message.reply_text(f"User {tg_id} banned from the mini-app {when}.")
+
+
+@admin_only
+async def unban_cmd(update: Update, context):
+    """/unban <telegram_id> - lift a mini-app ban."""
+    try:
+        tg_id = int(context.args[0])
+    except (IndexError, ValueError):
+        await update.message.reply_text("Usage: /unban <telegram_id>")
+        return
+    try:
+        unban_telegram_id(tg_id)
+    except Exception as e:
+        await update.message.reply_text(f"Unban failed: {e}")
+        return
+    await update.message.reply_text(f"User {tg_id} unbanned.")
+
+
+@admin_only
+async def rank_rules_cmd(update: Update, context):
+    """/rank_rules - the live rank rules version and thresholds."""
+    rules = get_rules()
+    lines = [f"<b>Rank rules v{rules.version}</b>", "<pre>rank          team$  active  club$  club%  reward%"]
+    for r in rules.ranks:
+        lines.append(f"{r['name'][:12]:<12} {r['team_business']:>7.0f} {r['active_origin']:>7} "
+                     f"{r['monthly_club']:>6.0f} {r['club_turnover_percent']:>6.1f} {r['reward_percent']:>8.1f}")
+    lines.append("</pre>")
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
 
 
 def register_admin_handlers(app: Application):
     """Register admin command handlers."""
     app.add_handler(CommandHandler("pending", pending_cmd))
     app.add_handler(CommandHandler("approve_deposit", approve_deposit_cmd))
+    app.add_handler(CommandHandler("club_payout", club_payout_cmd))
+    app.add_handler(CommandHandler("stats", stats_cmd))
+    app.add_handler(CommandHandler("history", history_cmd))
+    app.add_handler(CommandHandler("jobs", jobs_cmd))
+    app.add_handler(CommandHandler("retry_job", retry_job_cmd))
+    app.add_handler(CommandHandler("rank_rules", rank_rules_cmd))
+    app.add_handler(CommandHandler("ban", ban_cmd))
+    app.add_handler(CommandHandler("unban", unban_cmd))
@@ -15,6 +15,7 @@ from telegram.ext import (
 
 import config
 from services.user_service import get_or_create_user, set_referrer_if_first_time, current_rank, earning_cap_left
+from utils.tenancy import current_tenant
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +26,16 @@ logger = logging.getLogger(__name__)
 def build_webapp_markup_for_user(telegram_id: int):
     """
     Build InlineKeyboardMarkup that opens the Telegram Web App.
-    Expects config.WEBAPP_URL to point at the publicly accessible
+    Expects the bot tenant's WEBAPP_URL to point at the publicly accessible
     /static/index.html path (ngrok or production).
     """
-    base = config.WEBAPP_URL.rstrip("/") if getattr(config, "WEBAPP_URL", None) else ""
-    if not base:
+    tenant = current_tenant()
+    if not tenant.webapp_url:
         return None
 
-    # include ref query param for UI convenience (do not trust it server-side)
-    url = f"{base}?ref={telegram_id}"
+    # include ref query param for UI convenience (do not trust it server-side);
+    # the page sends `tenant` back as X-Bot-Tenant
+    url = f"{tenant.webapp_url}?ref={telegram_id}&tenant={tenant.name}"
     webapp_info = WebAppInfo(url=url)
     btn = InlineKeyboardButton(text="💳 Open Deposit Web App", web_app=webapp_info)
     return InlineKeyboardMarkup([[btn]])
@@ -69,7 +71,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # If there is a referral id, set it if user is first time
         if ref_from:
             try:
-                set_referrer_if_first_time(user.id, int(ref_from))
+                set_referrer_if_first_time(user, int(ref_from))
             except Exception as e:
                 logger.exception("set_referrer_if_first_time failed: %s", e)
 
@@ -86,7 +88,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(welcome)
 
         # Then send a WebApp button if WEBAPP_URL is configured
-        if tg_user and getattr(config, "WEBAPP_URL", None):
+        if tg_user and current_tenant().webapp_url:
             markup = build_webapp_markup_for_user(tg_user.id)
             if markup:
                 await update.message.reply_text("Open the deposit Web App:", reply_markup=markup)
@@ -127,7 +129,7 @@ async def link_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # If WEBAPP_URL configured -> send WebApp button
-    if getattr(config, "WEBAPP_URL", None):
+    if current_tenant().webapp_url:
         markup = build_webapp_markup_for_user(tg_user.id)
         if markup:
             await update.message.reply_text("Open your deposit & referral mini app:", reply_markup=markup)
@@ -149,7 +151,7 @@ async def deposit_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     tg_user = update.effective_user
     # If WebApp available, send its button so user can open and deposit
-    if getattr(config, "WEBAPP_URL", None):
+    if current_tenant().webapp_url:
         markup = build_webapp_markup_for_user(tg_user.id) if tg_user else None
         if markup:
             await update.message.reply_text("To deposit, open the WebApp (inside Telegram):", reply_markup=markup)
@@ -173,9 +175,8 @@ async def status_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         user = get_or_create_user(tg_user)
-        # current_rank and earning_cap_left are expected to be implemented in services.user_service
-        rank = current_rank(user.id)
-        cap_left = earning_cap_left(user.id)
+        rank = current_rank(user)
+        cap_left = earning_cap_left(user)
         msg = f"Your rank: {rank}\nEarning cap left (USD): {cap_left:.2f}"
         await update.message.reply_text(msg)
     except Exception as e:
@@ -0,0 +1,41 @@
+# scripts/archive_old_rows.py
+"""
+Move settled rewards and deposits older than N days into the archive tables.
+Safe to stop at any point and re-run: every batch commits on its own.
+
+Usage:
+    python scripts/archive_old_rows.py                 # config.ARCHIVE_AFTER_DAYS
+    python scripts/archive_old_rows.py --days 90 --batch-size 2000 --max-batches 10
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE  # noqa: E402
+from db.models import Base  # noqa: E402
+from db.session import tenant_bind  # noqa: E402
+from services.archive_service import ARCHIVES, archive_old_rows  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hot/cold archival of rewards and deposits")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None, help="per table; default: until done")
+    parser.add_argument("--table", choices=sorted(ARCHIVES), action="append",
+                        help="limit to one table (repeatable); default: rewards then deposits")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(tenant_bind())
+    moved = archive_old_rows(args.days, args.batch_size, args.max_batches,
+                             tuple(args.table) if args.table else ("rewards", "deposits"))
+    for table, n in moved.items():
+        print(f"{table}: {n} rows archived")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# scripts/bench_session_tokens.py
+"""
+Compare session lookup cost: Redis-backed get_session vs signed tokens.
+
+Usage:
+    python scripts/bench_session_tokens.py [iterations]
+
+Needs a reachable REDIS_URL for the Redis half; the signed half runs anywhere.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis  # noqa: E402
+
+from webapp.telegram_init_verify import (  # noqa: E402
+    _redis_create_session,
+    create_signed_session_for_params,
+    get_session,
+)
+
+
+def _bench(label: str, fn, iterations: int) -> None:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    samples.sort()
+    p50 = samples[len(samples) // 2] / 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] / 1000
+    mean = statistics.fmean(samples) / 1000
+    print(f"{label:<10} n={iterations:<7} mean={mean:9.2f}us  p50={p50:9.2f}us  p99={p99:9.2f}us")
+
+
+def main(iterations: int = 20000) -> None:
+    params = {"id": "123456789", "username": "bench_user"}
+
+    signed = create_signed_session_for_params(params)["token"]
+    get_session(signed)  # warm the revocation mirror
+    _bench("signed", lambda: get_session(signed), iterations)
+
+    try:
+        opaque = _redis_create_session(params)["token"]
+    except redis.RedisError as e:
+        print(f"redis      skipped ({e})")
+        return
+    _bench("redis", lambda: get_session(opaque), iterations)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,132 @@
+# scripts/build_static.py
+"""
+Build the mini-app's static assets for production serving.
+
+- every non-HTML file is copied under a content-hashed name (logo.3f2a9c1b0d4e.png)
+- HTML entry points keep their name; references to assets are rewritten to
+  the hashed /static/... URLs
+- compressible files get .gz (and .br when the `brotli` package is installed)
+  siblings so the server never compresses per request
+- manifest.json maps logical names to the built files for webapp/static_assets.py
+
+Usage:
+    python scripts/build_static.py [src_dir] [out_dir]
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only build
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SRC = os.path.join(ROOT, "webapp", "web_static")
+DEFAULT_OUT = os.path.join(ROOT, "webapp", "static_dist")
+
+URL_PREFIX = "/static/"
+HASH_LEN = 12
+# below this, compression overhead beats the savings
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def _content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _is_html(name: str) -> bool:
+    return name.endswith((".html", ".htm"))
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def _rewrite_refs(text: str, mapping: dict) -> str:
+    """Point ./logo.png, logo.png and /static/logo.png at the hashed URL."""
+    for logical, built in mapping.items():
+        pattern = r'(?<=["\'(])(?:\./|/static/)?' + re.escape(logical) + r'(?=["\')?#])'
+        text = re.sub(pattern, URL_PREFIX + built, text)
+    return text
+
+
+def _write_variants(out_dir: str, name: str, data: bytes) -> list:
+    encodings = []
+    if len(data) < MIN_COMPRESS_BYTES or not _content_type(name).startswith(COMPRESSIBLE_TYPES):
+        return encodings
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            with open(os.path.join(out_dir, name + ".br"), "wb") as f:
+                f.write(br)
+            encodings.append("br")
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(os.path.join(out_dir, name + ".gz"), "wb") as f:
+            f.write(gz)
+        encodings.append("gzip")
+    return encodings
+
+
+def build(src_dir: str = DEFAULT_SRC, out_dir: str = DEFAULT_OUT) -> dict:
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    files = {}
+    for dirpath, _, filenames in os.walk(src_dir):
+        for fn in filenames:
+            full = os.path.join(dirpath, fn)
+            logical = os.path.relpath(full, src_dir).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                files[logical] = f.read()
+
+    manifest = {}
+    mapping = {}
+    # assets first so HTML can reference their hashed names
+    for logical in sorted(n for n in files if not _is_html(n)):
+        data = files[logical]
+        digest = _digest(data)
+        built = _hashed_name(logical, digest)
+        mapping[logical] = built
+        manifest[logical] = {"file": built, "etag": digest, "immutable": True}
+
+    for logical in sorted(n for n in files if _is_html(n)):
+        data = _rewrite_refs(files[logical].decode("utf-8"), mapping).encode("utf-8")
+        files[logical] = data
+        manifest[logical] = {"file": logical, "etag": _digest(data), "immutable": False}
+
+    for logical, entry in manifest.items():
+        target = os.path.join(out_dir, entry["file"])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(files[logical])
+        entry["content_type"] = _content_type(logical)
+        entry["encodings"] = _write_variants(os.path.dirname(target), os.path.basename(entry["file"]), files[logical])
+        entry["size"] = len(files[logical])
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SRC
+    out = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUT
+    result = build(src, out)
+    for logical, entry in sorted(result.items()):
+        print(f"{logical:<30} -> {entry['file']:<40} {entry['size']:>8}B  {','.join(entry['encodings']) or '-'}")
+    if brotli is None:
+        print("note: `brotli` not installed, only gzip variants were built")
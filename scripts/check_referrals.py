@@ -0,0 +1,50 @@
+# scripts/check_referrals.py
+"""
+Check the whole referral graph: loops, self-referrals, dangling referrers,
+long single-child chains and referral bursts. Prints a JSON report and
+exits 1 when anything was found, so it can run from cron.
+
+Usage:
+    python scripts/check_referrals.py
+    python scripts/check_referrals.py --max-examples 200 --out report.json
+    python scripts/check_referrals.py --rebuild-ancestry   # refill users.root_id / referral_depth first
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import INTEGRITY_CHAIN_MIN_LENGTH  # noqa: E402
+from db.models import Base  # noqa: E402
+from db.session import tenant_bind  # noqa: E402
+from services.referral_integrity_service import check_graph, rebuild_ancestry  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Referral graph integrity report")
+    parser.add_argument("--max-examples", type=int, default=50, help="entries kept per finding list")
+    parser.add_argument("--chain-min-length", type=int, default=INTEGRITY_CHAIN_MIN_LENGTH)
+    parser.add_argument("--rebuild-ancestry", action="store_true")
+    parser.add_argument("--out", help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(tenant_bind())
+    if args.rebuild_ancestry:
+        logging.info("ancestry index: %s users updated", rebuild_ancestry(tenant_bind()))
+    report = check_graph(tenant_bind(), args.max_examples, args.chain_min_length)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if any(n for k, n in report["counts"].items()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
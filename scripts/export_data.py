@@ -0,0 +1,48 @@
+# scripts/export_data.py
+"""
+Export deposits / rewards / company_pool as CSV or Parquet, streamed from
+the database with flat memory use.
+
+Usage:
+    python scripts/export_data.py deposits --format csv --start 2024-01-01 --end 2024-02-01 -o deposits.csv
+    python scripts/export_data.py rewards --format parquet -o rewards.parquet
+    python scripts/export_data.py company_pool > pool.csv
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.export_service import (  # noqa: E402
+    EXPORT_TABLES,
+    FORMATS,
+    DEFAULT_CHUNK_ROWS,
+    iter_export,
+    parse_date,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming export for accounting")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", help="created_at >= (YYYY-MM-DD or ISO timestamp)")
+    parser.add_argument("--end", help="created_at < (YYYY-MM-DD or ISO timestamp)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    chunks = iter_export(args.table, args.format, parse_date(args.start), parse_date(args.end), args.chunk_rows)
+    if args.output:
+        with open(args.output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# scripts/fake_evm_rpc.py
+"""
+Local stand-in for an EVM JSON-RPC node, for exercising the on-chain worker
+without a real chain. Answers `eth_blockNumber` and `eth_getTransactionReceipt`
+(single or batched) from an in-memory table of receipts.
+
+Usage:
+    python scripts/fake_evm_rpc.py [port] [fixtures.json]
+
+fixtures.json:
+    {"block_number": 100,
+     "transfers": [{"tx": "0x..", "token": "0x..", "to": "0x..", "amount": 14.0,
+                    "decimals": 18, "block": 90, "status": 1}]}
+
+Then point ONCHAIN_RPC_URL at http://127.0.0.1:<port>.
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.onchain_service import TRANSFER_TOPIC  # noqa: E402
+
+
+def transfer_receipt(tx: str, token: str, to: str, amount: float, decimals: int = 18,
+                     block: int = 1, status: int = 1, sender: str = "0x" + "11" * 20) -> dict:
+    """Build a receipt holding a single ERC-20 Transfer log."""
+    units = int(round(amount * (10 ** decimals)))
+    return {
+        "transactionHash": tx,
+        "blockNumber": hex(block),
+        "status": hex(status),
+        "logs": [{
+            "address": token,
+            "topics": [
+                TRANSFER_TOPIC,
+                "0x" + sender[2:].lower().rjust(64, "0"),
+                "0x" + to[2:].lower().rjust(64, "0"),
+            ],
+            "data": hex(units),
+        }],
+    }
+
+
+class FakeChain:
+    def __init__(self, block_number: int = 1):
+        self.block_number = block_number
+        self.receipts = {}
+        self.calls = []  # (method, params) log, handy for asserting batching
+
+    def add_transfer(self, **kwargs) -> dict:
+        receipt = transfer_receipt(**kwargs)
+        self.receipts[receipt["transactionHash"].lower()] = receipt
+        return receipt
+
+    def answer(self, call: dict) -> dict:
+        method, params = call.get("method"), call.get("params") or []
+        self.calls.append((method, params))
+        if method == "eth_blockNumber":
+            result = hex(self.block_number)
+        elif method == "eth_getTransactionReceipt":
+            result = self.receipts.get(str(params[0]).lower())
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"),
+                    "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+
+def make_server(chain: FakeChain, port: int = 0) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            reply = [chain.answer(c) for c in body] if isinstance(body, list) else chain.answer(body)
+            raw = json.dumps(reply).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+def serve_in_thread(chain: FakeChain, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; server.server_address has the port."""
+    server = make_server(chain, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8545
+    chain = FakeChain()
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            fixtures = json.load(f)
+        chain.block_number = fixtures.get("block_number", 1)
+        for t in fixtures.get("transfers", []):
+            chain.add_transfer(**t)
+    print(f"fake EVM JSON-RPC listening on http://127.0.0.1:{port}")
+    make_server(chain, port).serve_forever()
@@ -0,0 +1,47 @@
+# scripts/init_db.py
+"""
+Create any missing tables defined in db.models, in every tenant's schema,
+and upgrade existing ones: missing columns, indexes and unique constraints
+are added (db/migrations.py). When an existing database changed, the data
+derived from other tables - the referral ancestry index and the
+monthly_turnover / daily_stats rollups - is rebuilt too.
+
+Safe to run on every deploy.
+
+Usage:
+    python scripts/init_db.py
+    python scripts/init_db.py --backfill   # rebuild derived data even if nothing changed
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.models import Base  # noqa: E402
+from db.migrations import upgrade  # noqa: E402
+from db.session import tenant_bind  # noqa: E402
+from services.referral_integrity_service import rebuild_ancestry  # noqa: E402
+from services.turnover_service import rebuild_turnover  # noqa: E402
+from services.stats_service import rebuild_daily_stats  # noqa: E402
+from utils.tenancy import all_tenants, use_tenant  # noqa: E402
+
+
+def backfill(tenant) -> None:
+    with use_tenant(tenant):
+        bind = tenant_bind(tenant)
+        print(f"[{tenant.name}] ancestry rows updated:", rebuild_ancestry(bind))
+        print(f"[{tenant.name}] monthly_turnover rows written:", rebuild_turnover(bind))
+        print(f"[{tenant.name}] daily_stats rows written:", rebuild_daily_stats(bind))
+
+
+if __name__ == "__main__":
+    force = "--backfill" in sys.argv[1:]
+    for tenant in all_tenants():
+        report = upgrade(Base.metadata, tenant)
+        for kind in ("tables", "columns", "indexes"):
+            if report[kind]:
+                print(f"[{tenant.name}] added {kind}:", ", ".join(report[kind]))
+        changed = report["columns"] or report["indexes"] or report["tables"]
+        if "users" in report["existing_tables"] and (changed or force):
+            backfill(tenant)
+    print("Tables ready:", ", ".join(sorted(Base.metadata.tables)))
@@ -0,0 +1,53 @@
+# scripts/job_worker.py
+"""
+Run background job workers (referral rewards queued by deposit approvals)
+outside the bot process. Set JOB_WORKER_THREADS=0 for the bot when using this.
+
+Usage:
+    python scripts/job_worker.py              # config.JOB_WORKER_THREADS threads (min 1)
+    python scripts/job_worker.py --threads 8
+    python scripts/job_worker.py --once       # drain due jobs and exit
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import JOB_WORKER_THREADS, JOB_POLL_SECONDS  # noqa: E402
+from services.job_service import WorkerPool, work_once_all_tenants  # noqa: E402
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Background job worker pool")
+    parser.add_argument("--threads", type=int, default=max(1, JOB_WORKER_THREADS))
+    parser.add_argument("--poll", type=float, default=JOB_POLL_SECONDS, help="idle poll interval (seconds)")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        total = 0
+        while True:
+            ran = work_once_all_tenants()
+            if not ran:
+                break
+            total += ran
+        print(f"{total} job(s) run")
+        return
+
+    pool = WorkerPool(args.threads, args.poll).start()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: pool.stop())
+    pool.wait()
+    pool.stop(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# scripts/onchain_worker.py
+"""
+Run the on-chain deposit verification worker.
+
+Usage:
+    python scripts/onchain_worker.py          # poll forever
+    python scripts/onchain_worker.py --once   # single pass
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.onchain_service import run_worker  # noqa: E402
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+
+if __name__ == "__main__":
+    run_worker(once="--once" in sys.argv[1:])
@@ -0,0 +1,57 @@
+# scripts/rank_rules.py
+"""
+Inspect and publish versioned rank rules (picked up by running processes
+within RANK_RULES_RELOAD_SECONDS, no restart needed).
+
+Usage:
+    python scripts/rank_rules.py show
+    python scripts/rank_rules.py export rules.json      # live rules as an editable JSON file
+    python scripts/rank_rules.py publish rules.json --note "Advisor 15% -> 16%"
+    python scripts/rank_rules.py versions
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.models import Base  # noqa: E402
+from db.session import tenant_bind  # noqa: E402
+from services.rank_rules_service import get_rules, publish_rules, rule_versions  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned rank rules")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("show")
+    sub.add_parser("versions")
+    p = sub.add_parser("export")
+    p.add_argument("path")
+    p = sub.add_parser("publish")
+    p.add_argument("path")
+    p.add_argument("--note")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(tenant_bind())
+    if args.cmd == "show":
+        print(json.dumps(get_rules().to_dict(), indent=2))
+    elif args.cmd == "versions":
+        for v in rule_versions():
+            print(f"v{v['version']:<4} {v['created_at']}  {v['note'] or ''}")
+    elif args.cmd == "export":
+        with open(args.path, "w") as f:
+            json.dump(get_rules().to_dict(), f, indent=2)
+        print(f"wrote {args.path}")
+    else:
+        with open(args.path) as f:
+            data = json.load(f)
+        try:
+            rules = publish_rules(data, args.note)
+        except ValueError as e:
+            sys.exit(f"invalid rules: {e}")
+        print(f"published version {rules.version}")
+
+
+if __name__ == "__main__":
+    main()
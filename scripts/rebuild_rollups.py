@@ -0,0 +1,24 @@
+# scripts/rebuild_rollups.py
+"""
+Recompute the monthly_turnover and daily_stats rollups from the raw tables.
+
+Run once after upgrading an existing database, and after any manual edit
+of referrals or deposits.
+
+Usage:
+    python scripts/rebuild_rollups.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.models import Base  # noqa: E402
+from db.session import tenant_bind  # noqa: E402
+from services.turnover_service import rebuild_turnover  # noqa: E402
+from services.stats_service import rebuild_daily_stats  # noqa: E402
+
+if __name__ == "__main__":
+    Base.metadata.create_all(tenant_bind())
+    print("monthly_turnover rows written:", rebuild_turnover(tenant_bind()))
+    print("daily_stats rows written:", rebuild_daily_stats(tenant_bind()))
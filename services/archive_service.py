@@ -0,0 +1,186 @@
+# services/archive_service.py
+"""
+Hot/cold archival of settled rewards and deposits.
+
+archive_old_rows() moves rows older than a cutoff from `rewards` /
+`deposits` into `rewards_archive` / `deposits_archive` (same ids), one
+batch per transaction: copy, add to archive_summary, delete. A crash
+loses at most the batch in flight, which rolls back, and the next run
+simply picks up the rows that are still hot.
+
+Settled means: every reward (grace_wait / redirected / credited rows are
+never revisited), and deposits that are approved or rejected with no hot
+reward pointing at them and no unfinished job. Pending deposits always
+stay hot.
+
+Readers that need full history use all_rows(), a UNION ALL of the hot and
+archive tables with the hot table's columns; per-user totals come from
+archive_summary plus the hot rows (see user_history()).
+"""
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, delete, exists, func, insert, or_, select, true, union_all, update
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from db.session import SessionLocal
+from db.models import User, Deposit, Reward, Job, DepositArchive, RewardArchive, ArchiveSummary
+from utils.metrics import timed_service
+
+logger = logging.getLogger(__name__)
+
+# name -> (hot model, archive model, column identifying the user for summaries)
+ARCHIVES = {
+    "rewards": (Reward, RewardArchive, "referrer_id"),
+    "deposits": (Deposit, DepositArchive, "user_id"),
+}
+
+
+def all_rows(table: str):
+    """Subquery over hot + archived rows of `table`, with the hot table's columns."""
+    hot, cold, _ = ARCHIVES[table]
+    names = [c.name for c in hot.__table__.columns]
+    return union_all(
+        select(*hot.__table__.columns),
+        select(*[cold.__table__.c[n] for n in names]),
+    ).subquery(f"{table}_all")
+
+
+def _settled(table: str):
+    if table == "rewards":
+        return true()
+    return (
+        or_(Deposit.approved.is_(True), Deposit.rejected.is_(True))
+        & ~exists().where(Reward.deposit_id == Deposit.id)
+        & ~exists().where(Job.deposit_id == Deposit.id, Job.status != "done")
+    )
+
+
+def _status(table: str, row) -> str:
+    if table == "rewards":
+        return row.status or "credited"
+    return "approved" if row.approved else "rejected"
+
+
+def _add_to_summary(session, table: str, totals: Dict[tuple, list]) -> None:
+    """Add {(user_id, month, status): [rows, amount]} to archive_summary."""
+    t = ArchiveSummary.__table__
+    existing = {}
+    user_ids = sorted({k[0] for k in totals})
+    for i in range(0, len(user_ids), 500):
+        for sid, uid, month, status in session.execute(
+            select(t.c.id, t.c.user_id, t.c.month, t.c.status)
+            .where(t.c.table_name == table, t.c.user_id.in_(user_ids[i:i + 500]))
+        ):
+            existing[(uid, month, status)] = sid
+
+    updates = [{"sid": existing[k], "n": v[0], "amt": v[1]} for k, v in totals.items() if k in existing]
+    if updates:
+        session.connection().execute(
+            update(t).where(t.c.id == bindparam("sid"))
+            .values(rows=t.c.rows + bindparam("n"), amount_usd=t.c.amount_usd + bindparam("amt")),
+            updates,
+        )
+    inserts = [
+        {"table_name": table, "user_id": k[0], "month": k[1], "status": k[2], "rows": v[0], "amount_usd": v[1]}
+        for k, v in totals.items() if k not in existing
+    ]
+    if inserts:
+        session.execute(insert(ArchiveSummary), inserts)
+
+
+def _archive_batch(table: str, cutoff: dt.datetime, after_id: int, batch_size: int):
+    """Move one batch; returns (rows moved, last id seen) or (0, None) when done."""
+    hot, cold, user_col = ARCHIVES[table]
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(*hot.__table__.columns)
+            .where(hot.id > after_id, hot.created_at < cutoff, _settled(table))
+            .order_by(hot.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return 0, None
+
+        now = dt.datetime.utcnow()
+        totals = defaultdict(lambda: [0, 0.0])
+        for r in rows:
+            key = (getattr(r, user_col), r.created_at.strftime("%Y-%m"), _status(table, r))
+            totals[key][0] += 1
+            totals[key][1] += r.amount_usd or 0.0
+
+        session.execute(insert(cold), [dict(r._mapping, archived_at=now) for r in rows])
+        _add_to_summary(session, table, totals)
+        session.execute(delete(hot).where(hot.id.in_([r.id for r in rows])))
+        session.commit()
+        return len(rows), rows[-1].id
+
+
+@timed_service
+def archive_old_rows(days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                     max_batches: Optional[int] = None, tables=("rewards", "deposits")) -> Dict[str, int]:
+    """
+    Archive settled rows created more than `days` days ago. Rewards go
+    first so their deposits become eligible in the same run. Returns the
+    number of rows moved per table.
+    """
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=days)
+    moved = {}
+    for table in tables:
+        if table not in ARCHIVES:
+            raise ValueError(f"Unknown table {table!r}; choose from {', '.join(ARCHIVES)}")
+        moved[table] = 0
+        after_id, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            n, after_id = _archive_batch(table, cutoff, after_id, batch_size)
+            if not n:
+                break
+            moved[table] += n
+            batches += 1
+            logger.info("archived %s %s rows (up to id %s)", n, table, after_id)
+    return moved
+
+
+@timed_service
+def user_history(telegram_id: int) -> Dict:
+    """
+    Deposit and reward totals by status for one user across hot and
+    archived rows: hot rows are aggregated directly, archived ones come
+    from archive_summary, so cost does not grow with the archive.
+    """
+    with SessionLocal() as session:
+        user = session.execute(select(User).where(User.telegram_id == telegram_id)).scalar_one_or_none()
+        if not user:
+            raise ValueError("User not found")
+
+        out = {"telegram_id": telegram_id, "deposits": {}, "rewards": {}}
+
+        def add(table, status, n, amount):
+            cell = out[table].setdefault(status, {"rows": 0, "amount_usd": 0.0})
+            cell["rows"] += int(n or 0)
+            cell["amount_usd"] = round(cell["amount_usd"] + float(amount or 0.0), 2)
+
+        for approved, rejected, n, amount in session.execute(
+            select(Deposit.approved, Deposit.rejected, func.count(), func.sum(Deposit.amount_usd))
+            .where(Deposit.user_id == user.id)
+            .group_by(Deposit.approved, Deposit.rejected)
+        ):
+            add("deposits", "approved" if approved else "rejected" if rejected else "pending", n, amount)
+        for status, n, amount in session.execute(
+            select(Reward.status, func.count(), func.sum(Reward.amount_usd))
+            .where(Reward.referrer_id == user.id)
+            .group_by(Reward.status)
+        ):
+            add("rewards", status, n, amount)
+        for table, status, n, amount in session.execute(
+            select(ArchiveSummary.table_name, ArchiveSummary.status,
+                   func.sum(ArchiveSummary.rows), func.sum(ArchiveSummary.amount_usd))
+            .where(ArchiveSummary.user_id == user.id)
+            .group_by(ArchiveSummary.table_name, ArchiveSummary.status)
+        ):
+            add(table, status, n, amount)
+        return out
@@ -1,19 +1,37 @@
 # services/deposit_service.py
+import datetime as dt
 from db.session import SessionLocal
-from db.models import User, Deposit, CompanyPool
-from sqlalchemy import select
+from db.models import User, Deposit, DepositArchive, CompanyPool
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
 from config import MIN_FIRST_DEPOSIT, SUBSEQUENT_MULTIPLE, MUSD_SPLIT, MSTC_SPLIT
+from services.event_service import publish_deposit_status, publish_balance
+from services.turnover_service import record_approved_deposit
+from services.stats_service import bump_daily
+from services.job_service import enqueue
+from utils.metrics import timed_service, DEPOSITS_CREATED, DEPOSITS_APPROVED, DEPOSITS_REJECTED
 
 
-def create_deposit(user: User, amount: float) -> Deposit:
+@timed_service
+def create_deposit(user: User, amount: float, tx_musd: str = None, tx_mstc: str = None) -> Deposit:
     """
     Create a deposit request (not approved). Validates first/min and multiples.
+    tx_musd / tx_mstc are the on-chain transfer hashes when submitted from the mini-app;
+    they need the user's sending wallet registered first (user_service.register_wallet).
+    Re-submitting the same hashes returns the existing deposit instead of a new row.
     """
     with SessionLocal() as session:
         u = session.get(User, user.id)
         if u is None:
             raise ValueError("User not found in DB")
 
+        if tx_musd or tx_mstc:
+            existing = _deposit_for_tx_hashes(session, u.id, tx_musd, tx_mstc)
+            if existing is not None:
+                return existing
+            if not u.wallet_address:
+                raise ValueError("Register the wallet you send from before submitting tx hashes")
+
         first = u.total_deposit_usd <= 0.0
         if first and amount < MIN_FIRST_DEPOSIT:
             raise ValueError(f"First deposit must be at least ${MIN_FIRST_DEPOSIT}")
@@ -24,17 +42,50 @@ def create_deposit(user: User, amount: float) -> Deposit:
         musd = round(amount * MUSD_SPLIT, 2)
         mstc = round(amount * MSTC_SPLIT, 2)
 
-        dep = Deposit(user_id=u.id, amount_usd=amount, musd=musd, mstc=mstc)
+        dep = Deposit(user_id=u.id, amount_usd=amount, musd=musd, mstc=mstc, tx_musd=tx_musd, tx_mstc=tx_mstc)
         session.add(dep)
-        session.commit()
+        try:
+            bump_daily(session, deposits_created=1, deposits_created_usd=amount)
+            session.commit()
+        except IntegrityError:
+            # a concurrent retry inserted the same tx hash first
+            session.rollback()
+            existing = _deposit_for_tx_hashes(session, u.id, tx_musd, tx_mstc)
+            if existing is None:
+                raise
+            return existing
         session.refresh(dep)
+        DEPOSITS_CREATED.inc()
+        publish_deposit_status(u.telegram_id, dep, "pending")
         return dep
 
 
+def _deposit_for_tx_hashes(session, user_id: int, tx_musd: str, tx_mstc: str):
+    """
+    Return the deposit already holding these tx hashes, or None.
+    Raises if the hashes belong to another user or only partially match.
+    Archived deposits count too: a hash can never be reused.
+    """
+    for model in (Deposit, DepositArchive):
+        conds = [model.tx_musd == h for h in (tx_musd, tx_mstc) if h]
+        conds += [model.tx_mstc == h for h in (tx_musd, tx_mstc) if h]
+        rows = session.execute(select(model).where(or_(*conds))).scalars().all()
+        if rows:
+            break
+    if not rows:
+        return None
+    dep = rows[0]
+    if len(rows) == 1 and dep.user_id == user_id and dep.tx_musd == tx_musd and dep.tx_mstc == tx_mstc:
+        return dep
+    raise ValueError("Transaction hash already used by another deposit")
+
+
+@timed_service
 def approve_deposit(tg_id: int, dep_id: int) -> Deposit:
     """
     Approve a pending deposit for the user identified by tg_id.
-    Returns the approved Deposit object.
+    Returns the approved Deposit object. The referral reward is queued
+    as a "referral_reward" job in the same transaction.
     """
     with SessionLocal() as session:
         user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
@@ -48,8 +99,12 @@ def approve_deposit(tg_id: int, dep_id: int) -> Deposit:
         if dep.approved:
             raise ValueError("Deposit already approved")
 
+        if dep.rejected:
+            raise ValueError("Deposit was rejected")
+
         # Approve & apply balances
         dep.approved = True
+        dep.approved_at = dt.datetime.utcnow()
         user.total_deposit_usd += dep.amount_usd
         user.musd_balance += dep.musd
         user.mstc_balance += dep.mstc
@@ -59,8 +114,45 @@ def approve_deposit(tg_id: int, dep_id: int) -> Deposit:
             user.first_deposit_amount_usd = dep.amount_usd
 
         # Activate user on approval
+        activated = not user.is_active
         user.is_active = True
 
+        # monthly turnover up the upline, committed together with the approval
+        record_approved_deposit(session, user, dep, activated)
+        bump_daily(session, dep.approved_at, deposits_approved=1, deposits_approved_usd=dep.amount_usd,
+                   activations=1 if activated else 0)
+
+        # referral reward runs in a job worker; the job commits with the approval
+        if user.referred_by_id:
+            enqueue(session, "referral_reward", deposit_id=dep.id)
+
+        session.commit()
+        session.refresh(dep)
+        DEPOSITS_APPROVED.inc()
+        publish_deposit_status(user.telegram_id, dep, "approved")
+        publish_balance(user)
+        return dep
+
+
+@timed_service
+def reject_deposit(dep_id: int, reason: str) -> Deposit:
+    """
+    Mark a pending deposit as rejected (e.g. failed on-chain verification).
+    Balances are untouched since they are only applied on approval.
+    """
+    with SessionLocal() as session:
+        dep = session.get(Deposit, dep_id)
+        if not dep:
+            raise ValueError("Deposit not found")
+        if dep.approved:
+            raise ValueError("Deposit already approved")
+
+        dep.rejected = True
+        dep.reject_reason = reason
+        bump_daily(session, deposits_rejected=1)
         session.commit()
         session.refresh(dep)
+        DEPOSITS_REJECTED.inc()
+        user = session.get(User, dep.user_id)
+        publish_deposit_status(user.telegram_id, dep, "rejected")
         return dep
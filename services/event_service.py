@@ -0,0 +1,67 @@
+# services/event_service.py
+"""
+Publish per-user state changes (deposit status, balance, rewards) to Redis
+pub/sub so every web worker can push them to connected mini-app clients.
+
+Publishing is best effort: a Redis outage must never fail a deposit
+approval or a reward credit, so errors are logged and dropped.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import redis
+
+from config import REDIS_URL
+from utils.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+# one channel per telegram user: "mstc:events:<telegram_id>", or
+# "mstc:events:<tenant>:<telegram_id>" for namespaced bot tenants
+CHANNEL_PREFIX = "mstc:events:"
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        # short timeouts: a slow Redis must not stall approvals
+        _redis = redis.from_url(REDIS_URL, decode_responses=True, socket_timeout=1, socket_connect_timeout=1)
+    return _redis
+
+
+def user_channel(telegram_id: int) -> str:
+    return CHANNEL_PREFIX + current_tenant().key(str(int(telegram_id)))
+
+
+def publish_user_event(telegram_id: int, event: str, data: Dict[str, Any]) -> None:
+    """Send `event` with JSON `data` to everyone listening for `telegram_id`."""
+    if not telegram_id:
+        return
+    message = json.dumps({"event": event, "ts": int(time.time()), "data": data})
+    try:
+        get_redis().publish(user_channel(telegram_id), message)
+    except redis.RedisError as e:
+        logger.warning("event publish failed (%s for %s): %s", event, telegram_id, e)
+
+
+def publish_deposit_status(telegram_id: int, dep, status: str) -> None:
+    publish_user_event(telegram_id, "deposit", {
+        "deposit_id": dep.id,
+        "status": status,
+        "amount_usd": dep.amount_usd,
+        "reason": getattr(dep, "reject_reason", None),
+    })
+
+
+def publish_balance(user) -> None:
+    publish_user_event(user.telegram_id, "balance", {
+        "musd_balance": user.musd_balance,
+        "mstc_balance": user.mstc_balance,
+        "total_deposit_usd": user.total_deposit_usd,
+        "earned_total_usd": user.earned_total_usd,
+        "is_active": bool(user.is_active),
+    })
@@ -0,0 +1,184 @@
+# services/export_service.py
+"""
+Streaming exports of deposits, rewards and company_pool for accounting.
+
+Rows are read with a server-side cursor (stream_results + yield_per) as
+plain Core tuples and written out chunk by chunk, so memory stays flat
+however large the table is. CSV needs only the standard library; Parquet
+needs the optional `pyarrow` package (one row group per chunk).
+"""
+import csv
+import datetime as dt
+import io
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+
+from db.session import SessionLocal
+from db.models import Deposit, Reward, CompanyPool
+from services.archive_service import ARCHIVES, all_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: CSV-only exports
+    pa = None
+    pq = None
+
+EXPORT_TABLES = {
+    "deposits": Deposit,
+    "rewards": Reward,
+    "company_pool": CompanyPool,
+}
+FORMATS = ("csv", "parquet")
+DEFAULT_CHUNK_ROWS = 5000
+
+
+def _model(table: str):
+    try:
+        return EXPORT_TABLES[table]
+    except KeyError:
+        raise ValueError(f"Unknown table {table!r}; choose one of {', '.join(EXPORT_TABLES)}")
+
+
+def parse_date(value: Optional[str]) -> Optional[dt.datetime]:
+    """Accept YYYY-MM-DD or a full ISO timestamp; None/empty passes through."""
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}; use YYYY-MM-DD or ISO 8601")
+
+
+def columns(table: str) -> List[str]:
+    return [c.name for c in _model(table).__table__.columns]
+
+
+def iter_row_chunks(table: str, start: Optional[dt.datetime] = None, end: Optional[dt.datetime] = None,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Sequence[tuple]]:
+    """
+    Yield lists of row tuples (in `columns(table)` order) with
+    start <= created_at < end, ordered by id. Archived rows are included.
+    """
+    model = _model(table)
+    t = all_rows(table) if table in ARCHIVES else model.__table__
+    stmt = select(*t.columns).order_by(t.c.id)
+    if start is not None:
+        stmt = stmt.where(t.c.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(t.c.created_at < end)
+
+    with SessionLocal() as session:
+        result = session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_rows))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+def _csv_value(v):
+    if isinstance(v, dt.datetime):
+        return v.isoformat(sep=" ")
+    return v
+
+
+def iter_csv(table: str, start=None, end=None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV as a stream of byte chunks: header first, then one chunk per DB partition."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns(table))
+    for rows in iter_row_chunks(table, start, end, chunk_rows):
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _arrow_schema(table: str):
+    fields = []
+    for c in _model(table).__table__.columns:
+        if isinstance(c.type, Boolean):
+            t = pa.bool_()
+        elif isinstance(c.type, Integer):
+            t = pa.int64()
+        elif isinstance(c.type, Float):
+            t = pa.float64()
+        elif isinstance(c.type, DateTime):
+            t = pa.timestamp("us")
+        else:
+            t = pa.string()
+        fields.append(pa.field(c.name, t, nullable=c.nullable or not c.primary_key))
+    return pa.schema(fields)
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only buffer the Parquet writer appends to and we empty after every row group."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet export needs the `pyarrow` package (pip install pyarrow)")
+
+
+def iter_parquet(table: str, start=None, end=None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Parquet as a stream of byte chunks; each DB partition becomes one row group."""
+    _require_pyarrow()
+    schema = _arrow_schema(table)
+    names = schema.names
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in iter_row_chunks(table, start, end, chunk_rows):
+            cols = list(zip(*rows))
+            batch = pa.record_batch([pa.array(cols[i], type=schema.field(i).type) for i in range(len(names))],
+                                    schema=schema)
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(table: str, fmt: str = "csv", start=None, end=None,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    _model(table)
+    if fmt == "csv":
+        return iter_csv(table, start, end, chunk_rows)
+    if fmt == "parquet":
+        _require_pyarrow()
+        return iter_parquet(table, start, end, chunk_rows)
+    raise ValueError(f"Unknown format {fmt!r}; choose one of {', '.join(FORMATS)}")
+
+
+def export_to_file(table: str, path: str, fmt: str = "csv", start=None, end=None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """Write an export to `path`; returns bytes written."""
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in iter_export(table, fmt, start, end, chunk_rows):
+            f.write(chunk)
+            written += len(chunk)
+    return written
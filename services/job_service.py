@@ -0,0 +1,222 @@
+# services/job_service.py
+"""
+Durable background jobs on top of the `jobs` table (transactional outbox).
+
+    enqueue(session, "referral_reward", deposit_id=dep.id)   # before session.commit()
+
+The job row commits or rolls back with the change that produced it, so an
+approved deposit always has its reward job and a crash cannot lose it.
+Worker threads claim due jobs (SKIP LOCKED where the database supports it,
+plus a per-claim token so two workers never run the same job), execute the
+handler registered for the job's kind, and mark it done. Failures retry
+with exponential backoff; after JOB_MAX_ATTEMPTS the job is "dead" until an
+admin requeues it. Handlers must be idempotent: a job may run again if a
+worker dies after the handler finished but before the job was marked done.
+Each bot tenant has its own jobs table; WorkerPool threads serve them all.
+"""
+import datetime as dt
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, or_, select, update
+
+from config import (
+    JOB_LOCK_TIMEOUT_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_RETRY_BASE_SECONDS,
+)
+from db.session import SessionLocal
+from db.models import Job, Deposit
+from services.reward_service import process_referral_reward
+from utils.metrics import JOBS, JOB_SECONDS, timed_service
+from utils.tenancy import all_tenants, use_tenant
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+# ----- Handlers -----
+def _referral_reward(job: Job) -> None:
+    with SessionLocal() as session:
+        dep = session.get(Deposit, job.deposit_id)
+    if dep is None or not dep.approved:
+        raise ValueError(f"Deposit {job.deposit_id} is not an approved deposit")
+    process_referral_reward(dep)
+
+
+HANDLERS: Dict[str, Callable[[Job], None]] = {
+    "referral_reward": _referral_reward,
+}
+
+
+# ----- Producer side -----
+def enqueue(session, kind: str, deposit_id: Optional[int] = None) -> Job:
+    """Add a job to `session`; it becomes visible to workers when the caller commits."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    job = Job(kind=kind, deposit_id=deposit_id, status="pending", run_after=dt.datetime.utcnow())
+    session.add(job)
+    return job
+
+
+# ----- Consumer side -----
+def claim(limit: int = 10) -> List[Job]:
+    """Mark up to `limit` due jobs as running for this caller and return them."""
+    now = dt.datetime.utcnow()
+    stale = now - dt.timedelta(seconds=JOB_LOCK_TIMEOUT_SECONDS)
+    token = uuid.uuid4().hex
+    with SessionLocal() as session:
+        due = (
+            select(Job.id)
+            .where(or_(
+                (Job.status == "pending") & (Job.run_after <= now),
+                (Job.status == "running") & (Job.locked_at < stale),
+            ))
+            .order_by(Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        ids = list(session.execute(due).scalars())
+        if not ids:
+            return []
+        # the status re-check makes a concurrent claim of the same row a no-op
+        session.execute(
+            update(Job)
+            .where(Job.id.in_(ids), or_(
+                (Job.status == "pending") & (Job.run_after <= now),
+                (Job.status == "running") & (Job.locked_at < stale),
+            ))
+            .values(status="running", claim_token=token, locked_at=now, attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return list(session.execute(select(Job).where(Job.claim_token == token).order_by(Job.id)).scalars())
+
+
+def _finish(job: Job, **values) -> None:
+    with SessionLocal() as session:
+        session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.claim_token == job.claim_token)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+
+def run_job(job: Job) -> str:
+    """Execute one claimed job; returns "done", "retry" or "dead"."""
+    t0 = time.perf_counter()
+    try:
+        HANDLERS[job.kind](job)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:500]
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            outcome = "dead"
+            logger.error("job %s (%s) is dead after %s attempts: %s", job.id, job.kind, job.attempts, error)
+            _finish(job, status="dead", last_error=error, finished_at=dt.datetime.utcnow())
+        else:
+            outcome = "retry"
+            delay = min(MAX_BACKOFF_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            logger.warning("job %s (%s) failed, retry in %.0fs: %s", job.id, job.kind, delay, error)
+            _finish(job, status="pending", last_error=error,
+                    run_after=dt.datetime.utcnow() + dt.timedelta(seconds=delay))
+    else:
+        outcome = "done"
+        _finish(job, status="done", last_error=None, finished_at=dt.datetime.utcnow())
+    JOBS.labels(job.kind, outcome).inc()
+    JOB_SECONDS.labels(job.kind).observe(time.perf_counter() - t0)
+    return outcome
+
+
+def work_once(limit: int = 10) -> int:
+    """Claim and run one batch; returns how many jobs ran."""
+    jobs = claim(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+def work_once_all_tenants(limit: int = 10) -> int:
+    """work_once() for every bot tenant in turn."""
+    ran = 0
+    for tenant in all_tenants():
+        with use_tenant(tenant):
+            ran += work_once(limit)
+    return ran
+
+
+class WorkerPool:
+    """N threads polling every tenant's jobs table until stop() is called."""
+
+    def __init__(self, threads: int, poll_seconds: float = JOB_POLL_SECONDS, batch: int = 10):
+        self.threads = threads
+        self.poll_seconds = poll_seconds
+        self.batch = batch
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = work_once_all_tenants(self.batch)
+            except Exception:
+                logger.exception("job worker pass failed")
+                ran = 0
+            if not ran:
+                self._stop.wait(self.poll_seconds)
+
+    def start(self) -> "WorkerPool":
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info("started %s job worker thread(s)", self.threads)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def wait(self) -> None:
+        """Block until stop() (e.g. from a signal handler)."""
+        while not self._stop.wait(1.0):
+            pass
+
+
+# ----- Admin -----
+@timed_service
+def job_counts() -> Dict[str, int]:
+    with SessionLocal() as session:
+        return dict(session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+
+
+@timed_service
+def dead_jobs(limit: int = 20) -> List[Job]:
+    with SessionLocal() as session:
+        return list(session.execute(
+            select(Job).where(Job.status == "dead").order_by(Job.id.desc()).limit(limit)
+        ).scalars())
+
+
+@timed_service
+def requeue_job(job_id: int) -> Job:
+    """Give a dead job a fresh set of attempts."""
+    with SessionLocal() as session:
+        job = session.get(Job, job_id)
+        if not job:
+            raise ValueError("Job not found")
+        if job.status != "dead":
+            raise ValueError(f"Job {job_id} is {job.status}, only dead jobs can be requeued")
+        job.status = "pending"
+        job.attempts = 0
+        job.run_after = dt.datetime.utcnow()
+        job.claim_token = None
+        session.commit()
+        return job
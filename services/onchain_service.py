@@ -0,0 +1,322 @@
+# services/onchain_service.py
+"""
+Background verification of deposits submitted from the mini-app.
+
+Pending deposits carry two ERC-20 transfer hashes (MUSD and MSTC legs).
+The worker looks their receipts up with batched JSON-RPC
+`eth_getTransactionReceipt` calls, checks that each receipt holds a
+Transfer of the right token from the user's registered wallet to
+DEPOSIT_RECEIVER_ADDRESS for at least the expected amount, and then approves the deposit through the normal
+deposit / reward services. Hashes the node still does not know after
+ONCHAIN_PENDING_MAX_AGE_HOURS are rejected as "tx not found".
+"""
+import datetime as dt
+import json
+import logging
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, select
+
+from config import (
+    ONCHAIN_RPC_URL,
+    DEPOSIT_RECEIVER_ADDRESS,
+    MUSD_TOKEN_ADDRESS,
+    MSTC_TOKEN_ADDRESS,
+    MUSD_TOKEN_DECIMALS,
+    MSTC_TOKEN_DECIMALS,
+    MSTC_USD_PRICE,
+    ONCHAIN_AMOUNT_TOLERANCE_USD,
+    ONCHAIN_MIN_CONFIRMATIONS,
+    ONCHAIN_BATCH_SIZE,
+    ONCHAIN_POLL_SECONDS,
+    ONCHAIN_PAGE_SIZE,
+    ONCHAIN_PENDING_MAX_AGE_HOURS,
+)
+from db.session import SessionLocal
+from db.models import Deposit, DepositArchive, User
+from services.deposit_service import approve_deposit, reject_deposit
+from utils.metrics import timed_service
+from utils.tenancy import all_tenants, use_tenant
+
+logger = logging.getLogger(__name__)
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+RECEIPT_CACHE_SIZE = 10_000
+
+
+class JsonRpcError(RuntimeError):
+    pass
+
+
+class JsonRpcClient:
+    """Minimal JSON-RPC 2.0 client that sends calls as one batched HTTP request."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+        self._next_id = 1
+
+    def batch(self, calls: List[tuple]) -> List[object]:
+        """
+        calls: [(method, params), ...]. Returns results in the same order.
+        A per-call error is returned as a JsonRpcError instance, not raised.
+        """
+        if not calls:
+            return []
+        first_id = self._next_id
+        self._next_id += len(calls)
+        body = [
+            {"jsonrpc": "2.0", "id": first_id + i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            replies = json.loads(resp.read().decode("utf-8"))
+        if isinstance(replies, dict):
+            # some nodes answer a malformed batch with a single error object
+            raise JsonRpcError(str(replies.get("error") or replies))
+
+        by_id = {r.get("id"): r for r in replies}
+        results = []
+        for i in range(len(calls)):
+            r = by_id.get(first_id + i)
+            if r is None:
+                results.append(JsonRpcError("missing response"))
+            elif r.get("error"):
+                results.append(JsonRpcError(str(r["error"])))
+            else:
+                results.append(r.get("result"))
+        return results
+
+
+# Receipts of mined transactions never change, so they are kept in a bounded
+# LRU and each hash is fetched from the node at most once.
+_receipt_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def _cache_put(tx_hash: str, receipt: dict) -> None:
+    _receipt_cache[tx_hash] = receipt
+    _receipt_cache.move_to_end(tx_hash)
+    while len(_receipt_cache) > RECEIPT_CACHE_SIZE:
+        _receipt_cache.popitem(last=False)
+
+
+def fetch_receipts(client: JsonRpcClient, tx_hashes: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """
+    Return {tx_hash: receipt or None}. None means not mined yet (or unknown).
+    Uncached hashes are fetched in batches of ONCHAIN_BATCH_SIZE.
+    """
+    out: Dict[str, Optional[dict]] = {}
+    missing = []
+    for h in dict.fromkeys(tx_hashes):
+        if h in _receipt_cache:
+            _receipt_cache.move_to_end(h)
+            out[h] = _receipt_cache[h]
+        else:
+            missing.append(h)
+
+    for i in range(0, len(missing), ONCHAIN_BATCH_SIZE):
+        chunk = missing[i:i + ONCHAIN_BATCH_SIZE]
+        results = client.batch([("eth_getTransactionReceipt", [h]) for h in chunk])
+        for h, receipt in zip(chunk, results):
+            if isinstance(receipt, JsonRpcError):
+                logger.warning("receipt lookup failed for %s: %s", h, receipt)
+                out[h] = None
+                continue
+            if receipt:
+                _cache_put(h, receipt)
+            out[h] = receipt or None
+    return out
+
+
+def _topic_address(topic: str) -> str:
+    return "0x" + topic[-40:].lower()
+
+
+def transfer_problem(receipt: dict, token: str, decimals: int, expected_usd: float,
+                     usd_price: float = 1.0, sender: Optional[str] = None) -> Optional[str]:
+    """
+    Return None if `receipt` holds a successful Transfer of `token` to the
+    deposit wallet worth at least `expected_usd`, else a short reason.
+    With `sender`, only transfers from that address count.
+    """
+    if int(receipt.get("status", "0x0"), 16) != 1:
+        return "transaction failed on-chain"
+
+    receiver = DEPOSIT_RECEIVER_ADDRESS.lower()
+    received_units = 0
+    for log in receipt.get("logs") or []:
+        topics = log.get("topics") or []
+        if len(topics) < 3 or topics[0].lower() != TRANSFER_TOPIC:
+            continue
+        if (log.get("address") or "").lower() != token.lower():
+            continue
+        if _topic_address(topics[2]) != receiver:
+            continue
+        if sender is not None and _topic_address(topics[1]) != sender.lower():
+            continue
+        received_units += int(log.get("data") or "0x0", 16)
+
+    if received_units == 0:
+        return "no transfer to the deposit wallet" if sender is None else "no transfer from your wallet"
+
+    received_usd = received_units / (10 ** decimals) * usd_price
+    if received_usd + ONCHAIN_AMOUNT_TOLERANCE_USD < expected_usd:
+        return f"transferred ${received_usd:.2f}, expected ${expected_usd:.2f}"
+    return None
+
+
+def _pending_onchain_deposits(after_id: int, limit: int) -> List[tuple]:
+    """Next page of pending on-chain deposits with id > after_id, oldest first."""
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(Deposit, User.telegram_id, User.wallet_address)
+            .join(User, User.id == Deposit.user_id)
+            .where(
+                Deposit.id > after_id,
+                Deposit.approved.is_(False),
+                Deposit.rejected.isnot(True),
+                Deposit.tx_musd.isnot(None),
+                Deposit.tx_mstc.isnot(None),
+            )
+            .order_by(Deposit.id.asc())
+            .limit(limit)
+        ).all()
+        return [tuple(r) for r in rows]
+
+
+@timed_service
+def verify_pending_deposits(client: JsonRpcClient, page_size: int = ONCHAIN_PAGE_SIZE) -> Dict[str, int]:
+    """
+    One verification pass over every pending deposit, `page_size` rows at a
+    time, so deposits still waiting for their receipts never hide newer ones.
+    Returns counts of approved / rejected / waiting deposits.
+    """
+    stats = {"approved": 0, "rejected": 0, "waiting": 0}
+    head = client.batch([("eth_blockNumber", [])])[0]
+    head_block = int(head, 16) if isinstance(head, str) else None
+    expire_before = dt.datetime.utcnow() - dt.timedelta(hours=ONCHAIN_PENDING_MAX_AGE_HOURS)
+
+    after_id = 0
+    while True:
+        pending = _pending_onchain_deposits(after_id, page_size)
+        if not pending:
+            return stats
+        _verify_page(client, pending, head_block, expire_before, stats)
+        after_id = pending[-1][0].id
+
+
+def _hash_claims(hashes: List[str]) -> Dict[str, int]:
+    """
+    {lowercase tx hash: oldest deposit id holding it in either column}, over
+    the live and archived deposits; archived claims count as id 0, since
+    they always predate anything still pending.
+    """
+    wanted = sorted({v for h in hashes for v in (h, h.lower())})
+    claims: Dict[str, int] = {}
+    with SessionLocal() as session:
+        for model in (Deposit, DepositArchive):
+            for i in range(0, len(wanted), ONCHAIN_PAGE_SIZE):
+                chunk = wanted[i:i + ONCHAIN_PAGE_SIZE]
+                rows = session.execute(
+                    select(model.id, model.tx_musd, model.tx_mstc)
+                    .where(or_(model.tx_musd.in_(chunk), model.tx_mstc.in_(chunk)))
+                )
+                for dep_id, *txs in rows:
+                    claim = dep_id if model is Deposit else 0
+                    for h in txs:
+                        if h:
+                            claims[h.lower()] = min(claims.get(h.lower(), claim), claim)
+    return claims
+
+
+def _verify_page(client: JsonRpcClient, pending: List[tuple], head_block: Optional[int],
+                 expire_before: dt.datetime, stats: Dict[str, int]) -> None:
+    hashes = [h for dep, *_ in pending for h in (dep.tx_musd, dep.tx_mstc)]
+    # a tx hash held by any other deposit, live or archived, never counts
+    # twice: the oldest claim wins
+    claims = _hash_claims(hashes)
+    receipts = fetch_receipts(client, hashes)
+
+    for dep, tg_id, wallet in pending:
+        legs = (
+            (dep.tx_musd, MUSD_TOKEN_ADDRESS, MUSD_TOKEN_DECIMALS, dep.musd, 1.0),
+            (dep.tx_mstc, MSTC_TOKEN_ADDRESS, MSTC_TOKEN_DECIMALS, dep.mstc, MSTC_USD_PRICE),
+        )
+        if dep.tx_musd.lower() == dep.tx_mstc.lower() or any(claims[h.lower()] != dep.id for h, *_ in legs):
+            reject_deposit(dep.id, "transaction hash reused")
+            stats["rejected"] += 1
+            continue
+        if not wallet:
+            reject_deposit(dep.id, "sending wallet not registered")
+            stats["rejected"] += 1
+            continue
+
+        problem = None
+        waiting = False
+        for tx_hash, token, decimals, expected_usd, price in legs:
+            receipt = receipts.get(tx_hash)
+            if receipt is None:
+                if dep.created_at is not None and dep.created_at < expire_before:
+                    problem = "tx not found"
+                    break
+                waiting = True
+                continue
+            problem = transfer_problem(receipt, token, decimals, expected_usd, price, sender=wallet)
+            if problem:
+                break
+            mined_at = int(receipt.get("blockNumber") or "0x0", 16)
+            if head_block is None or head_block - mined_at + 1 < ONCHAIN_MIN_CONFIRMATIONS:
+                waiting = True
+
+        if problem:
+            logger.info("rejecting deposit %s: %s", dep.id, problem)
+            reject_deposit(dep.id, problem)
+            stats["rejected"] += 1
+            continue
+        if waiting:
+            stats["waiting"] += 1
+            continue
+
+        try:
+            # also queues the referral reward job
+            approve_deposit(tg_id, dep.id)
+        except ValueError as e:
+            # approved or rejected by an admin in the meantime
+            logger.info("skip deposit %s: %s", dep.id, e)
+            continue
+        stats["approved"] += 1
+
+
+def run_worker(rpc_url: str = ONCHAIN_RPC_URL, poll_seconds: float = ONCHAIN_POLL_SECONDS, once: bool = False):
+    """
+    Poll for pending on-chain deposits of every bot tenant forever (or a
+    single pass with once=True). The RPC client and receipt cache are shared.
+    """
+    if not rpc_url:
+        raise RuntimeError("ONCHAIN_RPC_URL not set in config.py / .env")
+    if not MUSD_TOKEN_ADDRESS or not MSTC_TOKEN_ADDRESS:
+        raise RuntimeError("MUSD_TOKEN_ADDRESS / MSTC_TOKEN_ADDRESS not set in config.py / .env")
+
+    client = JsonRpcClient(rpc_url)
+    while True:
+        for tenant in all_tenants():
+            with use_tenant(tenant):
+                try:
+                    stats = verify_pending_deposits(client)
+                    if any(stats.values()):
+                        logger.info("on-chain verification pass (%s): %s", tenant.name, stats)
+                except Exception:
+                    logger.exception("on-chain verification pass failed (%s)", tenant.name)
+        if once:
+            return
+        time.sleep(poll_seconds)
@@ -0,0 +1,216 @@
+# services/rank_rules_service.py
+"""
+Compiled, versioned, hot-reloadable rank rules.
+
+A rules document lists ranks from lowest to highest:
+
+    {"version": 3, "ranks": [
+        {"name": "Origin", "team_business": 0, "active_origin": 0,
+         "monthly_club": 0, "club_turnover_percent": 0, "reward_percent": 5},
+        ...]}
+
+It is compiled into parallel sorted arrays so rank_for() is a bisect on
+team_business plus a short walk down for active_origin. The live version
+comes from RANK_RULES_FILE if set, else the highest row in rank_rules,
+else the built-in config.REQUIREMENTS / RANK_REWARD_PCT (version 0).
+
+get_rules() is what everything calls - current_rank, reward crediting and
+the bulk club payout - so they all see one compiled ruleset. Each process
+re-checks the source at most every RANK_RULES_RELOAD_SECONDS and swaps in
+a newly compiled ruleset without a restart; a broken new version is
+logged and the previous one stays live. Bot tenants each keep their own
+ruleset, loaded from their own rank_rules table.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from config import REQUIREMENTS, RANK_REWARD_PCT, RANK_RULES_FILE, RANK_RULES_RELOAD_SECONDS, Rank
+from db.session import SessionLocal
+from db.models import RankRuleSet
+from utils.metrics import timed_service
+from utils.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("team_business", "active_origin", "monthly_club", "club_turnover_percent", "reward_percent")
+
+
+class CompiledRankRules:
+    def __init__(self, version: int, ranks: List[dict]):
+        self.version = version
+        self.ranks = [dict(r) for r in ranks]
+        self.names = [r["name"] for r in ranks]
+        self._team_business = [float(r["team_business"]) for r in ranks]
+        self._active_origin = [int(r["active_origin"]) for r in ranks]
+        self._by_name = {r["name"]: r for r in self.ranks}
+        self._reward_pct = {r["name"]: float(r["reward_percent"]) / 100.0 for r in ranks}
+        clubs = [float(r["monthly_club"]) for r in ranks if float(r["monthly_club"]) > 0]
+        self.min_monthly_club = min(clubs) if clubs else None
+
+    @property
+    def lowest(self) -> str:
+        return self.names[0]
+
+    def rank_for(self, team_business: float, active_origins: int) -> str:
+        """Highest rank whose team_business and active_origin thresholds are met."""
+        i = bisect.bisect_right(self._team_business, team_business) - 1
+        while i > 0 and active_origins < self._active_origin[i]:
+            i -= 1
+        return self.names[max(i, 0)]
+
+    def reward_pct(self, rank: str) -> float:
+        """Referral reward as a fraction (0.10 = 10%)."""
+        return self._reward_pct.get(rank, 0.0)
+
+    def requirements(self, rank: str) -> dict:
+        return self._by_name[rank]
+
+    def to_dict(self) -> dict:
+        return {"version": self.version, "ranks": self.ranks}
+
+
+def compile_rules(data: dict, version: Optional[int] = None) -> CompiledRankRules:
+    """Validate a rules document and compile it. Raises ValueError if it is malformed."""
+    ranks = data.get("ranks") if isinstance(data, dict) else None
+    if not ranks or not isinstance(ranks, list):
+        raise ValueError("rules need a non-empty \"ranks\" list")
+    version = data.get("version", 0) if version is None else version
+
+    seen = set()
+    clean = []
+    for i, r in enumerate(ranks):
+        name = r.get("name")
+        if not name or name in seen:
+            raise ValueError(f"rank #{i}: missing or duplicate name")
+        seen.add(name)
+        row = {"name": name}
+        for field in FIELDS:
+            try:
+                row[field] = float(r.get(field, 0))
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: {field} must be a number")
+            if row[field] < 0:
+                raise ValueError(f"{name}: {field} must not be negative")
+        row["active_origin"] = int(row["active_origin"])
+        if row["reward_percent"] > 100 or row["club_turnover_percent"] > 100:
+            raise ValueError(f"{name}: percentages must be at most 100")
+        if clean and row["team_business"] < clean[-1]["team_business"]:
+            raise ValueError(f"{name}: team_business must not decrease from the rank below")
+        clean.append(row)
+    if clean[0]["team_business"] or clean[0]["active_origin"]:
+        raise ValueError(f"{clean[0]['name']}: the lowest rank must have no thresholds")
+    return CompiledRankRules(int(version), clean)
+
+
+def default_rules() -> CompiledRankRules:
+    """Version 0: the built-in config.REQUIREMENTS / RANK_REWARD_PCT."""
+    order = [Rank.ORIGIN, Rank.LIFE_CHANGER, Rank.ADVISOR, Rank.VISIONARY, Rank.CREATOR]
+    ranks = []
+    for name in order:
+        req = REQUIREMENTS[name]
+        ranks.append({
+            "name": name,
+            "team_business": req["team_business"],
+            "active_origin": req["active_origin"],
+            "monthly_club": req["monthly_club"],
+            "club_turnover_percent": req["club_turnover_percent"],
+            "reward_percent": RANK_REWARD_PCT.get(name, 0.0) * 100,
+        })
+    return compile_rules({"version": 0, "ranks": ranks})
+
+
+# ----- Loading / hot reload -----
+class _Loaded:
+    def __init__(self):
+        self.rules: CompiledRankRules = default_rules()
+        self.stamp = None  # file mtime or DB version behind rules
+        self.checked_at: Optional[float] = None
+
+
+_loaded: Dict[str, _Loaded] = {}  # per tenant
+_lock = threading.Lock()
+
+
+def _state() -> _Loaded:
+    name = current_tenant().name
+    if name not in _loaded:
+        with _lock:
+            _loaded.setdefault(name, _Loaded())
+    return _loaded[name]
+
+
+def _latest_stamp():
+    if RANK_RULES_FILE:
+        return os.stat(RANK_RULES_FILE).st_mtime_ns
+    with SessionLocal() as session:
+        return session.execute(select(func.max(RankRuleSet.version))).scalar_one()
+
+
+def _load(stamp) -> CompiledRankRules:
+    if RANK_RULES_FILE:
+        with open(RANK_RULES_FILE) as f:
+            return compile_rules(json.load(f))
+    if stamp is None:
+        return default_rules()
+    with SessionLocal() as session:
+        row = session.execute(select(RankRuleSet).where(RankRuleSet.version == stamp)).scalar_one()
+        return compile_rules(json.loads(row.rules), version=row.version)
+
+
+def reload_rules(force: bool = False) -> CompiledRankRules:
+    """Recompile if the source changed since the last load (always with force=True)."""
+    state = _state()
+    with _lock:
+        state.checked_at = time.monotonic()
+        try:
+            stamp = _latest_stamp()
+            if force or stamp != state.stamp:
+                rules = _load(stamp)
+                if rules.version != state.rules.version:
+                    logger.info("rank rules version %s live (was %s)", rules.version, state.rules.version)
+                state.rules, state.stamp = rules, stamp
+        except Exception as e:
+            logger.warning("rank rules reload failed, keeping version %s: %s", state.rules.version, e)
+        return state.rules
+
+
+def get_rules() -> CompiledRankRules:
+    """The live compiled ruleset; re-checks the source every RANK_RULES_RELOAD_SECONDS."""
+    state = _state()
+    if state.checked_at is None or time.monotonic() - state.checked_at >= RANK_RULES_RELOAD_SECONDS:
+        return reload_rules()
+    return state.rules
+
+
+@timed_service
+def publish_rules(data: dict, note: Optional[str] = None) -> CompiledRankRules:
+    """
+    Validate and store a new version in rank_rules. Live in this process
+    at once, in the others within RANK_RULES_RELOAD_SECONDS.
+    """
+    if RANK_RULES_FILE:
+        raise ValueError("RANK_RULES_FILE is set; edit that file instead")
+    with SessionLocal() as session:
+        latest = session.execute(select(func.max(RankRuleSet.version))).scalar_one() or 0
+        version = latest + 1
+        rules = compile_rules(data, version=version)
+        session.add(RankRuleSet(version=version, rules=json.dumps({"ranks": rules.ranks}), note=note))
+        session.commit()
+    return reload_rules(force=True)
+
+
+@timed_service
+def rule_versions(limit: int = 10) -> List[Dict]:
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(RankRuleSet.version, RankRuleSet.note, RankRuleSet.created_at)
+            .order_by(RankRuleSet.version.desc()).limit(limit)
+        ).all()
+    return [{"version": v, "note": n, "created_at": c.isoformat() if c else None} for v, n, c in rows]
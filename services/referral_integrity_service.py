@@ -0,0 +1,334 @@
+# services/referral_integrity_service.py
+"""
+Referral-graph integrity: cycle checks when a referrer is set, plus a
+whole-graph batch checker for cycles and sybil-looking structures.
+
+Ancestry index: every user carries root_id (top of their referral tree,
+NULL when the user is a root) and referral_depth. A referrer can only be
+set on a user who has none yet, i.e. a root, and attaching a root below
+`ref` closes a cycle exactly when `ref` sits in that root's own tree - an
+O(1) compare of ref's root. Rows whose index is unknown (legacy data,
+manual edits) fall back to one recursive upline query, O(depth).
+attach_referrer() re-roots the user's subtree in one indexed UPDATE.
+
+check_graph() loads (id, referred_by_id) into id-indexed arrays and runs
+union-find over the edges, so a few million users fit in tens of MB and
+one linear pass. rebuild_ancestry() recomputes root_id / referral_depth
+from the same arrays.
+"""
+import datetime as dt
+import logging
+from array import array
+from collections import deque
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, literal, or_, select, update
+
+from config import INTEGRITY_BURST_REFERRALS, INTEGRITY_BURST_WINDOW_MINUTES, INTEGRITY_CHAIN_MIN_LENGTH
+from db.session import tenant_bind
+from db.models import User
+from utils.metrics import timed_service
+
+logger = logging.getLogger(__name__)
+
+# guards the upline walk against referral cycles
+UPLINE_MAX_DEPTH = 10_000
+_NONE = -1
+_CYCLE = -2
+_UNSET = -3
+_WRITE_CHUNK = 20_000
+
+
+# ----- Referral time -----
+def upline_ids(session, user_id: int) -> List[int]:
+    """Referrer, referrer's referrer, ... in one recursive query."""
+    anc = (
+        select(User.referred_by_id.label("id"), literal(1).label("depth"))
+        .where(User.id == user_id, User.referred_by_id.isnot(None))
+        .cte("upline", recursive=True)
+    )
+    anc = anc.union_all(
+        select(User.referred_by_id, anc.c.depth + 1)
+        .where(User.id == anc.c.id, User.referred_by_id.isnot(None), anc.c.depth < UPLINE_MAX_DEPTH)
+    )
+    return list(session.execute(select(anc.c.id)).scalars())
+
+
+def _root_of(user: User) -> Optional[int]:
+    if user.referred_by_id is None:
+        return user.id
+    return user.root_id
+
+
+def creates_cycle(session, user: User, ref: User) -> bool:
+    """True if making `ref` the referrer of `user` would close a referral loop."""
+    if ref.id == user.id:
+        return True
+    ref_root = _root_of(ref)
+    if user.referred_by_id is None and ref_root is not None:
+        return ref_root == user.id
+    return user.id in upline_ids(session, ref.id)
+
+
+def attach_referrer(session, user: User, ref: User, when: Optional[dt.datetime] = None) -> None:
+    """Set user's referrer and move user's whole subtree under ref's root."""
+    was_root = user.referred_by_id is None
+    user.referred_by_id = ref.id
+    user.referred_at = when or dt.datetime.utcnow()
+    ref_root = _root_of(ref)
+    session.flush()
+    if not was_root or ref_root is None:
+        # index unknown on this side: clear it for the whole subtree, whose
+        # rows still name `user` as their root, so creates_cycle() walks the
+        # upline for them instead of trusting it; rebuild_ancestry() refills it
+        session.execute(
+            update(User)
+            .where(or_(User.root_id == user.id, User.id == user.id))
+            .values(root_id=None, referral_depth=None)
+            .execution_options(synchronize_session=False)
+        )
+        user.root_id = None
+        user.referral_depth = None
+        return
+    shift = (ref.referral_depth or 0) + 1
+    session.execute(
+        update(User)
+        .where(or_(User.root_id == user.id, User.id == user.id))
+        .values(root_id=ref_root, referral_depth=func.coalesce(User.referral_depth, 0) + shift)
+        .execution_options(synchronize_session=False)
+    )
+    user.root_id = ref_root
+    user.referral_depth = shift
+
+
+# ----- Batch checker -----
+class ReferralGraph:
+    """(id -> referrer) as id-indexed int arrays; ids are assumed to be mostly dense."""
+
+    def __init__(self, size: int):
+        self.parent = array("q", [_NONE]) * size
+        self.present = bytearray(size)
+        self.users = 0
+
+    @classmethod
+    def load(cls, bind=None) -> "ReferralGraph":
+        bind = bind or tenant_bind()
+        with bind.connect() as conn:
+            max_id = conn.execute(select(func.max(User.id))).scalar() or 0
+            graph = cls(max_id + 1)
+            rows = conn.execution_options(stream_results=True, yield_per=50_000).execute(
+                select(User.id, User.referred_by_id)
+            )
+            for uid, ref in rows:
+                graph.present[uid] = 1
+                graph.parent[uid] = _NONE if ref is None else ref
+                graph.users += 1
+        return graph
+
+    def __len__(self):
+        return len(self.parent)
+
+    def dangling(self) -> List[int]:
+        """Users whose referred_by_id points at no user."""
+        n = len(self)
+        return [i for i in range(n) if self.present[i] and self.parent[i] != _NONE
+                and not (0 <= self.parent[i] < n and self.present[self.parent[i]])]
+
+    def cycles(self) -> List[List[int]]:
+        """
+        Every referral loop, as the list of its members. Union-find over the
+        referral edges: an edge joining two users already in one set closes a
+        loop (each user has one referrer, so each loop is found exactly once).
+        """
+        n = len(self)
+        uf = array("q", range(n))
+
+        def find(x):
+            while uf[x] != x:
+                uf[x] = uf[uf[x]]
+                x = uf[x]
+            return x
+
+        found = []
+        for i in range(n):
+            p = self.parent[i]
+            if not self.present[i] or p == _NONE or not (0 <= p < n and self.present[p]):
+                continue
+            a, b = find(i), find(p)
+            if a == b:
+                loop, node = [i], p
+                while node != i and len(loop) <= n:
+                    loop.append(node)
+                    node = self.parent[node]
+                found.append(loop)
+            else:
+                uf[a] = b
+        return found
+
+    def ancestry(self):
+        """(root, depth) arrays; users on or below a loop get _CYCLE in both."""
+        n = len(self)
+        root = array("q", [_UNSET]) * n
+        depth = array("q", [_UNSET]) * n
+        for start in range(n):
+            if not self.present[start] or root[start] != _UNSET:
+                continue
+            path = []
+            on_path = set()
+            node = start
+            while True:
+                p = self.parent[node]
+                if p == _NONE or not (0 <= p < n and self.present[p]):
+                    r, d = node, -1
+                    path.append(node)
+                    break
+                if root[node] != _UNSET:
+                    r, d = root[node], depth[node]
+                    break
+                if node in on_path:
+                    r, d = _CYCLE, _CYCLE
+                    break
+                on_path.add(node)
+                path.append(node)
+                node = p
+            for node in reversed(path):
+                if r == _CYCLE:
+                    root[node] = depth[node] = _CYCLE
+                else:
+                    d += 1
+                    root[node], depth[node] = r, d
+        return root, depth
+
+    def long_chains(self, min_length: int) -> List[Dict]:
+        """Runs of users who each referred exactly one user, at least `min_length` long."""
+        n = len(self)
+        children = array("l", [0]) * n
+        only_child = array("q", [_NONE]) * n
+        for i in range(n):
+            p = self.parent[i]
+            if self.present[i] and p != _NONE and 0 <= p < n and self.present[p]:
+                children[p] += 1
+                only_child[p] = i
+
+        chains = []
+        for i in range(n):
+            if not self.present[i] or children[i] != 1:
+                continue
+            p = self.parent[i]
+            if p != _NONE and 0 <= p < n and self.present[p] and children[p] == 1:
+                continue  # not the top of its run
+            length, node = 1, i
+            while children[node] == 1 and length <= n:
+                node = only_child[node]
+                length += 1
+            if length >= min_length:
+                chains.append({"start_user_id": i, "end_user_id": node, "length": length})
+        chains.sort(key=lambda c: -c["length"])
+        return chains
+
+
+def referral_bursts(bind=None, threshold: int = INTEGRITY_BURST_REFERRALS,
+                    window_minutes: int = INTEGRITY_BURST_WINDOW_MINUTES) -> List[Dict]:
+    """Referrers who brought in `threshold`+ users within any `window_minutes` window."""
+    bind = bind or tenant_bind()
+    window = dt.timedelta(minutes=window_minutes)
+    when = func.coalesce(User.referred_at, User.created_at)
+    bursts = []
+    with bind.connect() as conn:
+        rows = conn.execution_options(stream_results=True, yield_per=50_000).execute(
+            select(User.referred_by_id, when)
+            .where(User.referred_by_id.isnot(None), when.isnot(None))
+            .order_by(User.referred_by_id, when)
+        )
+        current, times, best = None, deque(), None
+
+        def flush():
+            if best is not None:
+                bursts.append({"referrer_id": current, "referrals": best[0], "from": best[1].isoformat(),
+                               "to": best[2].isoformat()})
+
+        for ref, t in rows:
+            if ref != current:
+                flush()
+                current, times, best = ref, deque(), None
+            times.append(t)
+            while t - times[0] > window:
+                times.popleft()
+            if len(times) >= threshold and (best is None or len(times) > best[0]):
+                best = (len(times), times[0], t)
+        flush()
+    bursts.sort(key=lambda b: -b["referrals"])
+    return bursts
+
+
+@timed_service
+def check_graph(bind=None, max_examples: int = 50,
+                chain_min_length: int = INTEGRITY_CHAIN_MIN_LENGTH) -> Dict:
+    """
+    Full referral-graph report: self-referrals, dangling referrers, loops,
+    long single-child chains and referral bursts. Each list is capped at
+    `max_examples` (largest first where that applies); the counts are exact.
+    """
+    graph = ReferralGraph.load(bind)
+    dangling = graph.dangling()
+    cycles = graph.cycles()
+    self_refs = [c[0] for c in cycles if len(c) == 1]
+    loops = sorted((c for c in cycles if len(c) > 1), key=len, reverse=True)
+    _, depth = graph.ancestry()
+    chains = graph.long_chains(chain_min_length)
+    bursts = referral_bursts(bind)
+
+    roots = sum(1 for i in range(len(graph)) if graph.present[i] and depth[i] == 0)
+    in_cycle = sum(1 for i in range(len(graph)) if graph.present[i] and depth[i] == _CYCLE)
+    report = {
+        "users": graph.users,
+        "roots": roots,
+        "max_depth": max((d for d in depth if d >= 0), default=0),
+        "counts": {
+            "self_referrals": len(self_refs),
+            "dangling_referrers": len(dangling),
+            "cycles": len(loops),
+            "users_in_or_below_cycles": in_cycle,
+            "long_chains": len(chains),
+            "referral_bursts": len(bursts),
+        },
+        "self_referrals": self_refs[:max_examples],
+        "dangling_referrers": dangling[:max_examples],
+        "cycles": [c[:100] for c in loops[:max_examples]],
+        "long_chains": chains[:max_examples],
+        "referral_bursts": bursts[:max_examples],
+    }
+    problems = sum(v for k, v in report["counts"].items() if k != "users_in_or_below_cycles")
+    if problems:
+        logger.warning("referral graph check: %s", report["counts"])
+    return report
+
+
+@timed_service
+def rebuild_ancestry(bind=None) -> int:
+    """Recompute root_id / referral_depth for every user; returns the number of rows changed."""
+    bind = bind or tenant_bind()
+    graph = ReferralGraph.load(bind)
+    root, depth = graph.ancestry()
+
+    stmt = (
+        update(User.__table__)
+        .where(User.__table__.c.id == bindparam("uid"))
+        .values(root_id=bindparam("root"), referral_depth=bindparam("depth"))
+    )
+    changes = []
+    with bind.begin() as conn:
+        rows = conn.execution_options(stream_results=True, yield_per=50_000).execute(
+            select(User.id, User.root_id, User.referral_depth)
+        )
+        for uid, old_root, old_depth in rows:
+            r, d = root[uid], depth[uid]
+            if r == _CYCLE:
+                r, d = None, None  # unknown: creates_cycle() falls back to the upline walk
+            elif r == uid:
+                r = None
+            if (r, d) != (old_root, old_depth):
+                changes.append({"uid": uid, "root": r, "depth": d})
+        for i in range(0, len(changes), _WRITE_CHUNK):
+            conn.execute(stmt, changes[i:i + _WRITE_CHUNK])
+    return len(changes)
@@ -1,9 +1,40 @@
 # services/reward_service.py
 from db.session import SessionLocal
+from sqlalchemy.exc import IntegrityError
 from db.models import User, Reward, CompanyPool, Deposit
-from config import RANK_REWARD_PCT, EARNING_CAP_MULTIPLIER
+from services.rank_rules_service import get_rules
 from services.user_service import current_rank, earning_cap_left, ensure_cap_flags, reward_route_after_deadline
+from services.event_service import publish_user_event, publish_balance
+from services.stats_service import bump_daily
+from utils.metrics import timed_service, REWARDS, REWARDS_USD, COMPANY_POOL_REDIRECTS, COMPANY_POOL_USD
 
+
+def _publish_reward(ref: User, r: Reward):
+    REWARDS.labels(r.status).inc()
+    if r.amount_usd:
+        REWARDS_USD.inc(r.amount_usd)
+    publish_user_event(ref.telegram_id, "reward", {
+        "deposit_id": r.deposit_id,
+        "status": r.status,
+        "percent": r.percent,
+        "amount_usd": r.amount_usd,
+    })
+
+
+def _insert_once(session, r: Reward) -> bool:
+    """
+    Insert `r` in a savepoint. False if this deposit already rewarded this
+    referrer (uq_reward_deposit_referrer), e.g. a retried or concurrent job.
+    """
+    try:
+        with session.begin_nested():
+            session.add(r)
+    except IntegrityError:
+        return False
+    return True
+
+
+@timed_service
 def credit_reward(referrer: User, referred: User, dep: Deposit):
     """
     Decide how to handle a referral reward for `referrer` when `referred`'s deposit `dep` is approved.
@@ -20,7 +51,7 @@ def credit_reward(referrer: User, referred: User, dep: Deposit):
         # compute route: "credit", "grace_wait", or "redirect"
         route = reward_route_after_deadline(ref)
         rank = current_rank(ref)
-        pct = RANK_REWARD_PCT.get(rank, 0.0)
+        pct = get_rules().reward_pct(rank)
         gross = dep.amount_usd * pct
 
         # grace: don't credit or redirect, just log a grace_wait reward
@@ -34,14 +65,14 @@ def credit_reward(referrer: User, referred: User, dep: Deposit):
                 status="grace_wait",
                 redirected_to_company=False,
             )
-            session.add(r)
+            if not _insert_once(session, r):
+                return
             session.commit()
+            _publish_reward(ref, r)
             return
 
         # redirect: add gross to company pool and log reward as redirected
         if route == "redirect":
-            cp = CompanyPool(amount_usd=gross)
-            session.add(cp)
             r = Reward(
                 referrer_id=ref.id,
                 referred_id=referred.id,
@@ -51,8 +82,14 @@ def credit_reward(referrer: User, referred: User, dep: Deposit):
                 status="redirected",
                 redirected_to_company=True,
             )
-            session.add(r)
+            if not _insert_once(session, r):
+                return
+            session.add(CompanyPool(amount_usd=gross))
+            bump_daily(session, company_pool_usd=gross)
             session.commit()
+            COMPANY_POOL_REDIRECTS.inc()
+            COMPANY_POOL_USD.inc(gross)
+            _publish_reward(ref, r)
             return
 
         # credit path: apply cap
@@ -68,14 +105,38 @@ def credit_reward(referrer: User, referred: User, dep: Deposit):
             status="credited",
             redirected_to_company=False,
         )
-        session.add(r)
+        # idempotent: a retried job must not pay the same deposit twice
+        if not _insert_once(session, r):
+            return
 
         if amount > 0:
             ref.musd_balance = (ref.musd_balance or 0.0) + amount
             ref.earned_total_usd = (ref.earned_total_usd or 0.0) + amount
+        bump_daily(session, rewards_credited=1, rewards_usd=amount)
 
         session.commit()
 
         # If this credit exhausted the cap, set cap flags (starts grace window)
         ensure_cap_flags(ref)
         session.commit()
+
+        _publish_reward(ref, r)
+        if amount > 0:
+            publish_balance(ref)
+
+
+@timed_service
+def process_referral_reward(dep: Deposit):
+    """
+    Run the referral reward for an approved deposit: credit the depositor's
+    direct referrer (if any). Called by the "referral_reward" job
+    (services/job_service.py); safe to call more than once per deposit.
+    """
+    with SessionLocal() as session:
+        user = session.get(User, dep.user_id)
+        if user is None or not user.referred_by_id:
+            return
+        ref = session.get(User, user.referred_by_id)
+    if ref is not None:
+        # credit_reward handles cap/grace/redirect logic
+        credit_reward(ref, user, dep)
@@ -0,0 +1,127 @@
+# services/stats_service.py
+"""
+Daily admin statistics, kept as one daily_stats row per UTC day.
+
+Services call bump_daily() inside the transaction that records the event
+(new user, deposit created/approved/rejected, reward, company-pool
+inflow), so the rollup never drifts from the raw tables. Reading N days is
+a primary-key range scan over N rows, whatever the history size.
+
+rebuild_daily_stats() recomputes the table from the raw rows, for existing
+databases or after manual edits.
+"""
+import datetime as dt
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import Float, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db.session import SessionLocal, tenant_bind
+from db.models import User, CompanyPool, ClubPayout, DailyStats
+from services.archive_service import all_rows
+from utils.metrics import timed_service
+
+COUNTERS = [c.name for c in DailyStats.__table__.columns if c.name != "day"]
+_ZERO = {c.name: 0.0 if isinstance(c.type, Float) else 0 for c in DailyStats.__table__.columns if c.name != "day"}
+MAX_DAYS = 366
+
+
+def bump_daily(session, when: Optional[dt.datetime] = None, **deltas) -> None:
+    """Add `deltas` (counter name -> amount) to the row for `when`'s UTC day."""
+    day = (when or dt.datetime.utcnow()).date()
+    stmt = (
+        update(DailyStats)
+        .where(DailyStats.day == day)
+        .values({getattr(DailyStats, k): getattr(DailyStats, k) + v for k, v in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if session.execute(stmt).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.execute(insert(DailyStats).values(day=day, **{**_ZERO, **deltas}))
+    except IntegrityError:
+        # another writer created the day's row first
+        session.execute(stmt)
+
+
+@timed_service
+def get_daily_stats(days: int = 7, today: Optional[dt.date] = None) -> Dict:
+    """Last `days` days (newest first, zero-filled) plus their totals."""
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+    today = today or dt.datetime.utcnow().date()
+    start = today - dt.timedelta(days=days - 1)
+    with SessionLocal() as session:
+        rows = {
+            r.day: r for r in session.execute(
+                select(DailyStats).where(DailyStats.day >= start, DailyStats.day <= today)
+            ).scalars()
+        }
+
+    out = []
+    totals = dict(_ZERO)
+    for i in range(days):
+        day = today - dt.timedelta(days=i)
+        r = rows.get(day)
+        entry = {"day": day.isoformat()}
+        for c in COUNTERS:
+            v = (getattr(r, c) or _ZERO[c]) if r is not None else _ZERO[c]
+            entry[c] = round(v, 2) if isinstance(v, float) else v
+            totals[c] += v
+        out.append(entry)
+    totals = {c: round(v, 2) if isinstance(v, float) else v for c, v in totals.items()}
+    return {"from": start.isoformat(), "to": today.isoformat(), "days": out, "totals": totals}
+
+
+@timed_service
+def rebuild_daily_stats(bind=None) -> int:
+    """Recompute daily_stats from users, deposits, rewards (hot and archived), club payouts and company_pool."""
+    bind = bind or tenant_bind()
+    stats: Dict[dt.date, Dict[str, float]] = defaultdict(lambda: dict(_ZERO))
+
+    def add(when, **deltas):
+        if when is None:
+            return
+        row = stats[when.date()]
+        for k, v in deltas.items():
+            row[k] += v
+
+    with bind.begin() as conn:
+        stream = conn.execution_options(stream_results=True)
+        for (created,) in stream.execute(select(User.created_at)):
+            add(created, new_users=1)
+
+        deps, rewards = all_rows("deposits"), all_rows("rewards")
+        first_approval = {}
+        for uid, amount, created, approved, approved_at, rejected in stream.execute(
+            select(deps.c.user_id, deps.c.amount_usd, deps.c.created_at, deps.c.approved,
+                   deps.c.approved_at, deps.c.rejected)
+        ):
+            add(created, deposits_created=1, deposits_created_usd=amount or 0.0)
+            if approved:
+                when = approved_at or created
+                add(when, deposits_approved=1, deposits_approved_usd=amount or 0.0)
+                if uid not in first_approval or when < first_approval[uid]:
+                    first_approval[uid] = when
+            elif rejected:
+                add(created, deposits_rejected=1)
+        for when in first_approval.values():
+            add(when, activations=1)
+
+        for created, amount in stream.execute(
+            select(rewards.c.created_at, rewards.c.amount_usd).where(rewards.c.status == "credited")
+        ):
+            add(created, rewards_credited=1, rewards_usd=amount or 0.0)
+        for created, amount in stream.execute(
+            select(ClubPayout.created_at, ClubPayout.amount_usd).where(ClubPayout.status == "credited")
+        ):
+            add(created, rewards_credited=1, rewards_usd=amount or 0.0)
+        for created, amount in stream.execute(select(CompanyPool.created_at, CompanyPool.amount_usd)):
+            add(created, company_pool_usd=amount or 0.0)
+
+        conn.execute(delete(DailyStats))
+        if stats:
+            conn.execute(insert(DailyStats), [{"day": day, **row} for day, row in stats.items()])
+    return len(stats)
@@ -0,0 +1,249 @@
+# services/turnover_service.py
+"""
+Monthly turnover rollups and the club bonus built on them.
+
+Every approved deposit adds its amount to the depositor's personal_usd and
+to team_usd of each upline member for the approval month, inside the same
+transaction as the approval. A user's first approval also bumps
+team_activations up the upline. Rank checks (user_service.team_totals) and
+club payouts then read these rows instead of scanning deposits.
+
+rebuild_turnover() recomputes everything from the raw deposits, for
+existing databases and after referral edits.
+"""
+import datetime as dt
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db.session import SessionLocal, tenant_bind
+from db.models import User, Deposit, MonthlyTurnover, ClubPayout, CompanyPool
+from services.archive_service import all_rows
+from services.event_service import publish_balance, publish_user_event
+from services.stats_service import bump_daily
+from services.rank_rules_service import get_rules
+from services.referral_integrity_service import upline_ids
+from services.user_service import earning_cap_left, ensure_cap_flags, reward_route_after_deadline
+from utils.metrics import timed_service
+
+logger = logging.getLogger(__name__)
+
+_IN_CHUNK = 500
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def month_key(when: Optional[dt.datetime] = None) -> str:
+    return (when or dt.datetime.utcnow()).strftime("%Y-%m")
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for i in range(0, len(ids), _IN_CHUNK):
+        yield ids[i:i + _IN_CHUNK]
+
+
+def _bump(session, user_ids: List[int], month: str, **deltas) -> None:
+    """Add `deltas` to the (user, month) rows, creating the missing ones."""
+    # an upline walked through a legacy referral loop repeats ids; count each once
+    user_ids = list(dict.fromkeys(user_ids))
+    for ids in _chunks(user_ids):
+        existing = set(session.execute(
+            select(MonthlyTurnover.user_id)
+            .where(MonthlyTurnover.month == month, MonthlyTurnover.user_id.in_(ids))
+        ).scalars())
+        if existing:
+            session.execute(
+                update(MonthlyTurnover)
+                .where(MonthlyTurnover.month == month, MonthlyTurnover.user_id.in_(existing))
+                .values({getattr(MonthlyTurnover, k): getattr(MonthlyTurnover, k) + v for k, v in deltas.items()})
+                .execution_options(synchronize_session=False)
+            )
+        missing = [uid for uid in ids if uid not in existing]
+        if missing:
+            base = {"personal_usd": 0.0, "team_usd": 0.0, "team_activations": 0}
+            session.execute(insert(MonthlyTurnover), [
+                {**base, **deltas, "user_id": uid, "month": month} for uid in missing
+            ])
+
+
+def record_approved_deposit(session, user: User, dep: Deposit, activated: bool) -> None:
+    """
+    Apply an approval to the rollups. Called by approve_deposit inside its
+    own session, so the rollups commit (or roll back) with the approval.
+    """
+    month = month_key(dep.approved_at)
+    _bump(session, [user.id], month, personal_usd=dep.amount_usd)
+    upline = upline_ids(session, user.id)
+    if upline:
+        deltas = {"team_usd": dep.amount_usd}
+        if activated:
+            deltas["team_activations"] = 1
+        _bump(session, upline, month, **deltas)
+
+
+def _depths(parents: Dict[int, Optional[int]]) -> Dict[int, int]:
+    depth: Dict[int, int] = {}
+    for start in parents:
+        path = []
+        seen = set()
+        node = start
+        while node is not None and node not in depth:
+            if node in seen:
+                logger.warning("referral cycle through user %s; treating it as a root", node)
+                node = None
+                break
+            seen.add(node)
+            path.append(node)
+            node = parents.get(node)
+        d = depth[node] if node is not None else -1
+        for n in reversed(path):
+            d += 1
+            depth[n] = d
+    return depth
+
+
+@timed_service
+def rebuild_turnover(bind=None) -> int:
+    """
+    Recompute monthly_turnover from approved (hot and archived) deposits. Children are folded
+    into their referrer deepest-first, so the cost is O(users x months)
+    however deep the tree is. Returns the number of rows written.
+    """
+    bind = bind or tenant_bind()
+    with bind.begin() as conn:
+        parents = dict(conn.execute(select(User.id, User.referred_by_id)).all())
+
+        # user -> month -> [personal, team, team_activations]
+        stats: Dict[int, Dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0, 0]))
+        first_approval: Dict[int, dt.datetime] = {}
+        deps = all_rows("deposits")
+        rows = conn.execution_options(stream_results=True).execute(
+            select(deps.c.user_id, deps.c.amount_usd, func.coalesce(deps.c.approved_at, deps.c.created_at))
+            .where(deps.c.approved.is_(True))
+        )
+        for uid, amount, when in rows:
+            stats[uid][month_key(when)][0] += amount or 0.0
+            if uid not in first_approval or when < first_approval[uid]:
+                first_approval[uid] = when
+        activation_month = {uid: month_key(when) for uid, when in first_approval.items()}
+
+        depth = _depths(parents)
+        for uid in sorted(parents, key=depth.__getitem__, reverse=True):
+            parent = parents[uid]
+            # roots, and the edge _depths cut to break a cycle
+            if parent is None or depth.get(parent, -1) != depth[uid] - 1:
+                continue
+            if uid not in stats and uid not in activation_month:
+                continue
+            pstats = stats[parent]
+            for month, (personal, team, acts) in stats.get(uid, {}).items():
+                cell = pstats[month]
+                cell[1] += personal + team
+                cell[2] += acts
+            if uid in activation_month:
+                pstats[activation_month[uid]][2] += 1
+
+        conn.execute(delete(MonthlyTurnover))
+        out = [
+            {"user_id": uid, "month": month, "personal_usd": v[0], "team_usd": v[1], "team_activations": v[2]}
+            for uid, months in stats.items() for month, v in months.items()
+        ]
+        for i in range(0, len(out), 20_000):
+            conn.execute(insert(MonthlyTurnover), out[i:i + 20_000])
+    return len(out)
+
+
+def _previous_month(now: Optional[dt.datetime] = None) -> str:
+    first = (now or dt.datetime.utcnow()).replace(day=1)
+    return month_key(first - dt.timedelta(days=1))
+
+
+@timed_service
+def pay_club_bonuses(month: Optional[str] = None) -> Dict:
+    """
+    Pay the monthly club bonus for a finished month (default: last month).
+
+    A user qualifies when their team turnover for the month reaches their
+    rank's monthly_club; the bonus is club_turnover_percent of that
+    turnover. The rank is the one held at the end of that month (rollups up
+    to it), so a late run pays what an on-time run would have. The whole
+    pass uses one snapshot of the live rank rules. Cap, grace and redirect
+    rules match referral rewards.
+    One ClubPayout row per (user, month) makes re-runs a no-op.
+    """
+    month = month or _previous_month()
+    if not _MONTH_RE.match(month):
+        raise ValueError("Month must look like YYYY-MM")
+    if month >= month_key():
+        raise ValueError(f"{month} is not finished yet")
+
+    summary = {"month": month, "credited": 0, "grace_wait": 0, "redirected": 0, "amount_usd": 0.0}
+    rules = get_rules()
+    if rules.min_monthly_club is None:
+        return summary
+
+    credited = []
+    pool_usd = 0.0
+    with SessionLocal() as session:
+        paid = select(ClubPayout.user_id).where(ClubPayout.month == month)
+        candidates = dict(session.execute(
+            select(MonthlyTurnover.user_id, MonthlyTurnover.team_usd)
+            .where(MonthlyTurnover.month == month, MonthlyTurnover.team_usd >= rules.min_monthly_club,
+                   MonthlyTurnover.user_id.not_in(paid))
+        ).all())
+
+        for ids in _chunks(list(candidates)):
+            totals = {uid: (tb, act) for uid, tb, act in session.execute(
+                select(MonthlyTurnover.user_id, func.sum(MonthlyTurnover.team_usd),
+                       func.sum(MonthlyTurnover.team_activations))
+                .where(MonthlyTurnover.user_id.in_(ids), MonthlyTurnover.month <= month)
+                .group_by(MonthlyTurnover.user_id)
+            )}
+            users = session.execute(select(User).where(User.id.in_(ids))).scalars().all()
+            for u in users:
+                rank = rules.rank_for(*totals[u.id]) if u.is_active else rules.lowest
+                req = rules.requirements(rank)
+                turnover = candidates[u.id]
+                if req["monthly_club"] <= 0 or turnover < req["monthly_club"]:
+                    continue
+
+                pct = req["club_turnover_percent"]
+                gross = round(turnover * pct / 100.0, 2)
+                route = reward_route_after_deadline(u)
+                amount = 0.0
+                if route == "credit":
+                    status = "credited"
+                    amount = min(gross, earning_cap_left(u))
+                    if amount > 0:
+                        u.musd_balance = (u.musd_balance or 0.0) + amount
+                        u.earned_total_usd = (u.earned_total_usd or 0.0) + amount
+                        credited.append((u, amount))
+                elif route == "grace_wait":
+                    status = "grace_wait"
+                else:
+                    status = "redirected"
+                    session.add(CompanyPool(amount_usd=gross))
+                    pool_usd += gross
+
+                session.add(ClubPayout(user_id=u.id, month=month, rank=rank, team_turnover_usd=turnover,
+                                       percent=pct, amount_usd=amount, status=status))
+                summary[status] += 1
+                summary["amount_usd"] += amount
+
+        bump_daily(session, rewards_credited=summary["credited"], rewards_usd=summary["amount_usd"],
+                   company_pool_usd=pool_usd)
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise ValueError(f"Club payout for {month} is already running")
+
+    for u, amount in credited:
+        ensure_cap_flags(u)
+        publish_user_event(u.telegram_id, "club_bonus", {"month": month, "amount_usd": amount})
+        publish_balance(u)
+    summary["amount_usd"] = round(summary["amount_usd"], 2)
+    return summary
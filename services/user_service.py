@@ -1,17 +1,30 @@
 from db.session import SessionLocal
-from db.models import User, Deposit
+from db.models import User, MonthlyTurnover
 from sqlalchemy import select, func
-from typing import Optional, Set
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Set, Tuple
 import datetime as dt
-from config import GRACE_HOURS, EARNING_CAP_MULTIPLIER, REQUIREMENTS, Rank
+import logging
+import re
+from config import GRACE_HOURS, EARNING_CAP_MULTIPLIER
+from services.rank_rules_service import get_rules
+from services.referral_integrity_service import attach_referrer, creates_cycle
+from services.stats_service import bump_daily
+from utils.metrics import timed_service
 
+logger = logging.getLogger(__name__)
 
+WALLET_RE = re.compile(r"^0x[0-9a-f]{40}$")
+
+
+@timed_service
 def get_or_create_user(tg_user) -> User:
     with SessionLocal() as session:
         u = session.execute(select(User).where(User.telegram_id == tg_user.id)).scalar_one_or_none()
         if not u:
             u = User(telegram_id=tg_user.id, username=tg_user.username)
             session.add(u)
+            bump_daily(session, new_users=1)
             session.commit()
             session.refresh(u)
         else:
@@ -21,6 +34,7 @@ def get_or_create_user(tg_user) -> User:
         return u
 
 
+@timed_service
 def set_referrer_if_first_time(user: User, referrer_tg_id: Optional[int]) -> Optional[User]:
     with SessionLocal() as session:
         u = session.get(User, user.id)
@@ -31,11 +45,43 @@ def set_referrer_if_first_time(user: User, referrer_tg_id: Optional[int]) -> Opt
         ref = session.execute(select(User).where(User.telegram_id == referrer_tg_id)).scalar_one_or_none()
         if not ref:
             return None
-        u.referred_by_id = ref.id
+        if creates_cycle(session, u, ref):
+            logger.warning("refused referral of user %s by %s: it would close a referral loop", u.id, ref.id)
+            return None
+        attach_referrer(session, u, ref)
         session.commit()
         return ref
 
 
+@timed_service
+def register_wallet(user: User, address: str) -> User:
+    """
+    Bind the wallet the user sends deposits from. On-chain deposits only
+    count transfers from this address, so a tx hash copied off a block
+    explorer is worthless to anyone else. First come, first served: a wallet
+    belongs to one account and, once set, changes only by an admin edit in the DB.
+    """
+    address = (address or "").strip().lower()
+    if not WALLET_RE.match(address):
+        raise ValueError("Wallet must be a 0x-prefixed 20-byte hex address")
+    with SessionLocal() as session:
+        u = session.get(User, user.id)
+        if u is None:
+            raise ValueError("User not found in DB")
+        if u.wallet_address == address:
+            return u
+        if u.wallet_address:
+            raise ValueError("Another wallet is already registered for this account")
+        u.wallet_address = address
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise ValueError("This wallet is registered to another account")
+        return u
+
+
+@timed_service
 def compute_downline(root_user: User) -> Set[int]:
     with SessionLocal() as session:
         visited = set()
@@ -51,40 +97,35 @@ def compute_downline(root_user: User) -> Set[int]:
         return visited
 
 
-def team_business_usd(root_user: User) -> float:
-    ids = compute_downline(root_user)
-    if not ids:
-        return 0.0
+@timed_service
+def team_totals(user_id: int) -> Tuple[float, int]:
+    """
+    (team business USD, active users in the downline) from the monthly
+    turnover rollups: one indexed aggregate over the user's month rows.
+    """
     with SessionLocal() as session:
-        total = session.execute(
-            select(func.coalesce(func.sum(Deposit.amount_usd), 0.0))
-            .where(Deposit.user_id.in_(ids), Deposit.approved.is_(True))
-        ).scalar_one()
-        return float(total or 0.0)
+        tb, act = session.execute(
+            select(func.coalesce(func.sum(MonthlyTurnover.team_usd), 0.0),
+                   func.coalesce(func.sum(MonthlyTurnover.team_activations), 0))
+            .where(MonthlyTurnover.user_id == user_id)
+        ).one()
+        return float(tb or 0.0), int(act or 0)
+
+
+def team_business_usd(root_user: User) -> float:
+    return team_totals(root_user.id)[0]
 
 
 def active_origin_count(root_user: User) -> int:
-    ids = compute_downline(root_user)
-    if not ids:
-        return 0
-    with SessionLocal() as session:
-        count = session.execute(
-            select(func.count(User.id)).where(User.id.in_(ids), User.is_active.is_(True))
-        ).scalar_one()
-        return int(count or 0)
+    return team_totals(root_user.id)[1]
 
 
+@timed_service
 def current_rank(user: User):
+    rules = get_rules()
     if not user.is_active:
-        return Rank.Origin
-    tb = team_business_usd(user)
-    act = active_origin_count(user)
-    achieved = [Rank.Origin]
-    for rank in [Rank.LifeChanger, Rank.Advisor, Rank.Visionary, Rank.Creator]:
-        req = REQUIREMENTS[rank]
-        if tb >= req["min_team_business"] and act >= req["active_origins_in_group"]:
-            achieved.append(rank)
-    return achieved[-1]
+        return rules.lowest
+    return rules.rank_for(*team_totals(user.id))
 
 
 def earning_cap_left(user: User) -> float:
@@ -0,0 +1,41 @@
+# tests/conftest.py
+"""
+Shared fixtures. The suite runs against a throwaway SQLite database and an
+unreachable Redis, so it needs no services; set both before any repo module
+is imported.
+"""
+import os
+import sys
+import tempfile
+import types
+
+_TMP = tempfile.mkdtemp(prefix="referral_tests_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP, "test.db")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1/0")
+os.environ["BOT_TENANTS"] = ""
+os.environ["BOT_TENANTS_FILE"] = ""
+os.environ["TENANT"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from db.models import Base  # noqa: E402
+from db.session import engine  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def db():
+    """Fresh tables for every test."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture
+def make_user():
+    """make_user(telegram_id) -> User, created through the user service."""
+    from services.user_service import get_or_create_user
+
+    def make(telegram_id: int, username: str = None):
+        return get_or_create_user(types.SimpleNamespace(id=telegram_id, username=username or f"u{telegram_id}"))
+    return make
@@ -0,0 +1,108 @@
+# tests/test_archive_service.py
+import datetime as dt
+
+import pytest
+from sqlalchemy import func, select
+
+from db.session import SessionLocal
+from db.models import ArchiveSummary, Deposit, DepositArchive, Job, Reward, RewardArchive
+from services.archive_service import all_rows, archive_old_rows, user_history
+
+OLD = dt.datetime(2020, 1, 15)
+
+
+def _deposit(user, amount=20.0, approved=True, rejected=False, created_at=OLD) -> int:
+    with SessionLocal() as session:
+        dep = Deposit(user_id=user.id, amount_usd=amount, approved=approved, rejected=rejected,
+                      created_at=created_at)
+        session.add(dep)
+        session.commit()
+        return dep.id
+
+
+def _reward(referrer, referred, deposit_id, amount=2.0, created_at=OLD) -> int:
+    with SessionLocal() as session:
+        reward = Reward(referrer_id=referrer.id, referred_id=referred.id, deposit_id=deposit_id,
+                        percent=10, amount_usd=amount, created_at=created_at)
+        session.add(reward)
+        session.commit()
+        return reward.id
+
+
+def _ids(model) -> set:
+    with SessionLocal() as session:
+        return set(session.scalars(select(model.id)))
+
+
+def _totals(table: str):
+    rows = all_rows(table)
+    with SessionLocal() as session:
+        return session.execute(select(func.count(), func.sum(rows.c.amount_usd))).one()
+
+
+def test_pending_deposits_stay_hot(make_user):
+    user = make_user(1)
+    pending = _deposit(user, approved=False)
+    settled = _deposit(user)
+    assert archive_old_rows(days=30) == {"rewards": 0, "deposits": 1}
+    assert _ids(Deposit) == {pending}
+    assert _ids(DepositArchive) == {settled}
+
+
+def test_deposit_with_a_hot_reward_stays_hot(make_user):
+    referrer, user = make_user(1), make_user(2)
+    dep = _deposit(user)
+    _reward(referrer, user, dep, created_at=dt.datetime.utcnow())
+    assert archive_old_rows(days=30) == {"rewards": 0, "deposits": 0}
+    assert _ids(Deposit) == {dep}
+
+
+def test_deposit_with_an_unfinished_job_stays_hot(make_user):
+    user = make_user(1)
+    dep = _deposit(user)
+    with SessionLocal() as session:
+        session.add(Job(kind="referral_reward", deposit_id=dep, status="dead"))
+        session.commit()
+    assert archive_old_rows(days=30)["deposits"] == 0
+
+    with SessionLocal() as session:
+        session.execute(Job.__table__.update().values(status="done"))
+        session.commit()
+    assert archive_old_rows(days=30)["deposits"] == 1
+
+
+def test_rewards_go_first_so_their_deposits_follow_in_the_same_run(make_user):
+    referrer, user = make_user(1), make_user(2)
+    dep = _deposit(user)
+    reward = _reward(referrer, user, dep)
+    assert archive_old_rows(days=30) == {"rewards": 1, "deposits": 1}
+    assert _ids(RewardArchive) == {reward} and _ids(DepositArchive) == {dep}
+    assert not _ids(Reward) and not _ids(Deposit)
+
+
+def test_second_run_adds_to_existing_summary_rows(make_user):
+    user = make_user(1)
+    _deposit(user, amount=20)
+    archive_old_rows(days=30)
+    _deposit(user, amount=30, created_at=OLD + dt.timedelta(days=1))
+    archive_old_rows(days=30)
+
+    with SessionLocal() as session:
+        summary = session.scalars(select(ArchiveSummary)).all()
+    assert [(s.table_name, s.user_id, s.month, s.status, s.rows, s.amount_usd) for s in summary] == [
+        ("deposits", user.id, "2020-01", "approved", 2, 50.0),
+    ]
+
+
+@pytest.mark.parametrize("batch_size", [1, 5000])
+def test_totals_are_unchanged_by_archiving(make_user, batch_size):
+    referrer, user = make_user(1), make_user(2)
+    for amount in (10, 20, 30):
+        _reward(referrer, user, _deposit(user, amount=amount), amount=amount / 10)
+    _deposit(user, amount=40, approved=False, rejected=True)
+    _deposit(user, amount=50, approved=False)
+    _deposit(user, amount=60, created_at=dt.datetime.utcnow())
+
+    before = (user_history(1), user_history(2), _totals("deposits"), _totals("rewards"))
+    assert archive_old_rows(days=30, batch_size=batch_size) == {"rewards": 3, "deposits": 4}
+    assert (user_history(1), user_history(2), _totals("deposits"), _totals("rewards")) == before
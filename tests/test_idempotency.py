@@ -0,0 +1,93 @@
+# tests/test_idempotency.py
+import fakeredis
+import pytest
+import redis
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from db.session import SessionLocal
+from db.models import Deposit
+from webapp import app as webapp, idempotency, rate_limit, telegram_init_verify as tiv
+from webapp.idempotency import IdempotentRequest
+
+WALLET = "0x" + "cc" * 20
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    for module in (tiv, idempotency, rate_limit):
+        monkeypatch.setattr(module, "get_redis", lambda: r)
+    monkeypatch.setattr(tiv, "_revocations", {})
+    monkeypatch.setattr(rate_limit, "limiter", rate_limit.TokenBucketLimiter())  # fresh buckets
+    return r
+
+
+@pytest.fixture
+def client(fake_redis):
+    return TestClient(webapp.app)
+
+
+def _post(client, key, **overrides):
+    token = tiv._redis_create_session({"id": "42"})["token"]
+    body = {"amount_usd": 20.0, "tx_musd": "0x" + "01" * 32, "tx_mstc": "0x" + "02" * 32, "wallet": WALLET,
+            "musd_usd": 14.0, "mstc_usd": 6.0}
+    body.update(overrides)
+    return client.post("/api/submit_onchain_deposit", json=body,
+                       headers={"Authorization": f"Bearer {token}", "Idempotency-Key": key})
+
+
+def _deposits() -> int:
+    with SessionLocal() as session:
+        return session.scalar(select(func.count()).select_from(Deposit))
+
+
+def test_replay_returns_the_cached_response(client):
+    first = _post(client, "k1")
+    assert first.status_code == 200
+    # the mini-app's auto-resume sends the stored body again, wallet in any case
+    again = _post(client, "k1", wallet=WALLET.upper().replace("0X", "0x"))
+    assert again.status_code == 200 and again.json() == first.json()
+    assert _deposits() == 1
+
+
+def test_different_payload_with_the_same_key_is_refused(client):
+    assert _post(client, "k1").status_code == 200
+    res = _post(client, "k1", amount_usd=40.0)
+    assert res.status_code == 422
+    assert _deposits() == 1
+
+
+def test_failed_request_releases_its_key(client):
+    assert _post(client, "k1", wallet=None).status_code == 400  # no wallet registered yet
+    assert _post(client, "k1", wallet=None).status_code == 400  # processed again, not 409
+
+
+def test_in_flight_key_gets_409(fake_redis):
+    IdempotentRequest("s", "k1", {"a": 1}).begin()
+    with pytest.raises(HTTPException) as e:
+        IdempotentRequest("s", "k1", {"a": 1}).begin()
+    assert e.value.status_code == 409 and e.value.headers == {"Retry-After": "1"}
+
+
+def test_abandon_releases_the_claim(fake_redis):
+    first = IdempotentRequest("s", "k1", {"a": 1})
+    first.begin()
+    first.abandon()
+    retry = IdempotentRequest("s", "k1", {"a": 1})
+    assert retry.begin() is None and retry._claimed
+
+
+def test_redis_outage_falls_through(monkeypatch):
+    class Down:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise redis.ConnectionError("down")
+            return fail
+
+    monkeypatch.setattr(idempotency, "get_redis", lambda: Down())
+    idem = IdempotentRequest("s", "k1", {"a": 1})
+    assert idem.begin() is None
+    idem.finish({"ok": True})
+    idem.abandon()
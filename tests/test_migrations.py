@@ -0,0 +1,48 @@
+# tests/test_migrations.py
+from sqlalchemy import inspect, text
+
+from db.models import Base, User
+from db.migrations import upgrade
+from db.session import SessionLocal, engine
+from scripts.init_db import backfill
+from utils.tenancy import current_tenant
+
+
+def _legacy_schema():
+    """users / deposits as they looked before the ancestry index and on-chain deposits."""
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id INTEGER NOT NULL UNIQUE, "
+                          "username VARCHAR, referred_by_id INTEGER REFERENCES users(id), "
+                          "is_active BOOLEAN, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE deposits (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "amount_usd FLOAT NOT NULL, approved BOOLEAN, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO users (id, telegram_id, referred_by_id) VALUES (1, 10, NULL), "
+                          "(2, 20, 1), (3, 30, 2)"))
+        conn.execute(text("INSERT INTO deposits (id, user_id, amount_usd, approved) VALUES (1, 3, 20, 0)"))
+
+
+def test_upgrade_adds_columns_and_indexes():
+    _legacy_schema()
+    report = upgrade(Base.metadata, current_tenant())
+    assert {"users.root_id", "users.referral_depth", "users.wallet_address", "deposits.tx_musd",
+            "deposits.rejected"} <= set(report["columns"])
+    assert "monthly_turnover" in report["tables"]
+
+    insp = inspect(engine)
+    unique = {tuple(i["column_names"]) for i in insp.get_indexes("deposits") if i["unique"]}
+    assert {("tx_musd",), ("tx_mstc",)} <= unique
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT rejected FROM deposits")).scalar() == 0
+
+    again = upgrade(Base.metadata, current_tenant())
+    assert not (again["tables"] or again["columns"] or again["indexes"])
+
+
+def test_backfill_fills_ancestry_index():
+    _legacy_schema()
+    upgrade(Base.metadata, current_tenant())
+    backfill(current_tenant())
+    with SessionLocal() as session:
+        leaf = session.get(User, 3)
+        assert (leaf.root_id, leaf.referral_depth) == (1, 2)
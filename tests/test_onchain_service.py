@@ -0,0 +1,150 @@
+# tests/test_onchain_service.py
+import datetime as dt
+from collections import OrderedDict
+
+import pytest
+
+from db.session import SessionLocal
+from db.models import Deposit, DepositArchive
+from scripts.fake_evm_rpc import FakeChain, serve_in_thread
+from services import onchain_service
+from services.deposit_service import create_deposit
+from services.onchain_service import JsonRpcClient, verify_pending_deposits
+from services.user_service import register_wallet
+
+MUSD = "0x" + "aa" * 20
+MSTC = "0x" + "bb" * 20
+WALLET = "0x" + "cc" * 20
+RECEIVER = onchain_service.DEPOSIT_RECEIVER_ADDRESS
+
+
+def _tx(n: int) -> str:
+    return "0x" + format(n, "064x")
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    monkeypatch.setattr(onchain_service, "MUSD_TOKEN_ADDRESS", MUSD)
+    monkeypatch.setattr(onchain_service, "MSTC_TOKEN_ADDRESS", MSTC)
+    monkeypatch.setattr(onchain_service, "_receipt_cache", OrderedDict())
+    chain = FakeChain(block_number=10)
+    server = serve_in_thread(chain)
+    chain.client = JsonRpcClient(f"http://127.0.0.1:{server.server_address[1]}")
+    yield chain
+    server.shutdown()
+
+
+def _deposit(make_user, telegram_id: int, n: int, wallet: str = WALLET) -> Deposit:
+    """A $20 deposit (MUSD $14 + MSTC $6) with tx hashes _tx(n) and _tx(n + 1)."""
+    user = make_user(telegram_id)
+    register_wallet(user, wallet)
+    return create_deposit(user, 20, tx_musd=_tx(n), tx_mstc=_tx(n + 1))
+
+
+def _send(chain, dep, musd=14.0, mstc=6.0, musd_token=MUSD, **kwargs):
+    kwargs.setdefault("sender", WALLET)
+    chain.add_transfer(tx=dep.tx_musd, token=musd_token, to=RECEIVER, amount=musd, **kwargs)
+    chain.add_transfer(tx=dep.tx_mstc, token=MSTC, to=RECEIVER, amount=mstc, **kwargs)
+
+
+def _reload(dep: Deposit) -> Deposit:
+    with SessionLocal() as session:
+        return session.get(Deposit, dep.id)
+
+
+def test_approves_matching_transfers(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep)
+    assert verify_pending_deposits(chain.client) == {"approved": 1, "rejected": 0, "waiting": 0}
+    assert _reload(dep).approved
+
+
+def test_rejects_short_amount(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep, musd=10.0)
+    assert verify_pending_deposits(chain.client)["rejected"] == 1
+    assert _reload(dep).reject_reason == "transferred $10.00, expected $14.00"
+
+
+def test_rejects_wrong_token(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep, musd_token=MSTC)
+    verify_pending_deposits(chain.client)
+    assert _reload(dep).reject_reason == "no transfer from your wallet"
+
+
+def test_rejects_reverted_transaction(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep, status=0)
+    verify_pending_deposits(chain.client)
+    assert _reload(dep).reject_reason == "transaction failed on-chain"
+
+
+def test_rejects_transfer_from_another_wallet(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep, sender="0x" + "dd" * 20)
+    verify_pending_deposits(chain.client)
+    assert _reload(dep).reject_reason == "no transfer from your wallet"
+
+
+def test_waits_for_confirmations(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep, block=9)
+    assert verify_pending_deposits(chain.client)["waiting"] == 1
+    chain.block_number = 11
+    assert verify_pending_deposits(chain.client)["approved"] == 1
+
+
+def test_unmined_waits_then_expires(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    assert verify_pending_deposits(chain.client)["waiting"] == 1
+    with SessionLocal() as session:
+        session.get(Deposit, dep.id).created_at = dt.datetime.utcnow() - dt.timedelta(days=30)
+        session.commit()
+    assert verify_pending_deposits(chain.client)["rejected"] == 1
+    assert _reload(dep).reject_reason == "tx not found"
+
+
+def test_unmined_deposits_do_not_starve_newer_ones(chain, make_user):
+    stuck = [_deposit(make_user, i, 100 + 2 * i, wallet="0x" + format(i, "040x")) for i in range(1, 4)]
+    fresh = _deposit(make_user, 9, 500)
+    _send(chain, fresh)
+    assert verify_pending_deposits(chain.client, page_size=2) == {"approved": 1, "rejected": 0, "waiting": 3}
+    assert _reload(fresh).approved and not any(_reload(d).approved for d in stuck)
+
+
+def test_rejects_hash_reused_from_archive(chain, make_user):
+    dep = _deposit(make_user, 1, 100)
+    _send(chain, dep)
+    with SessionLocal() as session:
+        session.add(DepositArchive(id=dep.id + 1000, user_id=dep.user_id, amount_usd=20, approved=True,
+                                   tx_musd=dep.tx_musd.upper().replace("0X", "0x"), tx_mstc=_tx(1)))
+        session.commit()
+    verify_pending_deposits(chain.client)
+    assert _reload(dep).reject_reason == "transaction hash reused"
+
+
+def test_rejects_hash_reused_across_legs(chain, make_user):
+    first = _deposit(make_user, 1, 100)
+    _send(chain, first)
+    # written around create_deposit's checks: legacy rows, manual edits
+    with SessionLocal() as session:
+        second = Deposit(user_id=first.user_id, amount_usd=20, musd=14, mstc=6,
+                         tx_musd=_tx(300), tx_mstc=first.tx_musd)
+        session.add(second)
+        session.commit()
+    chain.add_transfer(tx=_tx(300), token=MUSD, to=RECEIVER, amount=14.0, sender=WALLET)
+    assert verify_pending_deposits(chain.client) == {"approved": 1, "rejected": 1, "waiting": 0}
+    assert _reload(first).approved
+    assert _reload(second).reject_reason == "transaction hash reused"
+
+
+def test_deposit_needs_registered_wallet(make_user):
+    with pytest.raises(ValueError):
+        create_deposit(make_user(1), 20, tx_musd=_tx(100), tx_mstc=_tx(101))
+
+
+def test_wallet_belongs_to_one_user(make_user):
+    register_wallet(make_user(1), WALLET)
+    with pytest.raises(ValueError):
+        register_wallet(make_user(2), WALLET.upper().replace("0X", "0x"))
@@ -0,0 +1,67 @@
+# tests/test_query_budget.py
+"""The N+1 fixes stay fixed: these paths cost the same few queries however big the data."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from db.query_budget import assert_max_queries
+from db.session import SessionLocal
+from db.models import User
+from handlers.admin_handlers import pending_cmd
+from services.deposit_service import approve_deposit, create_deposit
+from services.user_service import current_rank, set_referrer_if_first_time, team_business_usd
+from utils.tenancy import current_tenant
+
+
+@pytest.fixture
+def chain_of_users(make_user):
+    """Users 1..n, each referred by the previous one; returns the list."""
+    def make(n):
+        users = [make_user(1)]
+        for tg in range(2, n + 1):
+            user = make_user(tg)
+            set_referrer_if_first_time(user, tg - 1)
+            users.append(user)
+        return users
+    return make
+
+
+@pytest.mark.parametrize("n", [3, 30])
+def test_approve_deposit_cost_does_not_grow_with_upline(chain_of_users, n):
+    leaf = chain_of_users(n)[-1]
+    dep = create_deposit(leaf, 100)
+    with assert_max_queries(12, "approve_deposit"):
+        approve_deposit(leaf.telegram_id, dep.id)
+
+
+@pytest.mark.parametrize("n", [3, 30])
+def test_rank_and_team_business_read_the_rollups(chain_of_users, n):
+    users = chain_of_users(n)
+    for u in users[1:]:
+        approve_deposit(u.telegram_id, create_deposit(u, 100).id)
+    root = users[0]
+    approve_deposit(root.telegram_id, create_deposit(root, 100).id)
+    with SessionLocal() as session:
+        root = session.get(User, root.id)
+
+    with assert_max_queries(1, "team_business_usd"):
+        assert team_business_usd(root) == 100.0 * (n - 1)
+    current_rank(root)  # warm the rank rules cache
+    with assert_max_queries(1, "current_rank"):
+        current_rank(root)
+
+
+def test_pending_cmd_loads_users_in_one_query(make_user):
+    for tg in range(1, 21):
+        create_deposit(make_user(tg), 100)
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=current_tenant().admin_ids[0]),
+                             message=SimpleNamespace(reply_text=reply_text))
+    with assert_max_queries(1, "/pending"):
+        asyncio.run(pending_cmd(update, None))
+    assert replies and replies[0].count("ID ") == 20
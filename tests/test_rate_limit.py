@@ -0,0 +1,36 @@
+# tests/test_rate_limit.py
+import ipaddress
+
+import pytest
+from starlette.requests import Request
+
+from webapp import rate_limit
+from webapp.rate_limit import client_ip
+
+
+def _request(peer: str, *forwarded: str) -> Request:
+    headers = [(b"x-forwarded-for", v.encode()) for v in forwarded]
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+@pytest.fixture
+def proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_trusted_proxies", [ipaddress.ip_network("10.0.0.0/8")])
+
+
+def test_ignores_forwarded_for_without_trusted_proxies():
+    assert client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_ignores_forwarded_for_from_untrusted_peer(proxies):
+    assert client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_takes_rightmost_untrusted_hop(proxies):
+    # the client forged the first hop; the proxies appended the real ones
+    req = _request("10.0.0.2", "1.2.3.4, 198.51.100.1", "10.0.0.1")
+    assert client_ip(req) == "198.51.100.1"
+
+
+def test_all_hops_trusted_falls_back_to_leftmost(proxies):
+    assert client_ip(_request("10.0.0.2", "10.0.0.9")) == "10.0.0.9"
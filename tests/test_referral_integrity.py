@@ -0,0 +1,47 @@
+# tests/test_referral_integrity.py
+from db.session import SessionLocal
+from db.models import User
+from services.user_service import set_referrer_if_first_time
+from services.referral_integrity_service import check_graph
+
+
+def _legacy_link(child: User, parent: User) -> None:
+    """Referral written outside set_referrer_if_first_time: no ancestry index."""
+    with SessionLocal() as session:
+        u = session.get(User, child.id)
+        u.referred_by_id = parent.id
+        u.root_id = None
+        session.commit()
+
+
+def _reload(user: User) -> User:
+    with SessionLocal() as session:
+        return session.get(User, user.id)
+
+
+def test_refuses_direct_loop(make_user):
+    a, b = make_user(1), make_user(2)
+    assert set_referrer_if_first_time(_reload(b), 1) is not None
+    assert set_referrer_if_first_time(_reload(a), 2) is None
+    assert _reload(a).referred_by_id is None
+
+
+def test_reroots_subtree(make_user):
+    a, b, c = make_user(1), make_user(2), make_user(3)
+    set_referrer_if_first_time(_reload(c), 2)   # b <- c
+    set_referrer_if_first_time(_reload(b), 1)   # a <- b <- c
+    assert (_reload(c).root_id, _reload(c).referral_depth) == (a.id, 2)
+    assert set_referrer_if_first_time(_reload(a), 3) is None
+
+
+def test_unknown_index_does_not_hide_loop(make_user):
+    # R <- Z is legacy (Z.root_id unknown); U <- P is indexed (P.root_id == U)
+    r, z, u, p = make_user(1), make_user(2), make_user(3), make_user(4)
+    _legacy_link(z, r)
+    set_referrer_if_first_time(_reload(p), 3)
+    # attaching U under Z cannot compute a root, so P's index must not keep pointing at U
+    assert set_referrer_if_first_time(_reload(u), 2) is not None
+    # R under P would close R -> Z -> U -> P -> R
+    assert set_referrer_if_first_time(_reload(r), 4) is None
+    assert _reload(r).referred_by_id is None
+    assert check_graph()["counts"]["cycles"] == 0
@@ -0,0 +1,23 @@
+# tests/test_reward_service.py
+from sqlalchemy import func, select
+
+from db.session import SessionLocal
+from db.models import Reward, User
+from services.deposit_service import approve_deposit, create_deposit
+from services.reward_service import credit_reward
+from services.user_service import set_referrer_if_first_time
+
+
+def test_reward_is_credited_once(make_user):
+    ref, user = make_user(1), make_user(2)
+    set_referrer_if_first_time(user, 1)
+    approve_deposit(1, create_deposit(ref, 100).id)
+    dep = approve_deposit(2, create_deposit(user, 100).id)
+
+    credit_reward(ref, user, dep)
+    credit_reward(ref, user, dep)  # retried job
+
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(Reward)) == 1
+        reward = session.scalars(select(Reward)).one()
+        assert session.get(User, ref.id).earned_total_usd == reward.amount_usd > 0
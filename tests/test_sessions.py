@@ -0,0 +1,46 @@
+# tests/test_sessions.py
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from webapp import telegram_init_verify as tiv
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(tiv, "get_redis", lambda: r)
+    monkeypatch.setattr(tiv, "_revocations", {})
+    return r
+
+
+PARAMS = {"id": "42", "username": "bob"}
+
+
+@pytest.mark.parametrize("create", [tiv._redis_create_session, tiv.create_signed_session_for_params])
+def test_ban_revokes_existing_sessions(create):
+    token = create(PARAMS)["token"]
+    assert tiv.get_session(token)["telegram_id"] == 42
+    tiv.ban_telegram_id(42, 60)
+    with pytest.raises(HTTPException) as e:
+        tiv.get_session(token)
+    assert e.value.status_code == 403
+
+    tiv.unban_telegram_id(42)
+    assert tiv.get_session(token)["telegram_id"] == 42
+
+
+def test_banned_user_gets_no_new_session():
+    tiv.ban_telegram_id(42, 60)
+    with pytest.raises(HTTPException) as e:
+        tiv.create_session_for_params(PARAMS)
+    assert e.value.status_code == 403
+    assert tiv.create_session_for_params({"id": "43"})["telegram_id"] == 43
+
+
+def test_ban_reaches_other_processes(fake_redis):
+    token = tiv._redis_create_session(PARAMS)["token"]
+    tiv.ban_telegram_id(42, 60)
+    tiv._revocations.clear()  # a process that only sees the ban in Redis
+    with pytest.raises(HTTPException):
+        tiv.get_session(token)
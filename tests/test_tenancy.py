@@ -0,0 +1,27 @@
+# tests/test_tenancy.py
+import pytest
+
+from utils.tenancy import parse_tenants
+
+
+def _entry(name, token, url=""):
+    return {"name": name, "token": token, "webapp_url": url}
+
+
+def test_parses_tenants():
+    tenants = parse_tenants([_entry("a", "1:a", "https://a.example/"), _entry("b", "2:b", "https://b.example")])
+    assert tenants["a"].host == "a.example" and tenants["b"].schema == "t_b"
+
+
+@pytest.mark.parametrize("entries", [
+    [_entry("a", "1:a"), _entry("a", "2:b")],
+    [_entry("a", "1:a"), _entry("b", "1:a")],
+    [_entry("a", "1:a", "https://app.example/a"), _entry("b", "2:b", "https://APP.example/b")],
+])
+def test_rejects_duplicates(entries):
+    with pytest.raises(ValueError):
+        parse_tenants(entries)
+
+
+def test_tenants_without_webapp_url_may_coexist():
+    assert len(parse_tenants([_entry("a", "1:a"), _entry("b", "2:b")])) == 2
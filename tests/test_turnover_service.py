@@ -0,0 +1,37 @@
+# tests/test_turnover_service.py
+from sqlalchemy import select
+
+from db.session import SessionLocal
+from db.models import ClubPayout, MonthlyTurnover, User
+from services.turnover_service import _bump, pay_club_bonuses
+
+
+def _turnover(user_id: int, month: str, team_usd: float, team_activations: int = 0) -> None:
+    with SessionLocal() as session:
+        session.add(MonthlyTurnover(user_id=user_id, month=month, personal_usd=0.0, team_usd=team_usd,
+                                    team_activations=team_activations))
+        session.commit()
+
+
+def test_club_rank_ignores_later_months(make_user):
+    user = make_user(1)
+    with SessionLocal() as session:
+        u = session.get(User, user.id)
+        u.is_active, u.total_deposit_usd = True, 100.0  # earning cap $300
+        session.commit()
+    _turnover(user.id, "2025-01", 1600.0, team_activations=10)  # Life Changer by the end of January
+    _turnover(user.id, "2025-03", 10000.0)  # Advisor only from March
+
+    assert pay_club_bonuses("2025-01")["credited"] == 1
+    with SessionLocal() as session:
+        payout = session.execute(select(ClubPayout)).scalar_one()
+    assert (payout.rank, payout.amount_usd) == ("Life Changer", 32.0)
+
+
+def test_bump_counts_repeated_ids_once(make_user):
+    a, b = make_user(1), make_user(2)
+    with SessionLocal() as session:
+        _bump(session, [a.id, b.id, a.id], "2025-01", team_usd=10.0)
+        session.commit()
+        rows = dict(session.execute(select(MonthlyTurnover.user_id, MonthlyTurnover.team_usd)).all())
+    assert rows == {a.id: 10.0, b.id: 10.0}
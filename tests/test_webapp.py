@@ -0,0 +1,30 @@
+# tests/test_webapp.py
+import pytest
+from fastapi.testclient import TestClient
+
+from webapp import app as webapp
+
+
+@pytest.fixture
+def client():
+    return TestClient(webapp.app)
+
+
+def test_metrics_hidden_without_token(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_needs_the_token(client, monkeypatch):
+    monkeypatch.setattr(webapp, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+@pytest.mark.parametrize("how", ["header", "query"])
+def test_unknown_bot_tenant_is_rejected(client, how):
+    if how == "header":
+        res = client.post("/webapp/logout", headers={"X-Bot-Tenant": "nope"})
+    else:
+        res = client.get("/api/events?token=x&tenant=nope")
+    assert res.status_code == 404 and res.json()["detail"] == "Unknown bot tenant."
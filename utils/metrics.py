@@ -0,0 +1,195 @@
+# utils/metrics.py
+"""
+Prometheus metrics for the bot, services, database and Redis.
+
+Exposed by the FastAPI app at /metrics to scrapers holding
+config.METRICS_TOKEN, and by a small sidecar HTTP server when the bot runs
+in polling mode (config.METRICS_PORT). If
+prometheus_client is not installed every metric is a no-op, so importing
+this module never breaks the bot.
+"""
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        start_http_server,
+    )
+    from prometheus_client import multiprocess
+except ImportError:  # optional dependency
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    REGISTRY = None
+    multiprocess = None
+
+    class _NoopMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def observe(self, *args, **kwargs):
+            pass
+
+        def inc(self, *args, **kwargs):
+            pass
+
+    Counter = Histogram = _NoopMetric
+
+    def generate_latest(registry=None) -> bytes:
+        return b"# prometheus_client not installed\n"
+
+    def start_http_server(*args, **kwargs):
+        logger.warning("prometheus_client not installed; metrics exporter not started")
+
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ----- Bot handlers -----
+BOT_HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Telegram handler latency", ["command", "outcome"], buckets=SLOW_BUCKETS,
+)
+
+# ----- Services -----
+SERVICE_CALL_SECONDS = Histogram(
+    "service_call_seconds", "Latency of services.* calls", ["service", "function", "outcome"], buckets=SLOW_BUCKETS,
+)
+
+# ----- Database -----
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time waiting for a pooled DB connection", buckets=FAST_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "SQL statement duration", ["statement"], buckets=FAST_BUCKETS,
+)
+
+# ----- Redis -----
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds", "Redis round-trip latency", ["component", "command"], buckets=FAST_BUCKETS,
+)
+
+# ----- Business -----
+DEPOSITS_CREATED = Counter("deposits_created_total", "Deposit requests recorded")
+DEPOSITS_APPROVED = Counter("deposits_approved_total", "Deposits approved")
+DEPOSITS_REJECTED = Counter("deposits_rejected_total", "Deposits rejected")
+REWARDS = Counter("rewards_total", "Referral rewards processed", ["status"])
+REWARDS_USD = Counter("rewards_usd_total", "USD credited as referral rewards")
+COMPANY_POOL_REDIRECTS = Counter("company_pool_redirects_total", "Rewards redirected to the company pool")
+COMPANY_POOL_USD = Counter("company_pool_usd_total", "USD redirected to the company pool")
+
+# ----- Background jobs -----
+JOBS = Counter("jobs_total", "Background jobs finished", ["kind", "outcome"])
+JOB_SECONDS = Histogram("job_seconds", "Background job run time", ["kind"], buckets=SLOW_BUCKETS)
+
+# ----- Web -----
+RATE_LIMIT_REJECTED = Counter("rate_limit_rejected_total", "Requests rejected by the rate limiter", ["rule", "scope"])
+
+
+def timed_service(func):
+    """Decorator recording service_call_seconds for a services.* function."""
+    service = func.__module__.rsplit(".", 1)[-1]
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            SERVICE_CALL_SECONDS.labels(service, name, outcome).observe(time.perf_counter() - t0)
+    return wrapper
+
+
+def timed_handler(command: str, callback):
+    """Wrap an async telegram handler callback with bot_handler_seconds."""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await callback(update, context)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            BOT_HANDLER_SECONDS.labels(command, outcome).observe(time.perf_counter() - t0)
+    return wrapper
+
+
+def instrument_application(app) -> None:
+    """Time every handler registered on a telegram Application."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            if getattr(handler.callback, "_metrics_wrapped", False):
+                continue
+            commands = getattr(handler, "commands", None)
+            command = sorted(commands)[0] if commands else handler.callback.__name__
+            handler.callback = timed_handler(command, handler.callback)
+            handler.callback._metrics_wrapped = True
+
+
+@contextmanager
+def timed_redis(component: str, command: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        REDIS_COMMAND_SECONDS.labels(component, command).observe(time.perf_counter() - t0)
+
+
+def instrument_engine(engine) -> None:
+    """Record pool checkout wait and per-statement duration for a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - t0)
+    engine.raw_connection = timed_raw_connection
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("_metrics_t0")
+        if not started:
+            return
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(kind).observe(time.perf_counter() - started.pop())
+
+
+def render_latest():
+    """(body, content_type) for a /metrics response; multiprocess-aware."""
+    if multiprocess is not None and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_exporter(port: int) -> None:
+    """Sidecar /metrics HTTP server (used by the bot in polling mode)."""
+    start_http_server(port)
+    logger.info("metrics exporter listening on :%s", port)
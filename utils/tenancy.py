@@ -0,0 +1,141 @@
+# utils/tenancy.py
+"""
+Several Telegram bots (tenants) served by one process.
+
+Each tenant has its own token, admin ids, WEBAPP_URL, database schema and
+Redis key namespace; everything else - the SQLAlchemy engine and its
+pool, the Redis clients, compiled-statement and static-asset caches, the
+job workers - is shared.
+
+The tenant of the work in progress lives in a ContextVar: bot.py sets it
+at the start of every update, webapp/app.py per HTTP request, the job
+workers around each pass. Code below that never passes it around:
+
+    current_tenant().admin_ids                # handlers, admin checks
+    current_tenant().key("tg_session:abc")    # Redis keys
+    SessionLocal()                            # queries hit the tenant's schema (db/session.py)
+
+A tenant with "schema": null uses the unprefixed tables and Redis keys,
+which is what a single-bot deployment has always used; at most one tenant
+may do so. The others get schema "t_<name>" unless configured otherwise.
+"""
+import contextvars
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from config import ADMIN_IDS, BOT_TENANTS, BOT_TENANTS_FILE, BOT_TOKEN, TENANT, WEBAPP_URL
+
+_NAME_RE = re.compile(r"^[a-z][a-z0-9_]{0,30}$")
+
+
+@dataclass(frozen=True)
+class Tenant:
+    name: str
+    token: str
+    admin_ids: Tuple[int, ...]
+    webapp_url: str
+    schema: Optional[str] = None
+
+    def key(self, key: str) -> str:
+        """Redis key (or channel suffix) in this tenant's namespace."""
+        return key if self.schema is None else f"{self.name}:{key}"
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.webapp_url).netloc.lower() if self.webapp_url else ""
+
+
+def parse_tenants(entries: List[dict]) -> Dict[str, Tenant]:
+    """Validate tenant definitions; raises ValueError on a bad list."""
+    if not entries or not isinstance(entries, list):
+        raise ValueError("bot tenants must be a non-empty JSON list")
+    out: Dict[str, Tenant] = {}
+    tokens, schemas, hosts, legacy = set(), set(), set(), 0
+    for i, e in enumerate(entries):
+        name = e.get("name", "")
+        if not _NAME_RE.match(name):
+            raise ValueError(f"tenant #{i}: name must match {_NAME_RE.pattern}")
+        if name in out:
+            raise ValueError(f"tenant #{i}: name {name!r} is used by another tenant")
+        token = e.get("token")
+        if not token or token in tokens:
+            raise ValueError(f"{name}: token missing or used by another tenant")
+        schema = e["schema"] if "schema" in e else f"t_{name}"
+        if schema is None:
+            legacy += 1
+        elif not _NAME_RE.match(schema) or schema in schemas:
+            raise ValueError(f"{name}: schema must be unique and match {_NAME_RE.pattern}")
+        if legacy > 1:
+            raise ValueError("only one tenant may use the unprefixed tables (\"schema\": null)")
+        tenant = Tenant(
+            name=name,
+            token=token,
+            admin_ids=tuple(int(x) for x in e.get("admin_ids", ())),
+            webapp_url=(e.get("webapp_url") or "").rstrip("/"),
+            schema=schema,
+        )
+        if tenant.host and tenant.host in hosts:
+            # requests are routed by Host; two tenants on one host would share a mini-app
+            raise ValueError(f"{name}: webapp_url host {tenant.host} is used by another tenant")
+        tokens.add(token)
+        schemas.add(schema)
+        hosts.add(tenant.host)
+        out[name] = tenant
+    return out
+
+
+def _load() -> Dict[str, Tenant]:
+    if BOT_TENANTS_FILE:
+        with open(BOT_TENANTS_FILE) as f:
+            return parse_tenants(json.load(f))
+    if BOT_TENANTS:
+        return parse_tenants(json.loads(BOT_TENANTS))
+    return {"default": Tenant("default", BOT_TOKEN, tuple(ADMIN_IDS), WEBAPP_URL, None)}
+
+
+TENANTS: Dict[str, Tenant] = _load()
+if TENANT and TENANT not in TENANTS:
+    raise ValueError(f"TENANT={TENANT!r} is not one of: {', '.join(TENANTS)}")
+PROCESS_TENANT = TENANTS[TENANT] if TENANT else next(iter(TENANTS.values()))
+
+_current: contextvars.ContextVar[Tenant] = contextvars.ContextVar("tenant", default=PROCESS_TENANT)
+_by_host = {t.host: t for t in TENANTS.values() if t.host}
+
+
+def all_tenants() -> List[Tenant]:
+    return list(TENANTS.values())
+
+
+def get_tenant(name: str) -> Tenant:
+    try:
+        return TENANTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown tenant {name!r}")
+
+
+def tenant_for_host(host: Optional[str]) -> Optional[Tenant]:
+    return _by_host.get((host or "").lower())
+
+
+def current_tenant() -> Tenant:
+    return _current.get()
+
+
+def set_tenant(tenant: Tenant) -> contextvars.Token:
+    """Switch the current context to `tenant` (until reset or the task ends)."""
+    return _current.set(tenant)
+
+
+@contextmanager
+def use_tenant(tenant: Union[Tenant, str]) -> Iterator[Tenant]:
+    if isinstance(tenant, str):
+        tenant = get_tenant(tenant)
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
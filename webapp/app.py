@@ -1,22 +1,39 @@
 # webapp/app.py
+import hmac
 import logging
 import os
+import re
 import time
+from types import SimpleNamespace
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Header, Depends
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 
+from config import METRICS_TOKEN
 from db.session import SessionLocal
+from db.query_budget import track_queries
 from db.models import User, Deposit
+from services.deposit_service import create_deposit
+from services.user_service import get_or_create_user, register_wallet
+from services.export_service import iter_export, parse_date
+from services.stats_service import get_daily_stats
+from services.event_service import user_channel
+from utils.metrics import render_latest
+from utils.tenancy import PROCESS_TENANT, TENANTS, current_tenant, set_tenant, tenant_for_host
 
 # Telegram verification helpers (Redis-backed or in-memory)
+from webapp.events import hub
+from webapp.idempotency import IdempotentRequest
+from webapp.rate_limit import rate_limit, enforce_user
+from webapp.static_assets import static_app
 from webapp.telegram_init_verify import (
     verify_init_data,
     create_session_for_params,
     get_session,
+    revoke_session,
+    _telegram_id_from_params,
 )
 
 # Optional redis helpers (if using Redis version of telegram_init_verify)
@@ -43,12 +60,213 @@ app = FastAPI()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # path to /webapp/
 
 STATIC_DIR = os.path.join(BASE_DIR, "web_static")
+# output of scripts/build_static.py (hashed + precompressed); falls back to STATIC_DIR
+STATIC_BUILD_DIR = os.path.join(BASE_DIR, "static_dist")
 
 app.mount(
     "/static",
-    StaticFiles(directory=STATIC_DIR),
+    static_app(STATIC_BUILD_DIR, STATIC_DIR),
     name="static"
 )
 
 
 # --------------------------------------
+# PER-REQUEST SQL BUDGET
+# --------------------------------------
+@app.middleware("http")
+async def query_budget_middleware(request: Request, call_next):
+    with track_queries(f"{request.method} {request.url.path}"):
+        return await call_next(request)
+
+
+# --------------------------------------
+# BOT TENANT (utils/tenancy.py)
+# --------------------------------------
+# Picked from the X-Bot-Tenant header (the mini-app sends it; EventSource,
+# which cannot set headers, passes ?tenant= instead), else from the Host the
+# tenant's WEBAPP_URL points at, else the process default. Everything below -
+# sessions, rate limits, idempotency keys, queries - then runs in that
+# tenant's namespace.
+@app.middleware("http")
+async def tenant_middleware(request: Request, call_next):
+    name = request.headers.get("x-bot-tenant") or request.query_params.get("tenant")
+    if name:
+        tenant = TENANTS.get(name)
+        if tenant is None:
+            return JSONResponse({"detail": "Unknown bot tenant."}, status_code=404)
+    else:
+        tenant = tenant_for_host(request.headers.get("host")) or PROCESS_TENANT
+    set_tenant(tenant)
+    return await call_next(request)
+
+
+# --------------------------------------
+# METRICS
+# --------------------------------------
+@app.get("/metrics")
+def metrics(authorization: Optional[str] = Header(None)):
+    # the app is public: without METRICS_TOKEN the endpoint does not exist
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(_bearer_token(authorization).encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="bad metrics token")
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
+# --------------------------------------
+# SESSION AUTH
+# --------------------------------------
+class VerifyRequest(BaseModel):
+    init_data: str
+
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="missing bearer token")
+    return authorization.split(" ", 1)[1].strip()
+
+
+def current_session(authorization: Optional[str] = Header(None)) -> dict:
+    """FastAPI dependency: resolve the Authorization header to a session dict."""
+    return get_session(_bearer_token(authorization))
+
+
+def admin_session(session: dict = Depends(current_session)) -> dict:
+    """FastAPI dependency: like current_session, but only for the bot tenant's admin ids."""
+    if session["telegram_id"] not in current_tenant().admin_ids:
+        raise HTTPException(status_code=403, detail="Admins only.")
+    return session
+
+
+@app.post("/webapp/verify", dependencies=[Depends(rate_limit("verify"))])
+def webapp_verify(body: VerifyRequest):
+    params = verify_init_data(body.init_data)
+    # per-user limit before a session is written
+    enforce_user("verify", _telegram_id_from_params(params))
+    return create_session_for_params(params)
+
+
+@app.post("/webapp/logout")
+def webapp_logout(authorization: Optional[str] = Header(None)):
+    revoke_session(_bearer_token(authorization))
+    return {"ok": True}
+
+
+# --------------------------------------
+# DEPOSITS
+# --------------------------------------
+TX_HASH_RE = re.compile(r"^0x[0-9a-fA-F]{64}$")
+
+
+class OnchainDepositRequest(BaseModel):
+    amount_usd: float
+    tx_musd: str
+    tx_mstc: str
+    # the wallet both transfers were sent from; registered on first use
+    wallet: Optional[str] = None
+    # client-side split is informational only; the server recomputes it
+    musd_usd: Optional[float] = None
+    mstc_usd: Optional[float] = None
+
+
+@app.post("/api/submit_onchain_deposit", dependencies=[Depends(rate_limit("deposit"))])
+def submit_onchain_deposit(
+    body: OnchainDepositRequest,
+    session: dict = Depends(current_session),
+    idempotency_key: Optional[str] = Header(None),
+):
+    enforce_user("deposit", session["telegram_id"])
+    tx_musd, tx_mstc = body.tx_musd.strip().lower(), body.tx_mstc.strip().lower()
+    wallet = (body.wallet or "").strip().lower() or None
+    if not TX_HASH_RE.match(tx_musd) or not TX_HASH_RE.match(tx_mstc):
+        raise HTTPException(status_code=400, detail="tx hashes must be 0x-prefixed 32-byte hex")
+    if tx_musd == tx_mstc:
+        raise HTTPException(status_code=400, detail="MUSD and MSTC tx hashes must differ")
+
+    # replays (mini-app auto-resume, double taps) are answered from cache
+    idem = IdempotentRequest(
+        f"deposit:{session['telegram_id']}",
+        idempotency_key,
+        {"amount_usd": body.amount_usd, "tx_musd": tx_musd, "tx_mstc": tx_mstc, "wallet": wallet},
+    )
+    cached = idem.begin()
+    if cached is not None:
+        return cached
+
+    try:
+        tg_user = SimpleNamespace(id=session["telegram_id"], username=session.get("username") or None)
+        user = get_or_create_user(tg_user)
+        if wallet:
+            user = register_wallet(user, wallet)
+        dep = create_deposit(user, body.amount_usd, tx_musd=tx_musd, tx_mstc=tx_mstc)
+    except ValueError as e:
+        idem.abandon()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        idem.abandon()
+        raise
+
+    status = "approved" if dep.approved else "rejected" if dep.rejected else "pending"
+    result = {"deposit_id": dep.id, "musd": dep.musd, "mstc": dep.mstc, "status": status}
+    idem.finish(result)
+    return result
+
+
+# --------------------------------------
+# SERVER PUSH (SSE)
+# --------------------------------------
+@app.get("/api/events")
+async def user_events(request: Request, token: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """
+    Stream deposit status / balance / reward events for the session's user.
+    EventSource cannot set headers, so the token may also come as ?token=.
+    """
+    session = get_session(token or _bearer_token(authorization))
+    return StreamingResponse(
+        hub.stream(user_channel(session["telegram_id"]), request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --------------------------------------
+# ADMIN STATS
+# --------------------------------------
+@app.get("/admin/stats")
+def admin_stats(days: int = 7, session: dict = Depends(admin_session)):
+    """Daily rollups for the last `days` days, newest first, plus totals."""
+    try:
+        return get_daily_stats(days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# --------------------------------------
+# ADMIN EXPORTS
+# --------------------------------------
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+@app.get("/admin/export/{table}")
+def admin_export(
+    table: str,
+    format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    session: dict = Depends(admin_session),
+):
+    """Stream a table export (created_at in [start, end)) as CSV or Parquet."""
+    try:
+        chunks = iter_export(table, format, parse_date(start), parse_date(end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    filename = f"{table}-{start or 'all'}-{end or 'now'}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
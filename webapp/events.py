@@ -0,0 +1,101 @@
+# webapp/events.py
+"""
+Per-worker fan-out of user events to Server-Sent Events streams.
+
+Each web worker holds a single Redis pattern subscription on
+"mstc:events:*" (see services/event_service.py) and routes messages to the
+in-process queues of the clients connected to that channel, so the number
+of Redis connections does not grow with the number of open streams or bot
+tenants.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional, Set
+
+import redis.asyncio as aioredis
+
+from config import REDIS_URL
+from services.event_service import CHANNEL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+CLIENT_QUEUE_SIZE = 100
+RECONNECT_DELAY_SECONDS = 2
+
+
+class EventHub:
+    def __init__(self, redis_url: str = REDIS_URL):
+        self.redis_url = redis_url
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_listener(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "pmessage":
+                        continue
+                    self._dispatch(msg["channel"], msg["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("event hub subscription lost: %s", e)
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        for q in self._subscribers.get(channel, ()):
+            try:
+                q.put_nowait(data)
+            except asyncio.QueueFull:
+                # slow client: drop the event rather than buffer without bound
+                logger.debug("dropping event for slow client on %s", channel)
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        self._ensure_listener()
+        q: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(q)
+        return q
+
+    def unsubscribe(self, channel: str, q: asyncio.Queue) -> None:
+        subs = self._subscribers.get(channel)
+        if subs is None:
+            return
+        subs.discard(q)
+        if not subs:
+            del self._subscribers[channel]
+
+    async def stream(self, channel: str, is_disconnected) -> AsyncIterator[str]:
+        """Yield SSE-formatted frames from `channel` (event_service.user_channel) until the client goes away."""
+        q = self.subscribe(channel)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    raw = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                event = json.loads(raw)
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            self.unsubscribe(channel, q)
+
+
+hub = EventHub()
@@ -0,0 +1,109 @@
+# webapp/idempotency.py
+"""
+Idempotency-Key support for write endpoints.
+
+The first request with a given key claims it in Redis (SET NX) and, once
+handled, stores its response under the key for IDEMPOTENCY_TTL_SECONDS.
+Retries with the same key get the stored response back without touching
+the database. If Redis is unreachable the request is simply processed;
+the unique tx-hash index on Deposit still prevents duplicate rows.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import redis
+from fastapi import HTTPException
+
+from config import IDEMPOTENCY_TTL_SECONDS
+from utils.tenancy import current_tenant
+from webapp.telegram_init_verify import get_redis
+
+logger = logging.getLogger(__name__)
+
+# how long a claimed-but-unfinished key blocks retries (handler crashed / slow)
+IN_PROGRESS_TTL_SECONDS = 30
+MAX_KEY_LENGTH = 128
+
+
+def _redis_key(scope: str, key: str) -> str:
+    return current_tenant().key(f"idem:{scope}:{key}")
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Usage inside an endpoint:
+
+        idem = IdempotentRequest(scope, key, body_dict)
+        cached = idem.begin()
+        if cached is not None:
+            return cached
+        try:
+            result = ...do the write...
+        except Exception:
+            idem.abandon()
+            raise
+        idem.finish(result)
+    """
+
+    def __init__(self, scope: str, key: Optional[str], payload: Dict[str, Any]):
+        if key is not None and not (0 < len(key) <= MAX_KEY_LENGTH):
+            raise HTTPException(status_code=400, detail="invalid Idempotency-Key")
+        self.key = _redis_key(scope, key) if key else None
+        self.fp = fingerprint(payload)
+        self._claimed = False
+
+    def begin(self) -> Optional[Dict[str, Any]]:
+        """Claim the key. Returns the cached response if this is a replay."""
+        if not self.key:
+            return None
+        try:
+            r = get_redis()
+            marker = json.dumps({"state": "in_progress", "fp": self.fp})
+            if r.set(self.key, marker, nx=True, ex=IN_PROGRESS_TTL_SECONDS):
+                self._claimed = True
+                return None
+            raw = r.get(self.key)
+        except redis.RedisError as e:
+            logger.warning("idempotency cache unavailable: %s", e)
+            return None
+
+        if raw is None:
+            # expired between SET and GET; treat as a fresh request
+            return None
+        stored = json.loads(raw)
+        if stored.get("fp") != self.fp:
+            raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different payload")
+        if stored.get("state") == "in_progress":
+            raise HTTPException(
+                status_code=409,
+                detail="request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        return stored["response"]
+
+    def finish(self, response: Dict[str, Any]) -> None:
+        if not self._claimed:
+            return
+        try:
+            get_redis().set(
+                self.key,
+                json.dumps({"state": "done", "fp": self.fp, "response": response}),
+                ex=IDEMPOTENCY_TTL_SECONDS,
+            )
+        except redis.RedisError as e:
+            logger.warning("failed to store idempotent response: %s", e)
+
+    def abandon(self) -> None:
+        """Release the claim so the client may retry after a failure."""
+        if not self._claimed:
+            return
+        try:
+            get_redis().delete(self.key)
+        except redis.RedisError:
+            pass
@@ -0,0 +1,167 @@
+# webapp/rate_limit.py
+"""
+Token-bucket rate limiting for the mini-app API.
+
+Buckets live in Redis and are updated by a single Lua script, so refill and
+take are atomic across every web worker. If Redis is unreachable each
+worker falls back to its own in-process buckets (limits then apply per
+worker instead of globally, which is still enough to stop a runaway client).
+
+Rules are keyed by name (see config.RATE_LIMITS) and applied per client IP
+and, once the caller is authenticated, per telegram_id, separately for
+each bot tenant. X-Forwarded-For only counts when the peer is one of
+config.TRUSTED_PROXIES; otherwise any client could pick its own IP.
+Rejections are counted in the rate_limit_rejected_total
+metric.
+"""
+import ipaddress
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import redis
+from fastapi import HTTPException, Request
+
+from config import RATE_LIMITS, TRUSTED_PROXIES
+from utils.metrics import RATE_LIMIT_REJECTED
+from utils.tenancy import current_tenant
+from webapp.telegram_init_verify import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket key; ARGV: capacity, refill per second, now (seconds, float), cost
+# Returns {allowed (0/1), retry_after_ms}
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_ms = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_ms = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, retry_ms}
+"""
+
+
+class TokenBucketLimiter:
+    def __init__(self):
+        self._script = None
+        self._local: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _redis_take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        if self._script is None:
+            self._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+        allowed, retry_ms = self._script(keys=[key], args=[capacity, rate, time.time(), 1])
+        return bool(int(allowed)), int(retry_ms) / 1000.0
+
+    def _local_take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            if tokens >= 1:
+                self._local[key] = (tokens - 1, now)
+                return True, 0.0
+            self._local[key] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+    def take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        """Try to take one token. Returns (allowed, retry_after_seconds)."""
+        try:
+            return self._redis_take(key, capacity, rate)
+        except redis.RedisError as e:
+            logger.debug("rate limiter using local buckets: %s", e)
+            return self._local_take(key, capacity, rate)
+
+
+limiter = TokenBucketLimiter()
+
+
+def _rule(name: str) -> Tuple[float, float]:
+    """(capacity, refill per second) for a configured rule."""
+    cfg = RATE_LIMITS[name]
+    return float(cfg["burst"]), float(cfg["per_minute"]) / 60.0
+
+
+_trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in TRUSTED_PROXIES]
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _trusted_proxies)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The peer address, or - when the peer is a trusted proxy - the right-most
+    X-Forwarded-For hop that is not itself a trusted proxy. Hops further left
+    were written by the client and prove nothing.
+    """
+    ip = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(ip):
+        return ip
+    for hop in reversed(",".join(request.headers.getlist("x-forwarded-for")).split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        ip = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return ip
+
+
+def enforce(name: str, scope: str, ident) -> None:
+    """Raise 429 with Retry-After if `ident` has exhausted rule `name`."""
+    capacity, rate = _rule(name)
+    if capacity <= 0 or rate <= 0:
+        return
+    allowed, retry_after = limiter.take(current_tenant().key(f"rl:{name}:{scope}:{ident}"), capacity, rate)
+    if allowed:
+        return
+    RATE_LIMIT_REJECTED.labels(name, scope).inc()
+    raise HTTPException(
+        status_code=429,
+        detail="Too many requests, slow down.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def rate_limit(name: str):
+    """
+    FastAPI dependency limiting by client IP:
+
+        @app.post("/x", dependencies=[Depends(rate_limit("verify"))])
+    """
+    def dependency(request: Request) -> None:
+        enforce(name, "ip", client_ip(request))
+    return dependency
+
+
+def enforce_user(name: str, telegram_id: Optional[int]) -> None:
+    """Per-user limit, applied once the session has been resolved."""
+    if telegram_id:
+        enforce(name, "user", telegram_id)
@@ -0,0 +1,154 @@
+# webapp/static_assets.py
+"""
+Serving layer for the assets produced by scripts/build_static.py.
+
+Everything listed in manifest.json is loaded into memory once at startup.
+Per request we only pick the best encoding (br > gzip > identity), attach
+a strong ETag per representation and answer If-None-Match with 304.
+Content-hashed files are sent with `Cache-Control: immutable`; HTML entry
+points are revalidated on every load so new builds are picked up.
+"""
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import PlainTextResponse, Response
+from starlette.staticfiles import StaticFiles
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+ENCODING_PREFERENCE = ("br", "gzip")
+ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+class _Asset:
+    __slots__ = ("content_type", "cache_control", "variants")
+
+    def __init__(self, content_type: str, cache_control: str):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # encoding ("identity", "br", "gzip") -> (body, etag)
+        self.variants: Dict[str, Tuple[bytes, str]] = {}
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class PrecompressedStatic:
+    """ASGI app serving a build directory described by manifest.json."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, _Asset] = {}
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+
+        for logical, entry in manifest.items():
+            asset = _Asset(
+                entry["content_type"],
+                IMMUTABLE_CACHE if entry.get("immutable") else REVALIDATE_CACHE,
+            )
+            path = os.path.join(directory, entry["file"])
+            with open(path, "rb") as f:
+                asset.variants["identity"] = (f.read(), f'"{entry["etag"]}"')
+            for enc in entry.get("encodings", []):
+                with open(path + ENCODING_SUFFIX[enc], "rb") as f:
+                    asset.variants[enc] = (f.read(), f'"{entry["etag"]}-{enc}"')
+
+            # hashed URL is the canonical one; the logical name stays reachable
+            # (revalidated, not immutable) for anything that hardcodes it
+            self.assets[entry["file"]] = asset
+            if entry["file"] != logical:
+                alias = _Asset(asset.content_type, REVALIDATE_CACHE)
+                alias.variants = asset.variants
+                self.assets[logical] = alias
+
+    def _pick(self, asset: _Asset, accept_encoding: str) -> str:
+        accepted = _accepted_encodings(accept_encoding)
+        for enc in ENCODING_PREFERENCE:
+            if enc in asset.variants and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+                return enc
+        return "identity"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await PlainTextResponse("Method Not Allowed", status_code=405)(scope, receive, send)
+            return
+
+        # newer Starlette keeps the mount prefix in path and mirrors it in root_path
+        path, root = scope["path"], scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        path = path.lstrip("/") or "index.html"
+        asset: Optional[_Asset] = self.assets.get(path)
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        encoding = self._pick(asset, headers.get("accept-encoding", ""))
+        body, etag = asset.variants[encoding]
+        out = {
+            "etag": etag,
+            "cache-control": asset.cache_control,
+            "vary": "Accept-Encoding",
+        }
+
+        inm = headers.get("if-none-match")
+        if inm is not None and _etag_matches(inm, etag):
+            await Response(status_code=304, headers=out)(scope, receive, send)
+            return
+
+        if encoding != "identity":
+            out["content-encoding"] = encoding
+        response = Response(
+            content=b"" if scope["method"] == "HEAD" else body,
+            media_type=asset.content_type,
+            headers=out,
+        )
+        if scope["method"] == "HEAD":
+            response.headers["content-length"] = str(len(body))
+        await response(scope, receive, send)
+
+
+def static_app(build_dir: str, source_dir: str):
+    """Serve the precompressed build if present, else the raw source directory."""
+    if os.path.isfile(os.path.join(build_dir, "manifest.json")):
+        return PrecompressedStatic(build_dir)
+    logger.warning("no static build at %s; serving %s uncompressed (run scripts/build_static.py)",
+                   build_dir, source_dir)
+    return StaticFiles(directory=source_dir)
@@ -1,4 +1,5 @@
 # webapp/telegram_init_verify.py (Redis-backed)
+import base64
 import hashlib
 import hmac
 import time
@@ -7,7 +8,14 @@ import logging
 from typing import Dict, Any, Optional
 from fastapi import HTTPException
 import redis
-from config import BOT_TOKEN, REDIS_URL
+from config import (
+    REDIS_URL,
+    SESSION_TOKEN_MODE,
+    SESSION_SIGNING_KEY,
+    SESSION_REVOCATION_SYNC_SECONDS,
+)
+from utils.metrics import timed_redis
+from utils.tenancy import current_tenant
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +60,9 @@ def compute_hmac_hex(bot_token: str, data_check_string: str) -> str:
     return mac.hexdigest()
 
 
-def verify_init_data(init_data: str, *, bot_token: str = BOT_TOKEN, require_recent: bool = True) -> Dict[str, str]:
+def verify_init_data(init_data: str, *, bot_token: Optional[str] = None, require_recent: bool = True) -> Dict[str, str]:
+    # init_data is signed with the token of the bot that opened the mini app
+    bot_token = bot_token or current_tenant().token
     try:
         params = parse_init_data(init_data)
     except Exception as e:
@@ -87,45 +97,66 @@ def verify_init_data(init_data: str, *, bot_token: str = BOT_TOKEN, require_rece
 
 
 # Session token keys in Redis will be stored as: "tg_session:<token>" -> JSON-like fields as a Redis hash
+# (in the current tenant's key namespace, so a token only works for the bot that issued it)
 def _session_redis_key(token: str) -> str:
-    return f"tg_session:{token}"
+    return current_tenant().key(f"tg_session:{token}")
 
 
-def create_session_for_params(params: Dict[str, str], ttl_seconds: int = DEFAULT_SESSION_TTL) -> Dict[str, Any]:
+def _telegram_id_from_params(params: Dict[str, str]) -> int:
     tg_id = params.get("id") or params.get("user_id") or params.get("userId") or params.get("tg_id")
     try:
-        tg_id_int = int(tg_id)
+        return int(tg_id)
     except Exception:
-        tg_id_int = 0
+        return 0
+
+
+def create_session_for_params(params: Dict[str, str], ttl_seconds: int = DEFAULT_SESSION_TTL) -> Dict[str, Any]:
+    _check_not_banned(_telegram_id_from_params(params))
+    if SESSION_TOKEN_MODE == "signed":
+        return create_signed_session_for_params(params, ttl_seconds)
+    return _redis_create_session(params, ttl_seconds)
+
+
+def _redis_create_session(params: Dict[str, str], ttl_seconds: int = DEFAULT_SESSION_TTL) -> Dict[str, Any]:
+    tg_id_int = _telegram_id_from_params(params)
 
     token = secrets.token_urlsafe(32)
     expires_at = int(time.time()) + int(ttl_seconds)
     r = get_redis()
     key = _session_redis_key(token)
     # store minimal fields
-    r.hset(key, mapping={
-        "telegram_id": str(tg_id_int),
-        "username": params.get("username") or params.get("user_name") or "",
-        "expires_at": str(expires_at),
-        "created_at": str(int(time.time()))
-    })
-    r.expire(key, int(ttl_seconds))
+    with timed_redis("session", "hset"):
+        r.hset(key, mapping={
+            "telegram_id": str(tg_id_int),
+            "username": params.get("username") or params.get("user_name") or "",
+            "expires_at": str(expires_at),
+            "created_at": str(int(time.time()))
+        })
+    with timed_redis("session", "expire"):
+        r.expire(key, int(ttl_seconds))
     logger.debug("created redis session token for tg_id=%s token=%s expires_at=%s", tg_id_int, token, expires_at)
     return {"token": token, "telegram_id": tg_id_int, "expires_at": expires_at}
 
 
 def get_session(token: str) -> Dict[str, Any]:
+    # signed tokens are self-describing, so both formats are accepted regardless of mode
+    if token.startswith(SIGNED_TOKEN_PREFIX):
+        return get_signed_session(token)
+
     r = get_redis()
     key = _session_redis_key(token)
-    if not r.exists(key):
+    with timed_redis("session", "exists"):
+        found = r.exists(key)
+    if not found:
         logger.debug("redis session not found or expired: %s", token)
         raise HTTPException(status_code=401, detail="invalid or expired session token")
-    data = r.hgetall(key)
+    with timed_redis("session", "hgetall"):
+        data = r.hgetall(key)
     if not data:
         raise HTTPException(status_code=401, detail="invalid or expired session token")
     # refresh TTL if you want sliding sessions (optional). Here we won't refresh automatically.
     try:
-        return {
+        session = {
             "telegram_id": int(data.get("telegram_id", "0")),
             "username": data.get("username"),
             "expires_at": int(data.get("expires_at", "0")),
@@ -133,3 +164,182 @@ def get_session(token: str) -> Dict[str, Any]:
         }
     except Exception:
         raise HTTPException(status_code=401, detail="invalid session data")
+    _check_not_banned(session["telegram_id"])
+    return session
+
+
+# ---------------------------------------------------------
+# Stateless signed session tokens
+# ---------------------------------------------------------
+# Format: "v1.<payload>.<signature>", both parts base64url without padding.
+# payload   = "<telegram_id>|<expires_at>|<created_at>|<jti>|<username>"
+# signature = HMAC-SHA256(signing key, "v1.<payload>")
+# Verification needs no network round-trip; only the (small) revocation list
+# lives in Redis and is mirrored into process memory. Keys, revocation lists
+# and mirrors are per bot tenant.
+SIGNED_TOKEN_PREFIX = "v1."
+
+_REVOKED_TOKENS_KEY = "tg_session_revoked"   # hash: jti -> expires_at
+_BANNED_USERS_KEY = "tg_session_banned"      # hash: telegram_id -> banned_until
+
+
+class _Revocations:
+    def __init__(self):
+        self.revoked_jti: Dict[str, int] = {}
+        self.banned_until: Dict[int, int] = {}
+        self.synced_at = 0.0
+
+
+_revocations: Dict[str, _Revocations] = {}
+_signing_keys: Dict[str, bytes] = {}
+
+
+def _local_revocations() -> _Revocations:
+    return _revocations.setdefault(current_tenant().name, _Revocations())
+
+
+def _signing_key() -> bytes:
+    tenant = current_tenant()
+    key = _signing_keys.get(tenant.name)
+    if key is None:
+        if SESSION_SIGNING_KEY:
+            key = SESSION_SIGNING_KEY.encode("utf-8")
+            if tenant.schema:
+                key = hmac.new(key, tenant.name.encode("utf-8"), hashlib.sha256).digest()
+        else:
+            # derived, so it never equals the key used for init_data verification
+            key = hmac.new(b"mstc-session-token", tenant.token.encode("utf-8"), hashlib.sha256).digest()
+        _signing_keys[tenant.name] = key
+    return key
+
+
+def _b64e(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64d(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(message: str) -> str:
+    return _b64e(hmac.new(_signing_key(), message.encode("ascii"), hashlib.sha256).digest())
+
+
+def create_signed_session_for_params(params: Dict[str, str], ttl_seconds: int = DEFAULT_SESSION_TTL) -> Dict[str, Any]:
+    tg_id_int = _telegram_id_from_params(params)
+    username = params.get("username") or params.get("user_name") or ""
+    now = int(time.time())
+    expires_at = now + int(ttl_seconds)
+    jti = secrets.token_urlsafe(9)
+
+    payload = _b64e(f"{tg_id_int}|{expires_at}|{now}|{jti}|{username}".encode("utf-8"))
+    signed_part = SIGNED_TOKEN_PREFIX + payload
+    token = f"{signed_part}.{_sign(signed_part)}"
+    logger.debug("created signed session token for tg_id=%s expires_at=%s", tg_id_int, expires_at)
+    return {"token": token, "telegram_id": tg_id_int, "expires_at": expires_at}
+
+
+def _decode_signed_token(token: str) -> Dict[str, Any]:
+    signed_part, sep, signature = token.rpartition(".")
+    if not sep or not signed_part.startswith(SIGNED_TOKEN_PREFIX):
+        raise HTTPException(status_code=401, detail="invalid or expired session token")
+    if not hmac.compare_digest(_sign(signed_part), signature):
+        raise HTTPException(status_code=401, detail="invalid or expired session token")
+    try:
+        tg_id, expires_at, created_at, jti, username = (
+            _b64d(signed_part[len(SIGNED_TOKEN_PREFIX):]).decode("utf-8").split("|", 4)
+        )
+        return {
+            "telegram_id": int(tg_id),
+            "username": username,
+            "expires_at": int(expires_at),
+            "created_at": int(created_at),
+            "jti": jti,
+        }
+    except Exception:
+        raise HTTPException(status_code=401, detail="invalid session data")
+
+
+def _sync_revocations(force: bool = False) -> None:
+    """Refresh the in-process revocation mirror from Redis at most every few seconds."""
+    local = _local_revocations()
+    now = time.time()
+    if not force and now - local.synced_at < SESSION_REVOCATION_SYNC_SECONDS:
+        return
+    local.synced_at = now
+    revoked_key, banned_key = current_tenant().key(_REVOKED_TOKENS_KEY), current_tenant().key(_BANNED_USERS_KEY)
+    try:
+        r = get_redis()
+        with timed_redis("revocation", "hgetall"):
+            revoked = r.hgetall(revoked_key)
+            banned = r.hgetall(banned_key)
+    except redis.RedisError as e:
+        # keep serving from the last known list; local revocations still apply
+        logger.warning("revocation sync failed: %s", e)
+        return
+
+    local.revoked_jti.clear()
+    local.revoked_jti.update({k: int(v) for k, v in revoked.items() if int(v) > now})
+    local.banned_until.clear()
+    local.banned_until.update({int(k): int(v) for k, v in banned.items() if int(v) > now})
+
+    # prune expired entries so the list stays small
+    stale_jti = [k for k, v in revoked.items() if int(v) <= now]
+    stale_ban = [k for k, v in banned.items() if int(v) <= now]
+    try:
+        if stale_jti:
+            r.hdel(revoked_key, *stale_jti)
+        if stale_ban:
+            r.hdel(banned_key, *stale_ban)
+    except redis.RedisError:
+        pass
+
+
+def get_signed_session(token: str) -> Dict[str, Any]:
+    session = _decode_signed_token(token)
+    now = int(time.time())
+    if session["expires_at"] <= now:
+        raise HTTPException(status_code=401, detail="invalid or expired session token")
+
+    _sync_revocations()
+    if session["jti"] in _local_revocations().revoked_jti:
+        raise HTTPException(status_code=401, detail="session token revoked")
+    _check_not_banned(session["telegram_id"])
+    return session
+
+
+def _check_not_banned(telegram_id: int) -> None:
+    _sync_revocations()
+    if _local_revocations().banned_until.get(int(telegram_id), 0) > int(time.time()):
+        raise HTTPException(status_code=403, detail="user is banned")
+
+
+def revoke_session(token: str) -> None:
+    """Invalidate a session token (logout). Works for both token formats."""
+    if not token.startswith(SIGNED_TOKEN_PREFIX):
+        get_redis().delete(_session_redis_key(token))
+        return
+
+    session = _decode_signed_token(token)
+    if session["expires_at"] <= int(time.time()):
+        return
+    _local_revocations().revoked_jti[session["jti"]] = session["expires_at"]
+    get_redis().hset(current_tenant().key(_REVOKED_TOKENS_KEY), session["jti"], str(session["expires_at"]))
+
+
+def ban_telegram_id(telegram_id: int, seconds: int = DEFAULT_SESSION_TTL) -> int:
+    """
+    Refuse mini-app sessions for `telegram_id` for `seconds`: existing
+    tokens of both formats stop working and no new ones are issued. Other
+    processes pick the ban up within SESSION_REVOCATION_SYNC_SECONDS.
+    Returns the unix time the ban ends.
+    """
+    until = int(time.time()) + int(seconds)
+    _local_revocations().banned_until[int(telegram_id)] = until
+    get_redis().hset(current_tenant().key(_BANNED_USERS_KEY), str(int(telegram_id)), str(until))
+    return until
+
+
+def unban_telegram_id(telegram_id: int) -> None:
+    _local_revocations().banned_until.pop(int(telegram_id), None)
+    get_redis().hdel(current_tenant().key(_BANNED_USERS_KEY), str(int(telegram_id)))